@@ -3,9 +3,9 @@ CRUD operations for parser-produit service
 """
 
 from typing import Optional, List, Dict, Any
-from uuid import UUID
+from uuid import UUID, uuid4
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, insert
 
 from models.product import ProductParsedDB, ProductParsedCreate
 
@@ -40,6 +40,28 @@ def create_parsed_product(db: Session, product: ProductParsedCreate) -> ProductP
     return db_product
 
 
+def create_parsed_products_bulk(db: Session, products: List[ProductParsedCreate]) -> List[UUID]:
+    """
+    Create several parsed product records in one INSERT and one commit
+    
+    Args:
+        db: Database session
+        products: Product data
+        
+    Returns:
+        IDs of the created records, in input order
+    """
+    if not products:
+        return []
+    
+    # IDs are generated here so they are known without reading rows back
+    rows = [{"id": uuid4(), **product.model_dump()} for product in products]
+    db.execute(insert(ProductParsedDB), rows)
+    db.commit()
+    
+    return [row["id"] for row in rows]
+
+
 def get_parsed_product(db: Session, product_id: UUID) -> Optional[ProductParsedDB]:
     """
     Get a parsed product by ID
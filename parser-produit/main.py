@@ -4,12 +4,20 @@ Extracts text from PDF, HTML, and images/barcodes
 """
 
 import logging
+from functools import lru_cache
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.openapi.docs import (
+    get_redoc_html,
+    get_swagger_ui_html,
+    get_swagger_ui_oauth2_redirect_html,
+)
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from contextlib import asynccontextmanager
 
-from routes.parse_routes import router as parse_router
+from routes.parse_routes import router as parse_router, product_lookup
 from database.connection import engine, Base
+from services import worker_pool
 
 # Configure logging
 logging.basicConfig(
@@ -25,14 +33,22 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Parser-Produit service...")
     Base.metadata.create_all(bind=engine)
     logger.info("Database tables created/verified")
+    # Start parser workers so the first uploads don't pay the init cost
+    worker_pool.start()
     yield
     # Shutdown: cleanup if needed
     logger.info("Shutting down Parser-Produit service...")
+    worker_pool.shutdown()
+    await product_lookup.aclose()
 
 app = FastAPI(
     title="Parser-Produit Service",
     description="Microservice for parsing product data from PDF, HTML, and images",
     version="1.0.0",
+    # Served below from a cached copy
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None,
     lifespan=lifespan
 )
 
@@ -53,6 +69,45 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "parser-produit"}
 
+
+# API docs: the schema and pages don't change at runtime, so they are
+# rendered once and served from memory
+@lru_cache(maxsize=1)
+def _openapi_body() -> bytes:
+    return JSONResponse(app.openapi()).body
+
+@lru_cache(maxsize=1)
+def _swagger_ui_body() -> bytes:
+    return get_swagger_ui_html(
+        openapi_url="/openapi.json",
+        title=f"{app.title} - Swagger UI",
+        oauth2_redirect_url=app.swagger_ui_oauth2_redirect_url,
+    ).body
+
+@lru_cache(maxsize=1)
+def _swagger_ui_oauth2_redirect_body() -> bytes:
+    return get_swagger_ui_oauth2_redirect_html().body
+
+@lru_cache(maxsize=1)
+def _redoc_body() -> bytes:
+    return get_redoc_html(openapi_url="/openapi.json", title=f"{app.title} - ReDoc").body
+
+@app.get("/openapi.json", include_in_schema=False)
+async def openapi_schema():
+    return Response(content=_openapi_body(), media_type="application/json")
+
+@app.get("/docs", include_in_schema=False)
+async def swagger_ui():
+    return HTMLResponse(content=_swagger_ui_body())
+
+@app.get(app.swagger_ui_oauth2_redirect_url, include_in_schema=False)
+async def swagger_ui_redirect():
+    return HTMLResponse(content=_swagger_ui_oauth2_redirect_body())
+
+@app.get("/redoc", include_in_schema=False)
+async def redoc():
+    return HTMLResponse(content=_redoc_body())
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
@@ -5,8 +5,7 @@ Product models for parser-produit service
 from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel, Field
-from sqlalchemy import Column, String, Text, DateTime
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Text, DateTime, Uuid
 import uuid
 
 from database.connection import Base
@@ -16,7 +15,7 @@ class ProductParsedDB(Base):
     """SQLAlchemy model for parsed products"""
     __tablename__ = "parsed_products"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
     filename = Column(String(255), nullable=True)
     file_type = Column(String(50), nullable=True)
     title = Column(String(500), nullable=True)
@@ -2,40 +2,48 @@
 API routes for product parsing
 """
 
+import asyncio
 import logging
+import os
+from functools import lru_cache
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Optional, Dict, Any, Tuple
 import uuid
 
-from services.pdf_parser import PDFParser
-from services.html_parser import HTMLParser
 from services.image_parser import ImageParser
-from services.barcode_reader import BarcodeReader
 from services.product_lookup import ProductLookupService
+from services import worker_pool
 from models.product import ProductParsed, ProductParsedCreate
 from database.connection import get_db
-from database.crud import create_parsed_product, get_parsed_product
+from database.crud import create_parsed_product, create_parsed_products_bulk, get_parsed_product
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-pdf_parser = PDFParser()
-html_parser = HTMLParser()
 image_parser = ImageParser()
-barcode_reader = BarcodeReader()
 product_lookup = ProductLookupService()
 
+# Maximum number of batch uploads held in memory and parsed concurrently
+PARSE_BATCH_CONCURRENCY = int(os.getenv("PARSE_BATCH_CONCURRENCY", "8"))
+
+
+HTML_EXTENSIONS = frozenset({'html', 'htm'})
+IMAGE_EXTENSIONS = frozenset({'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff'})
+
 
 def detect_file_type(filename: str, content_type: str) -> str:
     """Detect file type from filename and content type"""
-    filename_lower = filename.lower()
+    # Only lowercase the extension, not the whole filename
+    _, dot, extension = (filename or '').rpartition('.')
+    extension = extension.lower() if dot else ''
+    content_type = content_type or ''
     
-    if filename_lower.endswith('.pdf') or content_type == 'application/pdf':
+    if extension == 'pdf' or content_type == 'application/pdf':
         return 'pdf'
-    elif filename_lower.endswith(('.html', '.htm')) or 'html' in content_type:
+    elif extension in HTML_EXTENSIONS or 'html' in content_type:
         return 'html'
-    elif filename_lower.endswith(('.png', '.jpg', '.jpeg', '.gif', '.bmp', '.tiff')):
+    elif extension in IMAGE_EXTENSIONS:
         return 'image'
     else:
         return 'unknown'
@@ -75,20 +83,18 @@ async def parse_product(
         }
         
         if file_type == 'pdf':
-            parsed_data = pdf_parser.parse(content)
+            parsed_data = await worker_pool.parse_pdf(content)
             result.update(parsed_data)
             
         elif file_type == 'html':
-            parsed_data = html_parser.parse(content.decode('utf-8', errors='ignore'))
+            parsed_data = await worker_pool.parse_html(content.decode('utf-8', errors='ignore'))
             result.update(parsed_data)
             
         elif file_type == 'image':
-            # Extract text via OCR
-            ocr_data = image_parser.extract_text(content)
+            # Extract text via OCR and detect barcode/GTIN from a single decode
+            ocr_data, barcode_data = await worker_pool.parse_image(content)
             result["raw_text"] = ocr_data.get("text", "")
             
-            # Try to detect barcode/GTIN first
-            barcode_data = barcode_reader.read_barcode(content)
             if barcode_data:
                 result["gtin"] = barcode_data.get("gtin")
                 logger.info(f"Detected barcode: {result['gtin']}")
@@ -165,67 +171,45 @@ async def parse_product_batch(
     Returns list of parsed products with their IDs
     """
     logger.info(f"Batch parsing {len(files)} files")
+    # Bound how many uploads are read and parsed at the same time so peak
+    # memory stays proportional to the concurrency, not the batch size
+    semaphore = asyncio.Semaphore(PARSE_BATCH_CONCURRENCY)
+    
+    async def parse_one(file: UploadFile) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return {"result": await _parse_batch_file(file)}
+            except Exception as e:
+                return {"error": {"filename": file.filename, "error": str(e)}}
+    
+    outcomes = await asyncio.gather(*(parse_one(file) for file in files))
+    parsed = [outcome["result"] for outcome in outcomes if "result" in outcome]
+    errors = [outcome["error"] for outcome in outcomes if "error" in outcome]
+    
+    # Store the whole batch in one transaction
     results = []
-    errors = []
+    try:
+        product_ids = create_parsed_products_bulk(db, [product for _, product in parsed])
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Batch insert failed, storing files one by one: {e}")
+        product_ids = None
     
-    for file in files:
-        try:
-            content = await file.read()
-            file_type = detect_file_type(file.filename, file.content_type)
-            
-            result = {
-                "title": None,
-                "brand": None,
-                "ingredients_text": None,
-                "packaging": None,
-                "origin": None,
-                "gtin": None,
-                "raw_text": None,
-                "filename": file.filename
-            }
-            
-            if file_type == 'pdf':
-                parsed_data = pdf_parser.parse(content)
-                result.update(parsed_data)
-            elif file_type == 'html':
-                parsed_data = html_parser.parse(content.decode('utf-8', errors='ignore'))
-                result.update(parsed_data)
-            elif file_type == 'image':
-                ocr_data = image_parser.extract_text(content)
-                result["raw_text"] = ocr_data.get("text", "")
-                barcode_data = barcode_reader.read_barcode(content)
-                if barcode_data:
-                    result["gtin"] = barcode_data.get("gtin")
-                structured = image_parser.extract_structured_data(ocr_data.get("text", ""))
-                result.update(structured)
-            else:
-                errors.append({"filename": file.filename, "error": "Unsupported file type"})
+    for index, (result, product) in enumerate(parsed):
+        if product_ids is not None:
+            product_id = product_ids[index]
+        else:
+            # One bad row must not fail the files that can be stored
+            try:
+                product_id = create_parsed_product(db, product).id
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Failed to store {result['filename']}: {e}")
+                errors.append({"filename": result["filename"], "error": str(e)})
                 continue
-            
-            # Validate and clean GTIN
-            if result.get("gtin"):
-                result["gtin"] = _validate_gtin(result["gtin"])
-            
-            # Store in database
-            product_data = ProductParsedCreate(
-                filename=file.filename,
-                file_type=file_type,
-                title=result.get("title"),
-                brand=result.get("brand"),
-                ingredients_text=result.get("ingredients_text"),
-                packaging=result.get("packaging"),
-                origin=result.get("origin"),
-                gtin=result.get("gtin"),
-                raw_text=result.get("raw_text")
-            )
-            
-            db_product = create_parsed_product(db, product_data)
-            result["id"] = str(db_product.id)
-            result["status"] = "success"
-            results.append(result)
-            
-        except Exception as e:
-            errors.append({"filename": file.filename, "error": str(e)})
+        result["id"] = str(product_id)
+        result["status"] = "success"
+        results.append(result)
     
     logger.info(f"Batch parsing complete: {len(results)} success, {len(errors)} failed")
     return {
@@ -237,6 +221,68 @@ async def parse_product_batch(
     }
 
 
+async def _parse_batch_file(file: UploadFile) -> Tuple[Dict[str, Any], ProductParsedCreate]:
+    """
+    Parse a single file from a batch upload
+    
+    Args:
+        file: Uploaded file
+        
+    Returns:
+        Tuple of (parsed product data, record to store)
+    """
+    content = await file.read()
+    file_type = detect_file_type(file.filename, file.content_type)
+    
+    result = {
+        "title": None,
+        "brand": None,
+        "ingredients_text": None,
+        "packaging": None,
+        "origin": None,
+        "gtin": None,
+        "raw_text": None,
+        "filename": file.filename
+    }
+    
+    if file_type == 'pdf':
+        parsed_data = await worker_pool.parse_pdf(content)
+        result.update(parsed_data)
+    elif file_type == 'html':
+        parsed_data = await worker_pool.parse_html(content.decode('utf-8', errors='ignore'))
+        result.update(parsed_data)
+    elif file_type == 'image':
+        ocr_data, barcode_data = await worker_pool.parse_image(content)
+        result["raw_text"] = ocr_data.get("text", "")
+        if barcode_data:
+            result["gtin"] = barcode_data.get("gtin")
+        structured = image_parser.extract_structured_data(ocr_data.get("text", ""))
+        result.update(structured)
+    else:
+        raise ValueError("Unsupported file type")
+    
+    # Release the upload buffer while the rest of the batch is parsed
+    del content
+    
+    # Validate and clean GTIN
+    if result.get("gtin"):
+        result["gtin"] = _validate_gtin(result["gtin"])
+    
+    # Record to store with the rest of the batch
+    product_data = ProductParsedCreate(
+        filename=file.filename,
+        file_type=file_type,
+        title=result.get("title"),
+        brand=result.get("brand"),
+        ingredients_text=result.get("ingredients_text"),
+        packaging=result.get("packaging"),
+        origin=result.get("origin"),
+        gtin=result.get("gtin"),
+        raw_text=result.get("raw_text")
+    )
+    return result, product_data
+
+
 @router.get("/parsed/{product_id}")
 async def get_parsed_product_by_id(
     product_id: str,
@@ -320,6 +366,7 @@ async def get_product_by_gtin(
     }
 
 
+@lru_cache(maxsize=8192)
 def _validate_gtin(gtin: str) -> Optional[str]:
     """
     Validate and clean GTIN/EAN/UPC code
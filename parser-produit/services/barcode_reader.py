@@ -4,12 +4,16 @@ Reads barcodes and extracts GTIN from images
 """
 
 import io
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Union
 
 try:
-    from pyzbar.pyzbar import decode
     from PIL import Image
-    PYZBAR_AVAILABLE = True
+except ImportError:
+    Image = None
+
+try:
+    from pyzbar.pyzbar import decode
+    PYZBAR_AVAILABLE = Image is not None
 except ImportError:
     PYZBAR_AVAILABLE = False
 
@@ -31,12 +35,12 @@ class BarcodeReader:
         """Initialize BarcodeReader"""
         pass
     
-    def read_barcode(self, image_data: bytes) -> Optional[Dict[str, Any]]:
+    def read_barcode(self, image_data: Union[bytes, "Image.Image"]) -> Optional[Dict[str, Any]]:
         """
         Read barcode from image and extract GTIN
         
         Args:
-            image_data: Raw image bytes
+            image_data: Raw image bytes or an already decoded PIL Image
             
         Returns:
             Dictionary with barcode data or None
@@ -46,14 +50,18 @@ class BarcodeReader:
             return None
         
         try:
-            image = Image.open(io.BytesIO(image_data))
+            # Open image from bytes unless already decoded
+            image = self._open_image(image_data)
+            
+            # zbar scans 8-bit luminance; convert once and reuse it for retries
+            gray = image if image.mode == 'L' else image.convert('L')
             
             # Decode barcodes
-            barcodes = decode(image)
+            barcodes = decode(gray)
             
             if not barcodes:
                 # Try with image preprocessing
-                barcodes = self._try_with_preprocessing(image)
+                barcodes = self._try_with_preprocessing(gray)
             
             if not barcodes:
                 return None
@@ -94,7 +102,7 @@ class BarcodeReader:
             return []
         
         try:
-            image = Image.open(io.BytesIO(image_data))
+            image = self._open_image(image_data)
             barcodes = decode(image)
             
             results = []
@@ -115,12 +123,31 @@ class BarcodeReader:
         except Exception:
             return []
     
-    def _try_with_preprocessing(self, image: Image.Image) -> list:
+    def _open_image(self, image_data: Union[bytes, "Image.Image"]) -> "Image.Image":
+        """
+        Open image bytes, or return an already decoded image unchanged
+        
+        Args:
+            image_data: Raw image bytes or PIL Image
+            
+        Returns:
+            PIL Image object
+        """
+        if isinstance(image_data, Image.Image):
+            return image_data
+        
+        image = Image.open(io.BytesIO(image_data))
+        # Let JPEG decode straight to grayscale, skipping the RGB conversion
+        image.draft('L', image.size)
+        return image
+    
+    def _try_with_preprocessing(self, image: "Image.Image") -> list:
         """
         Try barcode detection with image preprocessing
         
         Args:
-            image: PIL Image object
+            image: PIL Image object (grayscale preferred; a plain grayscale
+                decode is expected to have been tried already)
             
         Returns:
             List of detected barcodes
@@ -132,11 +159,6 @@ class BarcodeReader:
             else:
                 gray = image
             
-            # Try with grayscale
-            barcodes = decode(gray)
-            if barcodes:
-                return barcodes
-            
             # Try with contrast enhancement
             from PIL import ImageEnhance
             
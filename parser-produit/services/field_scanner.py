@@ -0,0 +1,125 @@
+"""
+Field Anchor Scanner
+Finds field keywords ("ingredients", "origin", ...) in one pass over the text
+so that extraction regexes only run where they can match
+"""
+
+import re
+from typing import Dict, Iterable, List, Match, Optional, Pattern
+
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+
+# Leading keyword group of a field pattern, e.g. "(?:origin|made in)"
+_LEADING_GROUP_RE = re.compile(r'^\(\?:([^()\[\]\\^$.*+{}]+)\)')
+_ANCHOR_RE = re.compile(r'^[^\W\d_]+(?: [^\W\d_]+)*(?:s\?)?$')
+
+# Characters that IGNORECASE matching folds to ASCII but str.lower() keeps
+_CASE_FOLD_FIXES = str.maketrans({'ı': 'i', 'ſ': 's'})
+
+
+def _leading_anchors(pattern: Pattern) -> Optional[List[str]]:
+    """
+    Get the keywords any match of a pattern must start with
+    
+    Args:
+        pattern: Compiled field pattern
+        
+    Returns:
+        Lowercase keywords, or None if the pattern has no keyword prefix
+    """
+    group = _LEADING_GROUP_RE.match(pattern.pattern)
+    if not group:
+        return None
+    
+    anchors = []
+    for alternative in group.group(1).split('|'):
+        if not _ANCHOR_RE.match(alternative):
+            return None
+        # "ingredients?" must start with "ingredient"
+        if alternative.endswith('?'):
+            alternative = alternative[:-2]
+        anchors.append(alternative.lower())
+    return anchors
+
+
+class AnchorScanner:
+    """Locate the keyword prefixes of many field patterns in a single pass"""
+    
+    def __init__(self, patterns: Iterable[Pattern]):
+        """
+        Initialize AnchorScanner
+        
+        Args:
+            patterns: Field patterns; those without a keyword prefix are
+                always searched in full
+        """
+        self._anchored: Dict[Pattern, List[str]] = {}
+        for pattern in patterns:
+            anchors = _leading_anchors(pattern)
+            if anchors:
+                self._anchored[pattern] = anchors
+        
+        self._automaton = None
+        if AHOCORASICK_AVAILABLE and self._anchored:
+            self._automaton = ahocorasick.Automaton()
+            owners: Dict[str, List[Pattern]] = {}
+            for pattern, anchors in self._anchored.items():
+                for anchor in anchors:
+                    owners.setdefault(anchor, []).append(pattern)
+            for anchor, anchor_patterns in owners.items():
+                self._automaton.add_word(anchor, (len(anchor), anchor_patterns))
+            self._automaton.make_automaton()
+    
+    def scan(self, text: str) -> Optional[Dict[Pattern, int]]:
+        """
+        Find where each anchored pattern's earliest keyword occurs
+        
+        Args:
+            text: Source text
+            
+        Returns:
+            Mapping of pattern to the offset of its first keyword (patterns
+            whose keywords are absent are left out), or None if offsets in
+            the lowercased text don't line up with the original
+        """
+        lowered = text.lower().translate(_CASE_FOLD_FIXES)
+        if len(lowered) != len(text):
+            return None
+        
+        starts: Dict[Pattern, int] = {}
+        if self._automaton is not None:
+            for end, (length, anchor_patterns) in self._automaton.iter(lowered):
+                start = end - length + 1
+                for pattern in anchor_patterns:
+                    if start < starts.get(pattern, len(text)):
+                        starts[pattern] = start
+        else:
+            for pattern, anchors in self._anchored.items():
+                offsets = [offset for offset in map(lowered.find, anchors) if offset >= 0]
+                if offsets:
+                    starts[pattern] = min(offsets)
+        return starts
+    
+    def search(self, pattern: Pattern, text: str, starts: Optional[Dict[Pattern, int]]) -> Optional[Match]:
+        """
+        Search a pattern, skipping text before its first keyword
+        
+        Args:
+            pattern: Compiled field pattern
+            text: Source text
+            starts: Result of scan() for this text
+            
+        Returns:
+            The same match as pattern.search(text), or None
+        """
+        if starts is None or pattern not in self._anchored:
+            return pattern.search(text)
+        start = starts.get(pattern)
+        if start is None:
+            return None
+        return pattern.search(text, start)
@@ -3,8 +3,9 @@ HTML Parser Service
 Extracts product data from HTML content using BeautifulSoup
 """
 
+import json
 import re
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Iterator
 
 try:
     from bs4 import BeautifulSoup
@@ -12,6 +13,37 @@ try:
 except ImportError:
     BS4_AVAILABLE = False
 
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+try:
+    import lxml  # noqa: F401 - C parser backend for BeautifulSoup
+    SOUP_FEATURES = 'lxml'
+except ImportError:
+    SOUP_FEATURES = 'html.parser'
+
+
+# Precompiled patterns and limits shared by all HTMLParser instances
+_WHITESPACE_RE = re.compile(r'\s+')
+_GTIN_RE = re.compile(r'\d{8,14}')
+RAW_TEXT_LIMIT = 10000
+
+# Attributes that may carry a GTIN on a matched element
+GTIN_ATTRS = ('data-gtin', 'data-ean', 'content', 'value')
+
+# Meta tags that may carry a GTIN (selector, attribute)
+GTIN_META_PATTERNS = (
+    ('meta[property="product:gtin"]', 'content'),
+    ('meta[name="gtin"]', 'content'),
+    ('meta[itemprop="gtin13"]', 'content'),
+)
+
+# Non-content tags removed before extraction
+STRIPPED_TAGS = ['script', 'style', 'nav', 'footer', 'header']
+
 
 class HTMLParser:
     """Service for parsing HTML documents and extracting product data"""
@@ -82,13 +114,13 @@ class HTMLParser:
         if not BS4_AVAILABLE:
             raise RuntimeError("BeautifulSoup4 is not installed. Install it with: pip install beautifulsoup4")
         
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = BeautifulSoup(html_content, SOUP_FEATURES)
         
         # Remove script and style elements
-        for element in soup(['script', 'style', 'nav', 'footer', 'header']):
+        for element in soup(STRIPPED_TAGS):
             element.decompose()
         
-        raw_text = soup.get_text(separator='\n', strip=True)
+        raw_text = self._extract_raw_text(soup, RAW_TEXT_LIMIT)
         
         return {
             "title": self._extract_by_selectors(soup, self.title_selectors),
@@ -97,9 +129,32 @@ class HTMLParser:
             "packaging": self._extract_by_selectors(soup, self.packaging_selectors),
             "origin": self._extract_by_selectors(soup, self.origin_selectors),
             "gtin": self._extract_gtin(soup),
-            "raw_text": raw_text[:10000]  # Limit raw text size
+            "raw_text": raw_text
         }
     
+    def _extract_raw_text(self, soup: BeautifulSoup, limit: int) -> str:
+        """
+        Extract newline-separated document text, stopping once limit is reached
+        
+        Equivalent to soup.get_text(separator='\\n', strip=True)[:limit] but
+        avoids materializing the whole document text for large pages.
+        
+        Args:
+            soup: BeautifulSoup object
+            limit: Maximum number of characters to return
+            
+        Returns:
+            Truncated raw text
+        """
+        parts = []
+        size = 0
+        for string in soup.stripped_strings:
+            parts.append(string)
+            size += len(string) + 1
+            if size >= limit:
+                break
+        return '\n'.join(parts)[:limit]
+    
     def _extract_by_selectors(self, soup: BeautifulSoup, selectors: List[str]) -> Optional[str]:
         """
         Try multiple CSS selectors to extract content
@@ -115,7 +170,7 @@ class HTMLParser:
             try:
                 element = soup.select_one(selector)
                 if element:
-                    text = element.get_text(strip=True)
+                    text = element.get_text(separator=' ', strip=True)
                     if text:
                         return self._clean_text(text)
             except Exception:
@@ -138,32 +193,26 @@ class HTMLParser:
                 element = soup.select_one(selector)
                 if element:
                     # Check for data attributes
-                    for attr in ['data-gtin', 'data-ean', 'content', 'value']:
+                    for attr in GTIN_ATTRS:
                         value = element.get(attr)
-                        if value and re.match(r'^\d{8,14}$', str(value)):
-                            return str(value)
+                        if value and _GTIN_RE.fullmatch(value):
+                            return value
                     
                     # Check text content
                     text = element.get_text(strip=True)
-                    if text and re.match(r'^\d{8,14}$', text):
+                    if text and _GTIN_RE.fullmatch(text):
                         return text
             except Exception:
                 continue
         
         # Try to find GTIN in meta tags
-        meta_patterns = [
-            ('meta[property="product:gtin"]', 'content'),
-            ('meta[name="gtin"]', 'content'),
-            ('meta[itemprop="gtin13"]', 'content'),
-        ]
-        
-        for selector, attr in meta_patterns:
+        for selector, attr in GTIN_META_PATTERNS:
             try:
                 element = soup.select_one(selector)
                 if element:
                     value = element.get(attr)
-                    if value and re.match(r'^\d{8,14}$', str(value)):
-                        return str(value)
+                    if value and _GTIN_RE.fullmatch(value):
+                        return value
             except Exception:
                 continue
         
@@ -171,11 +220,8 @@ class HTMLParser:
     
     def _clean_text(self, text: str) -> str:
         """Clean and normalize extracted text"""
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
-        # Remove common HTML artifacts
-        text = text.strip()
-        return text
+        # Collapse whitespace and trim
+        return _WHITESPACE_RE.sub(' ', text).strip()
     
     def extract_structured_data(self, soup: BeautifulSoup) -> Dict[str, Any]:
         """
@@ -187,23 +233,39 @@ class HTMLParser:
         Returns:
             Dictionary with structured data
         """
-        import json
-        
         result = {}
         
         # Look for JSON-LD scripts
         scripts = soup.find_all('script', {'type': 'application/ld+json'})
         
         for script in scripts:
+            source = script.string
+            # Skip blocks that cannot describe a Product without decoding them
+            if not source or '"Product"' not in source:
+                continue
             try:
-                data = json.loads(script.string)
-                if isinstance(data, dict):
-                    if data.get('@type') == 'Product':
-                        result['title'] = data.get('name')
-                        result['brand'] = data.get('brand', {}).get('name') if isinstance(data.get('brand'), dict) else data.get('brand')
-                        result['gtin'] = data.get('gtin13') or data.get('gtin')
-                        break
-            except (json.JSONDecodeError, TypeError):
+                data = json_loads(str(source))
+            except (ValueError, TypeError):
                 continue
+            
+            for node in self._iter_jsonld_nodes(data):
+                if node.get('@type') == 'Product':
+                    result['title'] = node.get('name')
+                    result['brand'] = node.get('brand', {}).get('name') if isinstance(node.get('brand'), dict) else node.get('brand')
+                    result['gtin'] = node.get('gtin13') or node.get('gtin')
+                    return result
         
         return result
+    
+    def _iter_jsonld_nodes(self, data: Any) -> Iterator[Dict[str, Any]]:
+        """Yield JSON-LD objects from a top-level object, list or @graph"""
+        items = data if isinstance(data, list) else [data]
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            yield item
+            graph = item.get('@graph')
+            if isinstance(graph, list):
+                for node in graph:
+                    if isinstance(node, dict):
+                        yield node
@@ -4,55 +4,177 @@ Extracts text from images using Tesseract OCR
 """
 
 import io
+import os
 import re
-from typing import Dict, Any, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Union, List, Pattern, Tuple
+
+# Parallelism comes from running one engine per thread; keep Tesseract's own
+# OpenMP threading off so engines don't oversubscribe the cores
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+from services.field_scanner import AnchorScanner
+from services.result_cache import ResultCache, content_key
 
 try:
     import pytesseract
     from PIL import Image
     TESSERACT_AVAILABLE = True
+    # What PIL raises for corrupt, truncated or oversized image data
+    IMAGE_DECODE_ERRORS = (OSError, SyntaxError, ValueError, EOFError, Image.DecompressionBombError)
 except ImportError:
     TESSERACT_AVAILABLE = False
+    IMAGE_DECODE_ERRORS = (OSError, SyntaxError, ValueError, EOFError)
+
+try:
+    from tesserocr import PyTessBaseAPI, PSM
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+try:
+    from langdetect import DetectorFactory, detect, LangDetectException
+    DetectorFactory.seed = 0  # Deterministic detection
+    LANGDETECT_AVAILABLE = True
+except ImportError:
+    LANGDETECT_AVAILABLE = False
+
+
+# OCR languages and page segmentation mode (6 = uniform block of text)
+OCR_LANGUAGES = 'eng+fra+deu+spa+ita'
+OCR_PSM = 6
+
+# Language used for the first OCR pass when language detection is available,
+# and the Tesseract model for each detected language
+DEFAULT_OCR_LANGUAGE = 'eng'
+TESSERACT_LANGUAGES = {
+    'en': 'eng',
+    'fr': 'fra',
+    'de': 'deu',
+    'es': 'spa',
+    'it': 'ita',
+}
+
+# Minimum amount of text needed for a reliable language detection
+MIN_LANGDETECT_CHARS = 20
+
+# Number of OCR results kept, keyed by a hash of the image bytes
+OCR_CACHE_SIZE = 256
+
+# Images at least this large (longer / shorter side) skip upscaling
+OCR_ADEQUATE_MAX_SIDE = 800
+OCR_ADEQUATE_MIN_SIDE = 600
+
+# Minimum word confidence for detect_text_regions
+MIN_REGION_CONFIDENCE = 60
+
+# Uncompressed format used to hand images to the tesseract command line
+OCR_HANDOFF_FORMAT = 'BMP'
+
+# Default number of threads used by extract_text_batch
+OCR_BATCH_WORKERS = int(os.getenv("OCR_BATCH_WORKERS", str(os.cpu_count() or 1)))
+
+# Flags shared by all field extraction patterns
+FIELD_PATTERN_FLAGS = re.IGNORECASE | re.DOTALL
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _compile_patterns(patterns: List[str]) -> List[Pattern]:
+    """Compile field extraction patterns once, preserving their priority order"""
+    return [re.compile(pattern, FIELD_PATTERN_FLAGS) for pattern in patterns]
 
 
 class ImageParser:
     """Service for extracting text from images using OCR"""
     
-    def __init__(self, tesseract_cmd: Optional[str] = None):
+    def __init__(
+        self,
+        tesseract_cmd: Optional[str] = None,
+        cache_size: int = OCR_CACHE_SIZE,
+        batch_workers: int = OCR_BATCH_WORKERS
+    ):
         """
         Initialize ImageParser
         
         Args:
             tesseract_cmd: Path to tesseract executable (optional)
+            cache_size: Number of OCR results kept for repeated uploads
+            batch_workers: Number of OCR threads used by extract_text_batch
         """
         if tesseract_cmd and TESSERACT_AVAILABLE:
             pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
         
+        # Persistent tesserocr engines (one per thread and language, as the
+        # API is not thread-safe), created on first OCR call so that
+        # instances that never run OCR don't load the language models
+        self._thread_state = threading.local()
+        self._apis = []
+        self._apis_lock = threading.Lock()
+        
+        # Thread pool for extract_text_batch, created on first use and kept
+        # so its threads (and their engines) are reused across batches
+        self._batch_workers = max(batch_workers, 1)
+        self._executor = None
+        
+        # OCR results for identical uploads, keyed by content hash
+        self._cache = ResultCache(cache_size)
+        
         # Regex patterns for structured data extraction
-        self.ingredient_patterns = [
+        self.ingredient_patterns = _compile_patterns([
             r'(?:ingredients?|composition|ingrédients?)\s*[:\-]?\s*(.+?)(?=\n\n|\Z)',
             r'(?:contains?|contient)\s*[:\-]?\s*(.+?)(?=\n\n|\Z)',
-        ]
-        self.title_patterns = [
+        ])
+        self.title_patterns = _compile_patterns([
             r'^([A-Z][A-Za-z\s\-]+)(?:\n|$)',
-        ]
-        self.brand_patterns = [
+        ])
+        self.brand_patterns = _compile_patterns([
             r'(?:brand|marque|by|par)\s*[:\-]?\s*(.+?)(?:\n|$)',
-        ]
-        self.origin_patterns = [
+        ])
+        self.origin_patterns = _compile_patterns([
             r'(?:origin|origine|made in|fabriqué en)\s*[:\-]?\s*(.+?)(?:\n|$)',
-        ]
-        self.packaging_patterns = [
+        ])
+        self.packaging_patterns = _compile_patterns([
             r'(?:packaging|emballage)\s*[:\-]?\s*(.+?)(?:\n|$)',
-        ]
+        ])
+        
+        # Keyword prefilter shared by all field patterns
+        self._anchor_scanner = AnchorScanner(
+            self.title_patterns + self.brand_patterns + self.ingredient_patterns +
+            self.packaging_patterns + self.origin_patterns
+        )
     
-    def extract_text(self, image_data: bytes) -> Dict[str, Any]:
+    def decode_image(self, image_data: bytes) -> "Image.Image":
         """
-        Extract text from image using OCR
+        Decode image bytes once so the pixels can be shared between
+        OCR and barcode detection
         
         Args:
             image_data: Raw image bytes
             
+        Returns:
+            Decoded PIL Image
+        """
+        if not TESSERACT_AVAILABLE:
+            raise RuntimeError(
+                "Tesseract OCR is not available. "
+                "Install pytesseract and Tesseract: pip install pytesseract pillow"
+            )
+        
+        image = Image.open(io.BytesIO(image_data))
+        # OCR and barcode reading both work on grayscale, so let JPEG
+        # decode straight to luminance instead of RGB
+        image.draft('L', image.size)
+        image.load()
+        return image
+    
+    def extract_text(self, image_data: Union[bytes, "Image.Image"]) -> Dict[str, Any]:
+        """
+        Extract text from image using OCR
+        
+        Args:
+            image_data: Raw image bytes or an already decoded PIL Image
+            
         Returns:
             Dictionary with extracted text and metadata
         """
@@ -62,31 +184,47 @@ class ImageParser:
                 "Install pytesseract and Tesseract: pip install pytesseract pillow"
             )
         
+        # Only raw bytes can be hashed; decoded images are always processed
+        key = None
+        if not isinstance(image_data, Image.Image):
+            key = content_key(image_data)
+            cached = self._cache.get(key)
+            if cached is not None:
+                return dict(cached)
+        
         try:
-            # Open image from bytes
-            image = Image.open(io.BytesIO(image_data))
+            # Open image from bytes unless already decoded
+            if isinstance(image_data, Image.Image):
+                image = image_data
+            else:
+                image = Image.open(io.BytesIO(image_data))
             
             # Preprocess image for better OCR results
             image = self._preprocess_image(image)
             
-            # Extract text with multiple language support
-            text = pytesseract.image_to_string(
-                image,
-                lang='eng+fra+deu+spa+ita',  # Multiple languages
-                config='--psm 6'  # Assume uniform block of text
-            )
+            if LANGDETECT_AVAILABLE:
+                # Quick pass with a single model, then re-run only if the
+                # text turns out to be in another language
+                language = DEFAULT_OCR_LANGUAGE
+                text, avg_confidence = self._ocr(image, language)
+                detected = self._detect_language(text)
+                if detected and detected != language:
+                    language = detected
+                    text, avg_confidence = self._ocr(image, language)
+            else:
+                language = OCR_LANGUAGES
+                text, avg_confidence = self._ocr(image, language)
             
-            # Get OCR confidence data
-            data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
-            confidences = [int(c) for c in data['conf'] if int(c) > 0]
-            avg_confidence = sum(confidences) / len(confidences) if confidences else 0
-            
-            return {
+            result = {
                 "text": text.strip(),
                 "confidence": avg_confidence,
+                "language": language,
                 "image_size": image.size,
                 "image_mode": image.mode
             }
+            if key is not None:
+                self._cache.put(key, result)
+            return dict(result)
             
         except Exception as e:
             # TODO: Add proper logging
@@ -96,7 +234,186 @@ class ImageParser:
                 "confidence": 0
             }
     
-    def _preprocess_image(self, image: Image.Image) -> Image.Image:
+    def extract_text_batch(
+        self,
+        images: List[Union[bytes, "Image.Image"]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Extract text from several images in parallel
+        
+        Tesseract releases the GIL while recognizing, so a thread pool with
+        one engine per thread scales across cores.
+        
+        Args:
+            images: Raw image bytes or decoded PIL Images
+            
+        Returns:
+            List of extract_text results, in input order
+        """
+        if not images:
+            return []
+        
+        return list(self._get_executor().map(self.extract_text, images))
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Get the persistent OCR thread pool, creating it on first use"""
+        with self._apis_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._batch_workers,
+                    thread_name_prefix="ocr"
+                )
+            return self._executor
+    
+    def _ocr(self, image: "Image.Image", language: str) -> Tuple[str, float]:
+        """Run OCR with the best available backend"""
+        if TESSEROCR_AVAILABLE:
+            return self._ocr_with_tesserocr(image, language)
+        return self._ocr_with_pytesseract(image, language)
+    
+    def _detect_language(self, text: str) -> Optional[str]:
+        """
+        Detect the language of OCR text
+        
+        Args:
+            text: Text from a first OCR pass
+            
+        Returns:
+            Tesseract language code, or None if unknown or unsupported
+        """
+        sample = text.strip()[:500]
+        if len(sample) < MIN_LANGDETECT_CHARS:
+            return None
+        try:
+            return TESSERACT_LANGUAGES.get(detect(sample))
+        except LangDetectException:
+            return None
+    
+    def _ocr_with_tesserocr(self, image: "Image.Image", language: str) -> Tuple[str, float]:
+        """
+        Run OCR in-process with a persistent libtesseract engine
+        
+        Args:
+            image: Preprocessed grayscale ('L') PIL Image
+            language: Tesseract language(s), e.g. 'fra' or 'eng+fra'
+            
+        Returns:
+            Tuple of (text, mean word confidence)
+        """
+        api = self._get_api(language)
+        # Hand over the raw 8-bit grayscale pixels; SetImage would first
+        # re-encode the PIL image into an in-memory file
+        width, height = image.size
+        api.SetImageBytes(image.tobytes(), width, height, 1, width)
+        text = api.GetUTF8Text()
+        confidence = float(api.MeanTextConf())
+        api.Clear()
+        return text, confidence
+    
+    def _get_api(self, language: str) -> "PyTessBaseAPI":
+        """Get the calling thread's tesserocr engine for a language, creating it if needed"""
+        apis = getattr(self._thread_state, 'apis', None)
+        if apis is None:
+            apis = self._thread_state.apis = {}
+        
+        api = apis.get(language)
+        if api is None:
+            api = apis[language] = PyTessBaseAPI(lang=language, psm=PSM.SINGLE_BLOCK)
+            with self._apis_lock:
+                self._apis.append(api)
+        return api
+    
+    def _ocr_with_pytesseract(self, image: "Image.Image", language: str) -> Tuple[str, float]:
+        """
+        Run OCR through the tesseract command line
+        
+        Args:
+            image: Preprocessed PIL Image
+            language: Tesseract language(s), e.g. 'fra' or 'eng+fra'
+            
+        Returns:
+            Tuple of (text, average word confidence)
+        """
+        # pytesseract writes the image to a temp file in image.format
+        # (PNG by default); an uncompressed format avoids a zlib/JPEG
+        # re-encode of every page
+        image.format = OCR_HANDOFF_FORMAT
+        
+        # Single Tesseract pass: word boxes carry both text and confidence
+        data = pytesseract.image_to_data(
+            image,
+            lang=language,
+            config=f'--psm {OCR_PSM}',
+            output_type=pytesseract.Output.DICT
+        )
+        text = self._join_ocr_words(data)
+        
+        # Get OCR confidence data
+        confidences = [float(c) for c in data['conf'] if float(c) > 0]
+        avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+        return text, avg_confidence
+    
+    def close(self) -> None:
+        """Stop the OCR thread pool and release the persistent tesserocr engines, if any"""
+        with self._apis_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+        
+        with self._apis_lock:
+            for api in self._apis:
+                api.End()
+            self._apis = []
+            self._thread_state = threading.local()
+    
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+    
+    def _join_ocr_words(self, data: Dict[str, list]) -> str:
+        """
+        Rebuild plain text from Tesseract word data
+        
+        Words on the same line are joined with spaces, lines with newlines
+        and paragraphs with a blank line, like image_to_string output.
+        
+        Args:
+            data: Output of pytesseract.image_to_data as a dict
+            
+        Returns:
+            Reconstructed text
+        """
+        lines = []
+        words = []
+        current_line = None
+        current_paragraph = None
+        
+        for block, paragraph, line, word in zip(
+            data['block_num'], data['par_num'], data['line_num'], data['text']
+        ):
+            word = word.strip() if word else ''
+            if not word:
+                continue
+            
+            if (block, paragraph, line) != current_line:
+                if words:
+                    lines.append(' '.join(words))
+                    words = []
+                if current_paragraph is not None and (block, paragraph) != current_paragraph:
+                    lines.append('')
+                current_line = (block, paragraph, line)
+                current_paragraph = (block, paragraph)
+            
+            words.append(word)
+        
+        if words:
+            lines.append(' '.join(words))
+        
+        return '\n'.join(lines)
+    
+    def _preprocess_image(self, image: "Image.Image") -> "Image.Image":
         """
         Preprocess image for better OCR results
         
@@ -106,20 +423,21 @@ class ImageParser:
         Returns:
             Preprocessed PIL Image
         """
-        # Convert to RGB if necessary
-        if image.mode not in ('RGB', 'L'):
-            image = image.convert('RGB')
-        
-        # Convert to grayscale
-        if image.mode == 'RGB':
+        # Convert to grayscale in one step (no RGB intermediate)
+        if image.mode != 'L':
             image = image.convert('L')
         
-        # Resize if too small
+        # Images that are already large enough for OCR are used as is
+        if max(image.size) >= OCR_ADEQUATE_MAX_SIDE and min(image.size) >= OCR_ADEQUATE_MIN_SIDE:
+            return image
+        
+        # Resize if too small (bicubic is markedly cheaper than Lanczos
+        # and indistinguishable for OCR when upscaling)
         min_dimension = 1000
         if min(image.size) < min_dimension:
             ratio = min_dimension / min(image.size)
             new_size = (int(image.size[0] * ratio), int(image.size[1] * ratio))
-            image = image.resize(new_size, Image.Resampling.LANCZOS)
+            image = image.resize(new_size, Image.Resampling.BICUBIC)
         
         return image
     
@@ -136,30 +454,34 @@ class ImageParser:
         if not text:
             return {}
         
+        # Locate every field keyword in one pass over the text
+        starts = self._anchor_scanner.scan(text)
+        
         return {
-            "title": self._extract_field(text, self.title_patterns),
-            "brand": self._extract_field(text, self.brand_patterns),
-            "ingredients_text": self._extract_field(text, self.ingredient_patterns),
-            "packaging": self._extract_field(text, self.packaging_patterns),
-            "origin": self._extract_field(text, self.origin_patterns),
+            "title": self._extract_field(text, self.title_patterns, starts),
+            "brand": self._extract_field(text, self.brand_patterns, starts),
+            "ingredients_text": self._extract_field(text, self.ingredient_patterns, starts),
+            "packaging": self._extract_field(text, self.packaging_patterns, starts),
+            "origin": self._extract_field(text, self.origin_patterns, starts),
         }
     
-    def _extract_field(self, text: str, patterns: list) -> Optional[str]:
+    def _extract_field(self, text: str, patterns: list, starts: Optional[Dict[Pattern, int]] = None) -> Optional[str]:
         """
         Extract a field from text using regex patterns
         
         Args:
             text: Source text
-            patterns: List of regex patterns to try
+            patterns: List of compiled regex patterns to try, in priority order
+            starts: Keyword offsets from AnchorScanner.scan (optional)
             
         Returns:
             Extracted value or None
         """
         for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+            match = self._anchor_scanner.search(pattern, text, starts)
             if match:
                 value = match.group(1).strip()
-                value = re.sub(r'\s+', ' ', value)
+                value = _WHITESPACE_RE.sub(' ', value)
                 if value:
                     return value
         return None
@@ -181,19 +503,23 @@ class ImageParser:
             image = Image.open(io.BytesIO(image_data))
             data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
             
+            # Walk Tesseract's column lists together instead of indexing
+            # each one per box; confidences may be decimal strings
             regions = []
-            n_boxes = len(data['text'])
-            
-            for i in range(n_boxes):
-                if int(data['conf'][i]) > 60:  # Filter by confidence
+            for text, conf, left, top, width, height in zip(
+                data['text'], data['conf'],
+                data['left'], data['top'], data['width'], data['height']
+            ):
+                confidence = float(conf)
+                if confidence > MIN_REGION_CONFIDENCE:  # Filter by confidence
                     regions.append({
-                        "text": data['text'][i],
-                        "confidence": int(data['conf'][i]),
+                        "text": text,
+                        "confidence": int(confidence),
                         "bbox": {
-                            "x": data['left'][i],
-                            "y": data['top'][i],
-                            "width": data['width'][i],
-                            "height": data['height'][i]
+                            "x": left,
+                            "y": top,
+                            "width": width,
+                            "height": height
                         }
                     })
             
@@ -4,8 +4,19 @@ Extracts text and structured data from PDF files
 """
 
 import io
+import logging
 import re
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Pattern, Tuple
+
+from services.field_scanner import AnchorScanner
+from services.image_parser import ImageParser, TESSERACT_AVAILABLE, OCR_BATCH_WORKERS
+from services.result_cache import ResultCache, content_key
+
+try:
+    import pypdfium2 as pdfium
+    PDFIUM_AVAILABLE = True
+except ImportError:
+    PDFIUM_AVAILABLE = False
 
 try:
     from pdfminer.high_level import extract_text
@@ -21,33 +32,78 @@ try:
 except ImportError:
     PYPDF2_AVAILABLE = False
 
+logger = logging.getLogger(__name__)
+
+# Flags shared by all field extraction patterns
+FIELD_PATTERN_FLAGS = re.IGNORECASE | re.DOTALL
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Unlabelled EAN-13 / UPC-A codes, found in a single pass
+_BARE_GTIN_RE = re.compile(r'\b(\d{12,13})\b')
+
+
+# Number of parse results kept, keyed by a hash of the PDF bytes
+PDF_CACHE_SIZE = 256
+
+# Pages with less embedded text than this are treated as scanned and OCR'ed
+MIN_PAGE_TEXT_CHARS = 20
+
+# Page render scale for OCR (1 = 72 dpi)
+OCR_RENDER_SCALE = 2
+
+# Start of the raw_text returned when a library cannot read the document
+EXTRACTION_ERROR_PREFIX = "Error extracting PDF text: "
+
+
+def _compile_patterns(patterns: List[str]) -> List[Pattern]:
+    """Compile field extraction patterns once, preserving their priority order"""
+    return [re.compile(pattern, FIELD_PATTERN_FLAGS) for pattern in patterns]
+
 
 class PDFParser:
     """Service for parsing PDF documents"""
     
-    def __init__(self):
-        self.ingredient_patterns = [
+    def __init__(self, cache_size: int = PDF_CACHE_SIZE, ocr_workers: int = OCR_BATCH_WORKERS):
+        """
+        Initialize PDFParser
+        
+        Args:
+            cache_size: Number of parse results kept for repeated uploads
+            ocr_workers: Number of threads used to OCR scanned pages
+        """
+        # Results for identical uploads (e.g. a re-submitted product sheet)
+        self._cache = ResultCache(cache_size)
+        
+        # OCR for scanned pages, created on first use
+        self._image_parser: Optional[ImageParser] = None
+        self.ocr_workers = ocr_workers
+        
+        self.ingredient_patterns = _compile_patterns([
             r'(?:ingredients?|composition|ingrédients?)\s*[:\-]?\s*(.+?)(?=\n\n|\Z)',
             r'(?:contains?|contient)\s*[:\-]?\s*(.+?)(?=\n\n|\Z)',
-        ]
-        self.title_patterns = [
+        ])
+        self.title_patterns = _compile_patterns([
             r'^([A-Z][A-Za-z\s\-]+)(?:\n|$)',
             r'(?:product|produit|name|nom)\s*[:\-]?\s*(.+?)(?:\n|$)',
-        ]
-        self.brand_patterns = [
+        ])
+        self.brand_patterns = _compile_patterns([
             r'(?:brand|marque|by|par)\s*[:\-]?\s*(.+?)(?:\n|$)',
-        ]
-        self.origin_patterns = [
+        ])
+        self.origin_patterns = _compile_patterns([
             r'(?:origin|origine|made in|fabriqué en|country)\s*[:\-]?\s*(.+?)(?:\n|$)',
-        ]
-        self.packaging_patterns = [
+        ])
+        self.packaging_patterns = _compile_patterns([
             r'(?:packaging|emballage|container)\s*[:\-]?\s*(.+?)(?:\n|$)',
-        ]
-        self.gtin_patterns = [
+        ])
+        self.gtin_patterns = _compile_patterns([
             r'(?:gtin|ean|upc|barcode)\s*[:\-]?\s*(\d{8,14})',
-            r'\b(\d{13})\b',  # EAN-13
-            r'\b(\d{12})\b',  # UPC-A
-        ]
+        ])
+        
+        # Keyword prefilter shared by all field patterns
+        self._anchor_scanner = AnchorScanner(
+            self.title_patterns + self.brand_patterns + self.ingredient_patterns +
+            self.packaging_patterns + self.origin_patterns + self.gtin_patterns
+        )
     
     def parse(self, content: bytes) -> Dict[str, Any]:
         """
@@ -59,55 +115,168 @@ class PDFParser:
         Returns:
             Dictionary with extracted fields
         """
-        raw_text = self._extract_text(content)
+        key = content_key(content)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return dict(cached)
+        
+        raw_text, complete = self._extract_text(content)
         
-        return {
-            "title": self._extract_field(raw_text, self.title_patterns),
-            "brand": self._extract_field(raw_text, self.brand_patterns),
-            "ingredients_text": self._extract_field(raw_text, self.ingredient_patterns),
-            "packaging": self._extract_field(raw_text, self.packaging_patterns),
-            "origin": self._extract_field(raw_text, self.origin_patterns),
-            "gtin": self._extract_field(raw_text, self.gtin_patterns),
+        # Locate every field keyword in one pass over the text
+        starts = self._anchor_scanner.scan(raw_text)
+        
+        result = {
+            "title": self._extract_field(raw_text, self.title_patterns, starts),
+            "brand": self._extract_field(raw_text, self.brand_patterns, starts),
+            "ingredients_text": self._extract_field(raw_text, self.ingredient_patterns, starts),
+            "packaging": self._extract_field(raw_text, self.packaging_patterns, starts),
+            "origin": self._extract_field(raw_text, self.origin_patterns, starts),
+            "gtin": (
+                self._extract_field(raw_text, self.gtin_patterns, starts)
+                or self._find_bare_gtin(raw_text)
+            ),
             "raw_text": raw_text
         }
+        # Failed extractions may succeed on retry, so only cache complete ones
+        if complete:
+            self._cache.put(key, result)
+        return dict(result)
     
-    def _extract_text(self, content: bytes) -> str:
-        """Extract raw text from PDF using available library"""
+    def _extract_text(self, content: bytes) -> Tuple[str, bool]:
+        """
+        Extract raw text from PDF using available library
+        
+        Args:
+            content: Raw PDF file bytes
+            
+        Returns:
+            Tuple of (text or error message, whether extraction fully succeeded)
+        """
+        # Fastest library first; the others are fallbacks for documents it can't read
+        extractors = []
+        if PDFIUM_AVAILABLE:
+            extractors.append(self._extract_with_pdfium)
         if PDF_MINER_AVAILABLE:
-            return self._extract_with_pdfminer(content)
-        elif PYPDF2_AVAILABLE:
-            return self._extract_with_pypdf2(content)
-        else:
-            # TODO: Implement fallback or raise appropriate error
-            raise RuntimeError("No PDF parsing library available. Install pdfminer.six or PyPDF2")
+            extractors.append(self._extract_with_pdfminer)
+        if PYPDF2_AVAILABLE:
+            extractors.append(self._extract_with_pypdf2)
+        if not extractors:
+            raise RuntimeError("No PDF parsing library available. Install pypdfium2, pdfminer.six or PyPDF2")
+        
+        for extract in extractors:
+            text, complete = extract(content)
+            if not text.startswith(EXTRACTION_ERROR_PREFIX):
+                break
+        return text, complete
+    
+    def _extract_with_pdfium(self, content: bytes) -> Tuple[str, bool]:
+        """Extract text using PDFium (native, much faster than pdfminer)"""
+        try:
+            pdf = pdfium.PdfDocument(content)
+        except Exception as e:
+            logger.error(f"PDFium could not open document: {e}")
+            return f"{EXTRACTION_ERROR_PREFIX}{str(e)}", False
+        
+        try:
+            text_parts = []
+            for page in pdf:
+                textpage = page.get_textpage()
+                # PDFium uses CRLF line endings; field patterns expect LF
+                text_parts.append(textpage.get_text_range().replace("\r\n", "\n"))
+                textpage.close()
+                page.close()
+            
+            # Pages without a text layer are scans: OCR them instead
+            scanned = [
+                index for index, text in enumerate(text_parts)
+                if len(text.strip()) < MIN_PAGE_TEXT_CHARS
+            ]
+            complete = True
+            if scanned and TESSERACT_AVAILABLE:
+                for index, text in zip(scanned, self._ocr_pages(pdf, scanned)):
+                    if text is None:
+                        complete = False
+                    elif text:
+                        text_parts[index] = text
+            
+            return "\n\n".join(text_parts), complete
+        except Exception as e:
+            logger.error(f"PDFium text extraction failed: {e}")
+            return f"{EXTRACTION_ERROR_PREFIX}{str(e)}", False
+        finally:
+            pdf.close()
+    
+    def _ocr_pages(self, pdf: "pdfium.PdfDocument", page_indexes: List[int]) -> List[Optional[str]]:
+        """
+        Render pages and OCR them in parallel
+        
+        Args:
+            pdf: Open PDFium document
+            page_indexes: Indexes of the pages to OCR
+            
+        Returns:
+            OCR text for each page (None where OCR failed), in the same order
+        """
+        images = []
+        for index in page_indexes:
+            page = pdf[index]
+            bitmap = page.render(scale=OCR_RENDER_SCALE, grayscale=True)
+            images.append(bitmap.to_pil())
+            bitmap.close()
+            page.close()
+        
+        if self._image_parser is None:
+            self._image_parser = ImageParser(batch_workers=self.ocr_workers)
+        results = self._image_parser.extract_text_batch(images)
+        return [
+            None if "error" in result else result.get("text", "")
+            for result in results
+        ]
     
-    def _extract_with_pdfminer(self, content: bytes) -> str:
+    def _extract_with_pdfminer(self, content: bytes) -> Tuple[str, bool]:
         """Extract text using pdfminer"""
         try:
-            return extract_text(io.BytesIO(content))
+            return extract_text(io.BytesIO(content)), True
         except Exception as e:
             # TODO: Add proper logging
-            return f"Error extracting PDF text: {str(e)}"
+            return f"{EXTRACTION_ERROR_PREFIX}{str(e)}", False
     
-    def _extract_with_pypdf2(self, content: bytes) -> str:
+    def _extract_with_pypdf2(self, content: bytes) -> Tuple[str, bool]:
         """Extract text using PyPDF2"""
         try:
             reader = PyPDF2.PdfReader(io.BytesIO(content))
-            text_parts = []
-            for page in reader.pages:
-                text_parts.append(page.extract_text() or "")
-            return "\n".join(text_parts)
+            return "\n".join(page.extract_text() or "" for page in reader.pages), True
         except Exception as e:
             # TODO: Add proper logging
-            return f"Error extracting PDF text: {str(e)}"
+            return f"{EXTRACTION_ERROR_PREFIX}{str(e)}", False
+    
+    def _find_bare_gtin(self, text: str) -> Optional[str]:
+        """
+        Find an unlabelled GTIN, preferring EAN-13 over UPC-A
+        
+        Args:
+            text: Source text
+            
+        Returns:
+            First 13-digit code, else first 12-digit code, else None
+        """
+        upc = None
+        for match in _BARE_GTIN_RE.finditer(text):
+            code = match.group(1)
+            if len(code) == 13:
+                return code
+            if upc is None:
+                upc = code
+        return upc
     
-    def _extract_field(self, text: str, patterns: list) -> Optional[str]:
+    def _extract_field(self, text: str, patterns: list, starts: Optional[Dict[Pattern, int]] = None) -> Optional[str]:
         """
         Extract a field from text using regex patterns
         
         Args:
             text: Source text
-            patterns: List of regex patterns to try
+            patterns: List of compiled regex patterns to try, in priority order
+            starts: Keyword offsets from AnchorScanner.scan (optional)
             
         Returns:
             Extracted value or None
@@ -116,11 +285,11 @@ class PDFParser:
             return None
             
         for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
+            match = self._anchor_scanner.search(pattern, text, starts)
             if match:
                 value = match.group(1).strip()
                 # Clean up the value
-                value = re.sub(r'\s+', ' ', value)
+                value = _WHITESPACE_RE.sub(' ', value)
                 if value:
                     return value
         return None
@@ -3,12 +3,30 @@ Product Lookup Service
 Fetches product information from external databases using GTIN/barcode
 """
 
+import asyncio
 import httpx
-from typing import Dict, Any, Optional
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, List
 import logging
 
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
 logger = logging.getLogger(__name__)
 
+# Patterns used to normalize OpenFoodFacts packaging and quantity fields
+_LANG_PREFIX_RE = re.compile(r'\b(?:en|fr|de|es|it|nl|pt):')
+_LEADING_LANG_PREFIX_RE = re.compile(r'^(?:en|fr|de|es|it|nl|pt):')
+_COMMA_RE = re.compile(r'\s*,\s*')
+_WHITESPACE_RE = re.compile(r'\s+')
+_WEIGHT_RE = re.compile(r'^([\d.,]+)\s*(g|gr|gram|grams|kg|kilogram|ml|l|cl|litre|liter)?$')
+
 
 class ProductLookupService:
     """Service for looking up product information from external APIs"""
@@ -17,17 +35,66 @@ class ProductLookupService:
     OPENFOODFACTS_API = "https://world.openfoodfacts.org/api/v2/product"
     OPENFOODFACTS_SEARCH = "https://world.openfoodfacts.org/cgi/search.pl"
     
-    def __init__(self, timeout: int = 10):
+    # Product fields read by the _get_* helpers; requesting only these keeps
+    # OpenFoodFacts responses a fraction of the full product document
+    OPENFOODFACTS_FIELDS = ",".join([
+        "product_name", "product_name_en", "product_name_fr", "generic_name",
+        "abbreviated_product_name", "brands",
+        "ingredients_text", "ingredients_text_en", "ingredients_text_fr",
+        "packaging", "packaging_tags",
+        "origins", "manufacturing_places", "countries",
+        "categories", "labels", "image_url",
+        "nutriscore_grade", "ecoscore_grade",
+        "product_quantity", "product_quantity_unit", "quantity", "net_weight_value",
+        "serving_size", "data_quality_tags",
+    ])
+    
+    # Maximum number of concurrent external lookups in lookup_by_gtins
+    MAX_CONCURRENT_LOOKUPS = 20
+    
+    def __init__(self, timeout: int = 10, cache_size: int = 4096, cache_ttl: float = 3600):
         """
         Initialize ProductLookupService
         
         Args:
             timeout: Request timeout in seconds
+            cache_size: Maximum number of GTIN lookups kept in memory
+            cache_ttl: Seconds a cached lookup stays valid
         """
         self.timeout = timeout
         self.headers = {
             "User-Agent": "EcoLabel-MS - Product Scanner - Version 1.0"
         }
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        # GTIN -> (expiry timestamp, product data), in LRU order
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # GTIN -> in-flight lookup shared by concurrent callers
+        self._inflight: Dict[str, "asyncio.Task"] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Shared HTTP client, created on first use
+        
+        Reusing one client keeps connections (DNS, TCP, TLS) alive across
+        lookups, and HTTP/2 lets concurrent lookups share a connection.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                timeout=self.timeout,
+                headers=self.headers,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+            )
+        return self._client
+    
+    async def aclose(self) -> None:
+        """Close the shared HTTP client"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def lookup_by_gtin(self, gtin: str) -> Optional[Dict[str, Any]]:
         """
@@ -42,16 +109,69 @@ class ProductLookupService:
         # Clean GTIN (remove spaces, hyphens)
         gtin_clean = gtin.replace(" ", "").replace("-", "")
         
-        # Try OpenFoodFacts first
-        result = await self._lookup_openfoodfacts(gtin_clean)
+        # Serve repeated lookups from the in-process cache
+        cached = self._get_from_cache(gtin_clean)
+        if cached is not None:
+            return cached
+        
+        # Coalesce concurrent lookups of the same GTIN into one request
+        task = self._inflight.get(gtin_clean)
+        if task is None:
+            # Try OpenFoodFacts first
+            task = asyncio.ensure_future(self._lookup_openfoodfacts(gtin_clean))
+            self._inflight[gtin_clean] = task
+            task.add_done_callback(lambda _: self._inflight.pop(gtin_clean, None))
+        
+        # Shield so a cancelled caller doesn't cancel the lookup for the others
+        result = await asyncio.shield(task)
         
         if result:
-            return result
+            self._store_in_cache(gtin_clean, result)
+            return dict(result)
         
         # Could add more APIs here (GS1, other databases)
         logger.warning(f"No product found for GTIN: {gtin}")
         return None
     
+    async def lookup_by_gtins(self, gtins: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Look up several GTINs concurrently
+        
+        Args:
+            gtins: Product GTIN/EAN/UPC codes
+            
+        Returns:
+            Lookup results (or None) in the same order as gtins
+        """
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_LOOKUPS)
+        
+        async def lookup_one(gtin: str) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await self.lookup_by_gtin(gtin)
+        
+        return await asyncio.gather(*(lookup_one(gtin) for gtin in gtins))
+    
+    def _get_from_cache(self, gtin: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of a cached lookup, or None if missing or expired"""
+        entry = self._cache.get(gtin)
+        if entry is None:
+            return None
+        
+        expires_at, result = entry
+        if expires_at <= time.monotonic():
+            del self._cache[gtin]
+            return None
+        
+        self._cache.move_to_end(gtin)
+        return dict(result)
+    
+    def _store_in_cache(self, gtin: str, result: Dict[str, Any]) -> None:
+        """Store a successful lookup, evicting the least recently used entry"""
+        self._cache[gtin] = (time.monotonic() + self.cache_ttl, dict(result))
+        self._cache.move_to_end(gtin)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
     async def _lookup_openfoodfacts(self, gtin: str) -> Optional[Dict[str, Any]]:
         """
         Look up product in OpenFoodFacts database
@@ -63,47 +183,46 @@ class ProductLookupService:
             Normalized product data or None
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    f"{self.OPENFOODFACTS_API}/{gtin}",
-                    headers=self.headers
-                )
-                
-                if response.status_code != 200:
-                    logger.debug(f"OpenFoodFacts returned {response.status_code} for GTIN {gtin}")
-                    return None
-                
-                data = response.json()
-                
-                # Check if product was found
-                if data.get("status") != 1 or not data.get("product"):
-                    logger.debug(f"Product not found in OpenFoodFacts: {gtin}")
-                    return None
-                
-                product = data["product"]
-                
-                # Extract and normalize product information
-                result = {
-                    "title": self._get_product_name(product),
-                    "brand": self._get_brand(product),
-                    "ingredients_text": self._get_ingredients(product),
-                    "packaging": self._get_packaging(product),
-                    "origin": self._get_origin(product),
-                    "gtin": gtin,
-                    "categories": product.get("categories", ""),
-                    "labels": product.get("labels", ""),
-                    "image_url": product.get("image_url"),
-                    "nutriscore": product.get("nutriscore_grade"),
-                    "ecoscore": product.get("ecoscore_grade"),
-                    "weight_g": self._get_weight(product),
-                    "serving_size": product.get("serving_size"),
-                    "source": "OpenFoodFacts",
-                    "data_quality": product.get("data_quality_tags", [])
-                }
-                
-                logger.info(f"Found product in OpenFoodFacts: {result['title']} ({gtin})")
-                return result
-                
+            response = await self.client.get(
+                f"{self.OPENFOODFACTS_API}/{gtin}",
+                params={"fields": self.OPENFOODFACTS_FIELDS}
+            )
+            
+            if response.status_code != 200:
+                logger.debug(f"OpenFoodFacts returned {response.status_code} for GTIN {gtin}")
+                return None
+            
+            data = json_loads(response.content)
+            
+            # Check if product was found
+            if data.get("status") != 1 or not data.get("product"):
+                logger.debug(f"Product not found in OpenFoodFacts: {gtin}")
+                return None
+            
+            product = data["product"]
+            
+            # Extract and normalize product information
+            result = {
+                "title": self._get_product_name(product),
+                "brand": self._get_brand(product),
+                "ingredients_text": self._get_ingredients(product),
+                "packaging": self._get_packaging(product),
+                "origin": self._get_origin(product),
+                "gtin": gtin,
+                "categories": product.get("categories", ""),
+                "labels": product.get("labels", ""),
+                "image_url": product.get("image_url"),
+                "nutriscore": product.get("nutriscore_grade"),
+                "ecoscore": product.get("ecoscore_grade"),
+                "weight_g": self._get_weight(product),
+                "serving_size": product.get("serving_size"),
+                "source": "OpenFoodFacts",
+                "data_quality": product.get("data_quality_tags", [])
+            }
+            
+            logger.info(f"Found product in OpenFoodFacts: {result['title']} ({gtin})")
+            return result
+            
         except httpx.TimeoutException:
             logger.warning(f"Timeout looking up product {gtin} in OpenFoodFacts")
             return None
@@ -148,22 +267,20 @@ class ProductLookupService:
             # Clean up language prefixes (en:, fr:, etc.)
             cleaned = packaging.strip()
             # Remove language codes like "en:", "fr:", etc.
-            import re
-            cleaned = re.sub(r'\b(?:en|fr|de|es|it|nl|pt):', '', cleaned)
+            cleaned = _LANG_PREFIX_RE.sub('', cleaned)
             # Clean up extra spaces and commas
-            cleaned = re.sub(r'\s*,\s*', ', ', cleaned)
-            cleaned = re.sub(r'\s+', ' ', cleaned)
+            cleaned = _COMMA_RE.sub(', ', cleaned)
+            cleaned = _WHITESPACE_RE.sub(' ', cleaned)
             return cleaned.strip()
         
         # Alternative: packaging_tags
         packaging_tags = product.get("packaging_tags", [])
         if packaging_tags:
             # Clean each tag
-            import re
             cleaned_tags = []
             for tag in packaging_tags:
                 # Remove language prefixes
-                cleaned = re.sub(r'^(?:en|fr|de|es|it|nl|pt):', '', str(tag))
+                cleaned = _LEADING_LANG_PREFIX_RE.sub('', str(tag))
                 cleaned = cleaned.strip()
                 if cleaned:
                     cleaned_tags.append(cleaned)
@@ -187,10 +304,10 @@ class ProductLookupService:
     
     def _get_weight(self, product: dict) -> Optional[float]:
         """Extract product weight in grams from OpenFoodFacts data"""
-        import re
-        
         # Try product_quantity first (e.g., "400 g", "1 kg", "500ml")
         quantity = product.get("product_quantity")
+        if isinstance(quantity, (int, float)) and quantity:
+            return float(quantity)
         if quantity:
             try:
                 return float(quantity)  # Usually in grams
@@ -202,8 +319,12 @@ class ProductLookupService:
         if quantity_str:
             quantity_str = str(quantity_str).lower().strip()
             
+            # Bare number: grams, no unit to parse
+            if quantity_str.isdigit():
+                return float(quantity_str)
+            
             # Parse "400 g", "400g", "1 kg", "1kg", "500 ml", etc.
-            match = re.match(r'^([\d.,]+)\s*(g|gr|gram|grams|kg|kilogram|ml|l|cl|litre|liter)?$', quantity_str)
+            match = _WEIGHT_RE.match(quantity_str)
             if match:
                 value = float(match.group(1).replace(',', '.'))
                 unit = match.group(2) or 'g'
@@ -242,34 +363,32 @@ class ProductLookupService:
             List of matching products
         """
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(
-                    self.OPENFOODFACTS_SEARCH,
-                    params={
-                        "search_terms": query,
-                        "json": 1,
-                        "page_size": limit,
-                        "fields": "product_name,brands,code,image_url"
-                    },
-                    headers=self.headers
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    products = data.get("products", [])
-                    
-                    return [
-                        {
-                            "title": p.get("product_name"),
-                            "brand": p.get("brands"),
-                            "gtin": p.get("code"),
-                            "image_url": p.get("image_url")
-                        }
-                        for p in products
-                    ]
-                
-                return []
+            response = await self.client.get(
+                self.OPENFOODFACTS_SEARCH,
+                params={
+                    "search_terms": query,
+                    "json": 1,
+                    "page_size": limit,
+                    "fields": "product_name,brands,code,image_url"
+                }
+            )
+            
+            if response.status_code == 200:
+                data = json_loads(response.content)
+                products = data.get("products", [])
                 
+                return [
+                    {
+                        "title": p.get("product_name"),
+                        "brand": p.get("brands"),
+                        "gtin": p.get("code"),
+                        "image_url": p.get("image_url")
+                    }
+                    for p in products
+                ]
+            
+            return []
+            
         except Exception as e:
             logger.error(f"Error searching products: {str(e)}")
             return []
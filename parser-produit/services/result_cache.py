@@ -0,0 +1,65 @@
+"""
+Result Cache
+Thread-safe LRU cache for parse results, keyed by a hash of the input bytes
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+try:
+    from blake3 import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    BLAKE3_AVAILABLE = False
+
+
+def content_key(content: bytes) -> str:
+    """
+    Hash raw input bytes into a cache key
+    
+    Args:
+        content: Raw file bytes
+        
+    Returns:
+        Hex digest (blake3, or blake2b when blake3 is not installed)
+    """
+    if BLAKE3_AVAILABLE:
+        return blake3(content).hexdigest()
+    return hashlib.blake2b(content, digest_size=32).hexdigest()
+
+
+class ResultCache:
+    """LRU cache of parse results with an explicit maximum size"""
+    
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Get a cached result, or None on a miss"""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+    
+    def put(self, key: str, value: Any) -> None:
+        """Store a result, evicting the least recently used one if full"""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Drop every cached result"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
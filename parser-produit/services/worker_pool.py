@@ -0,0 +1,147 @@
+"""
+Parser Worker Pool
+Runs CPU-bound parsing (PDF, HTML, OCR, barcodes) in pre-warmed worker processes
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, Tuple
+
+from services.image_parser import IMAGE_DECODE_ERRORS
+from services.result_cache import ResultCache, content_key
+
+logger = logging.getLogger(__name__)
+
+# Number of worker processes (defaults to one per CPU)
+PARSER_WORKERS = max(int(os.getenv("PARSER_WORKERS", str(os.cpu_count() or 1))), 1)
+
+# OCR threads per worker process, so all workers together use about one per CPU
+WORKER_OCR_THREADS = max(1, (os.cpu_count() or 1) // PARSER_WORKERS)
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+# Per-process parser instances, created once by _init_worker
+_pdf_parser = None
+_html_parser = None
+_image_parser = None
+_barcode_reader = None
+_image_cache = None
+
+
+def _init_worker() -> None:
+    """Import parsing libraries and build parser instances once per worker"""
+    global _pdf_parser, _html_parser, _image_parser, _barcode_reader, _image_cache
+
+    from services.pdf_parser import PDFParser
+    from services.html_parser import HTMLParser
+    from services.image_parser import ImageParser
+    from services.barcode_reader import BarcodeReader
+
+    _pdf_parser = PDFParser(ocr_workers=WORKER_OCR_THREADS)
+    _html_parser = HTMLParser()
+    _image_parser = ImageParser(batch_workers=WORKER_OCR_THREADS)
+    _barcode_reader = BarcodeReader()
+    _image_cache = ResultCache()
+
+
+def _warmup() -> int:
+    """No-op task used to force worker processes to start"""
+    return os.getpid()
+
+
+def _parse_pdf(content: bytes) -> Dict[str, Any]:
+    return _pdf_parser.parse(content)
+
+
+def _parse_html(html_content: str) -> Dict[str, Any]:
+    return _html_parser.parse(html_content)
+
+
+def _parse_image(content: bytes) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    # Identical uploads skip decoding, OCR and barcode detection entirely
+    key = content_key(content)
+    cached = _image_cache.get(key)
+    if cached is not None:
+        return cached
+
+    # Decode once and share the pixels between OCR and barcode detection
+    try:
+        image = _image_parser.decode_image(content)
+    except IMAGE_DECODE_ERRORS as e:
+        # Corrupt or truncated upload: no text and no barcode, and nothing cached
+        return {"text": "", "error": str(e), "confidence": 0}, None
+    result = (_image_parser.extract_text(image), _barcode_reader.read_barcode(image))
+    if "error" not in result[0]:
+        _image_cache.put(key, result)
+    return result
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Get the shared process pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=PARSER_WORKERS,
+            initializer=_init_worker
+        )
+    return _executor
+
+
+def start() -> None:
+    """Create the pool and start every worker so the first requests don't pay init cost"""
+    executor = get_executor()
+    futures = [executor.submit(_warmup) for _ in range(PARSER_WORKERS)]
+    pids = {future.result() for future in futures}
+    logger.info(f"Parser worker pool ready ({len(pids)} processes)")
+
+
+def shutdown() -> None:
+    """Shut down the pool"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
+
+
+def _discard_executor(executor: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next get_executor() builds a fresh one"""
+    global _executor
+    # Concurrent callers may already have replaced it
+    if _executor is executor:
+        _executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def _run(func, *args):
+    loop = asyncio.get_running_loop()
+    executor = get_executor()
+    try:
+        return await loop.run_in_executor(executor, func, *args)
+    except BrokenProcessPool:
+        # A worker died (OOM, native crash in OCR); replace the pool and retry once
+        logger.warning("Parser worker pool is broken, starting a new one")
+        _discard_executor(executor)
+        return await loop.run_in_executor(get_executor(), func, *args)
+
+
+async def parse_pdf(content: bytes) -> Dict[str, Any]:
+    """Parse PDF bytes in a worker process"""
+    return await _run(_parse_pdf, content)
+
+
+async def parse_html(html_content: str) -> Dict[str, Any]:
+    """Parse an HTML document in a worker process"""
+    return await _run(_parse_html, html_content)
+
+
+async def parse_image(content: bytes) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Run OCR and barcode detection on image bytes in a worker process
+
+    Returns:
+        Tuple of (OCR data, barcode data or None)
+    """
+    return await _run(_parse_image, content)
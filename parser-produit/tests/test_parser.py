@@ -1,36 +1,32 @@
 """
 Tests for parser-produit microservice
 """
+import asyncio
+import types
 import pytest
-from fastapi.testclient import TestClient
-import sys
-import os
-import io
 
-# Add parent directory to path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from main import app
-
-client = TestClient(app)
-
-
-def test_health_check():
-    """Test health check endpoint"""
-    response = client.get("/health")
-    assert response.status_code == 200
-    data = response.json()
-    assert data["status"] == "healthy"
-    assert data["service"] == "parser-produit"
+# Requests rejected before any parsing: (method, path, expected status codes)
+BAD_INPUTS = [
+    # Parse endpoints without files: Unprocessable Entity
+    ("POST", "/product/parse", {422}),
+    ("POST", "/product/parse/batch", {422}),
+    # Should return error for invalid GTIN
+    ("GET", "/product/gtin/invalid", {400, 404}),
+]
 
 
-def test_parse_endpoint_no_file():
-    """Test parse endpoint without file"""
-    response = client.post("/product/parse")
-    assert response.status_code == 422  # Unprocessable Entity
+@pytest.mark.anyio
+async def test_bad_inputs(async_client):
+    """Test invalid requests are rejected (independent, run concurrently)"""
+    responses = await asyncio.gather(*(
+        async_client.request(method, path) for method, path, _ in BAD_INPUTS
+    ))
+    for (method, path, expected), response in zip(BAD_INPUTS, responses):
+        assert response.status_code in expected, f"{method} {path}"
 
 
-def test_parse_endpoint_with_text_file():
+def test_parse_endpoint_with_text_file(client):
     """Test parse endpoint with simple text file"""
     files = {"file": ("test.txt", b"Test product data", "text/plain")}
     response = client.post("/product/parse", files=files)
@@ -38,13 +34,7 @@ def test_parse_endpoint_with_text_file():
     assert response.status_code in [200, 400, 422]
 
 
-def test_batch_parse_endpoint_no_files():
-    """Test batch parse endpoint without files"""
-    response = client.post("/product/parse/batch")
-    assert response.status_code == 422  # Unprocessable Entity
-
-
-def test_batch_parse_endpoint_with_files():
+def test_batch_parse_endpoint_with_files(client):
     """Test batch parse endpoint with multiple files"""
     files = [
         ("files", ("test1.txt", b"Product 1 GTIN: 1234567890123", "text/plain")),
@@ -60,7 +50,7 @@ def test_batch_parse_endpoint_with_files():
     assert isinstance(data["errors"], list)
 
 
-def test_gtin_search_endpoint():
+def test_gtin_search_endpoint(client):
     """Test GTIN search endpoint"""
     # Test with valid GTIN format
     response = client.get("/product/gtin/1234567890123")
@@ -68,14 +58,7 @@ def test_gtin_search_endpoint():
     assert response.status_code in [200, 404]
 
 
-def test_gtin_search_invalid():
-    """Test GTIN search with invalid format"""
-    response = client.get("/product/gtin/invalid")
-    # Should return error for invalid GTIN
-    assert response.status_code in [400, 404]
-
-
-def test_stats_endpoint():
+def test_stats_endpoint(client):
     """Test statistics endpoint"""
     response = client.get("/product/stats")
     assert response.status_code == 200
@@ -87,19 +70,272 @@ def test_stats_endpoint():
     assert isinstance(data["total_products"], int)
 
 
-def test_api_docs():
-    """Test API documentation is available"""
-    response = client.get("/docs")
+@pytest.mark.anyio
+async def test_service_endpoints(async_client):
+    """Test health check, API docs and OpenAPI schema (run concurrently)"""
+    health, docs, redirect, schema = await asyncio.gather(
+        async_client.get("/health"),
+        async_client.get("/docs"),
+        async_client.get("/docs/oauth2-redirect"),
+        async_client.get("/openapi.json"),
+    )
+    
+    assert health.status_code == 200
+    data = health.json()
+    assert data["status"] == "healthy"
+    assert data["service"] == "parser-produit"
+    
+    assert docs.status_code == 200
+    assert "/docs/oauth2-redirect" in docs.text
+    
+    assert redirect.status_code == 200
+    assert "oauth2" in redirect.text.lower()
+    
+    assert schema.status_code == 200
+    data = schema.json()
+    assert "info" in data
+    assert data["info"]["title"] == "Parser-Produit Service"
+
+
+
+def test_failed_pdf_extraction_not_cached():
+    """Test a PDF that fails to extract is retried instead of served from cache"""
+    from services.pdf_parser import PDFParser
+    from services.result_cache import content_key
+    
+    parser = PDFParser()
+    content = b"not a pdf"
+    result = parser.parse(content)
+    
+    assert result["raw_text"].startswith("Error extracting PDF text")
+    assert parser._cache.get(content_key(content)) is None
+
+
+def _minimal_pdf(text: str) -> bytes:
+    """Build a one-page PDF showing text in Helvetica"""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+    ]
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return pdf
+
+
+def test_pdf_falls_back_when_pdfium_fails(monkeypatch):
+    """Test a PDF PDFium cannot open is extracted by pdfminer instead"""
+    from services import pdf_parser
+    
+    if not (pdf_parser.PDFIUM_AVAILABLE and pdf_parser.PDF_MINER_AVAILABLE):
+        pytest.skip("needs pypdfium2 and pdfminer.six")
+    
+    def broken_document(content):
+        raise RuntimeError("PDFium failure")
+    
+    monkeypatch.setattr(pdf_parser.pdfium, "PdfDocument", broken_document)
+    
+    result = pdf_parser.PDFParser().parse(_minimal_pdf("Brand: Fallback Foods"))
+    
+    assert not result["raw_text"].startswith(pdf_parser.EXTRACTION_ERROR_PREFIX)
+    assert result["brand"] == "Fallback Foods"
+
+
+class _StubTessAPI:
+    """Stand-in for tesserocr.PyTessBaseAPI that records live engines"""
+    live = 0
+    
+    def __init__(self, lang, psm):
+        _StubTessAPI.live += 1
+    
+    def SetImageBytes(self, *args):
+        pass
+    
+    def GetUTF8Text(self):
+        return "Ingredients: sugar"
+    
+    def MeanTextConf(self):
+        return 90
+    
+    def Clear(self):
+        pass
+    
+    def End(self):
+        _StubTessAPI.live -= 1
+
+
+def test_ocr_batch_reuses_engines(monkeypatch):
+    """Test repeated OCR batches (as for scanned PDF pages) don't create new engines"""
+    Image = pytest.importorskip("PIL.Image")
+    from services import image_parser
+    
+    monkeypatch.setattr(image_parser, "TESSERACT_AVAILABLE", True)
+    monkeypatch.setattr(image_parser, "TESSEROCR_AVAILABLE", True)
+    monkeypatch.setattr(image_parser, "LANGDETECT_AVAILABLE", False)
+    monkeypatch.setattr(image_parser, "PyTessBaseAPI", _StubTessAPI, raising=False)
+    monkeypatch.setattr(image_parser, "PSM", types.SimpleNamespace(SINGLE_BLOCK=6), raising=False)
+    
+    parser = image_parser.ImageParser(batch_workers=2)
+    pages = [Image.new("L", (64, 64)) for _ in range(4)]
+    
+    first = parser.extract_text_batch(pages)
+    engines = _StubTessAPI.live
+    second = parser.extract_text_batch(pages)
+    
+    assert [r["text"] for r in first + second] == ["Ingredients: sugar"] * 8
+    assert 1 <= engines <= 2
+    assert _StubTessAPI.live == engines
+    
+    parser.close()
+    assert _StubTessAPI.live == 0
+
+
+def _worker_ocr_pool_sizes():
+    """Report the OCR pool sizes configured in the current worker process"""
+    from services import worker_pool
+    return worker_pool._pdf_parser.ocr_workers, worker_pool._image_parser._batch_workers
+
+
+def test_worker_ocr_pool_is_split_across_processes(monkeypatch):
+    """Test worker processes share the CPUs for OCR instead of each using all of them"""
+    import multiprocessing
+    import os
+    from concurrent.futures import ProcessPoolExecutor
+    from services import worker_pool
+    
+    expected = max(1, (os.cpu_count() or 1) // worker_pool.PARSER_WORKERS)
+    assert worker_pool.WORKER_OCR_THREADS == expected
+    
+    # A sentinel size (inherited by the forked worker) proves the initializer uses it
+    monkeypatch.setattr(worker_pool, "WORKER_OCR_THREADS", 3)
+    with ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=worker_pool._init_worker
+    ) as executor:
+        sizes = executor.submit(_worker_ocr_pool_sizes).result()
+    
+    assert sizes == (3, 3)
+
+
+def test_worker_pool_recovers_from_dead_worker(client):
+    """Test a killed worker process doesn't leave the pool broken for later requests"""
+    import os
+    import signal
+    import time
+    from services import worker_pool
+    
+    broken = worker_pool.get_executor()
+    for pid in list(broken._processes):
+        os.kill(pid, signal.SIGKILL)
+    
+    # Wait until the pool has noticed the dead workers
+    deadline = time.monotonic() + 10
+    while not broken._broken and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert broken._broken
+    
+    result = asyncio.run(worker_pool.parse_html("<html><head><title>Oat drink</title></head></html>"))
+    assert isinstance(result, dict)
+    assert worker_pool.get_executor() is not broken
+    
+    response = client.post(
+        "/product/parse",
+        files={"file": ("page.html", b"<html><h1>Oat drink</h1></html>", "text/html")}
+    )
     assert response.status_code == 200
 
 
-def test_openapi_schema():
-    """Test OpenAPI schema is valid"""
-    response = client.get("/openapi.json")
+
+def test_batch_insert_failure_isolated_per_file(client, monkeypatch):
+    """Test one row the database rejects doesn't fail the rest of the batch"""
+    from routes import parse_routes
+    
+    def failing_bulk(db, products):
+        raise RuntimeError("constraint violation")
+    
+    store_one = parse_routes.create_parsed_product
+    
+    def rejecting_create(db, product):
+        if product.filename == "bad.html":
+            raise RuntimeError("constraint violation")
+        return store_one(db, product)
+    
+    monkeypatch.setattr(parse_routes, "create_parsed_products_bulk", failing_bulk)
+    monkeypatch.setattr(parse_routes, "create_parsed_product", rejecting_create)
+    
+    response = client.post("/product/parse/batch", files=[
+        ("files", (name, b"<html><h1>Oat drink</h1></html>", "text/html"))
+        for name in ("first.html", "bad.html", "last.html")
+    ])
     assert response.status_code == 200
     data = response.json()
-    assert "info" in data
-    assert data["info"]["title"] == "Parser-Produit Service"
+    assert [result["filename"] for result in data["results"]] == ["first.html", "last.html"]
+    assert [error["filename"] for error in data["errors"]] == ["bad.html"]
+    
+    for result in data["results"]:
+        assert client.get(f"/product/parsed/{result['id']}").status_code == 200
+
+
+def _truncated_png() -> bytes:
+    """A PNG whose pixel data is cut off halfway"""
+    import io
+    from PIL import Image
+    
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), "white").save(buffer, format="PNG")
+    data = buffer.getvalue()
+    return data[:len(data) // 2]
+
+
+def test_corrupt_image_upload_is_not_an_error(client):
+    """Test an undecodable image parses to empty OCR text instead of failing"""
+    pytest.importorskip("PIL")
+    
+    response = client.post(
+        "/product/parse",
+        files={"file": ("label.png", _truncated_png(), "image/png")}
+    )
+    assert response.status_code == 200
+    assert response.json()["raw_text"] == ""
+    
+    response = client.post(
+        "/product/parse/batch",
+        files=[("files", ("label.png", _truncated_png(), "image/png"))]
+    )
+    assert response.status_code == 200
+    assert response.json()["errors"] == []
+
+
+def test_corrupt_image_result_not_cached(monkeypatch):
+    """Test the empty result for an undecodable image is returned but not cached"""
+    pytest.importorskip("PIL")
+    from services import worker_pool
+    from services.barcode_reader import BarcodeReader
+    from services.image_parser import ImageParser
+    from services.result_cache import ResultCache, content_key
+    
+    monkeypatch.setattr(worker_pool, "_image_parser", ImageParser())
+    monkeypatch.setattr(worker_pool, "_barcode_reader", BarcodeReader())
+    monkeypatch.setattr(worker_pool, "_image_cache", ResultCache())
+    
+    content = _truncated_png()
+    ocr_data, barcode_data = worker_pool._parse_image(content)
+    assert ocr_data["text"] == ""
+    assert "error" in ocr_data
+    assert barcode_data is None
+    assert worker_pool._image_cache.get(content_key(content)) is None
 
 
 if __name__ == "__main__":
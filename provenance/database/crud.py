@@ -3,33 +3,77 @@ CRUD Operations for Provenance Service
 """
 
 import hashlib
-import json
-from sqlalchemy.orm import Session
+import orjson
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 from models.provenance import ProvenanceRecordDB, DatasetVersionDB
 
 
-def compute_data_hash(data: dict) -> str:
-    """Compute hash of provenance data for integrity"""
-    serialized = json.dumps(data, sort_keys=True)
-    return hashlib.sha256(serialized.encode()).hexdigest()
+def compute_data_hash(data: dict) -> bytes:
+    """Compute hash of provenance data for integrity (raw SHA-256 digest)"""
+    serialized = orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+    return hashlib.sha256(serialized).digest()
 
 
-def get_provenance_by_score_id(
-    db: Session,
+async def get_provenance_by_score_id(
+    db: AsyncSession,
     score_id: str
 ) -> Optional[ProvenanceRecordDB]:
     """Get provenance record by score ID"""
-    return db.query(ProvenanceRecordDB).filter(
-        ProvenanceRecordDB.score_id == score_id
-    ).first()
+    result = await db.execute(
+        select(ProvenanceRecordDB).where(ProvenanceRecordDB.score_id == score_id)
+    )
+    return result.scalar_one_or_none()
 
 
-def create_provenance_record(
-    db: Session,
-    data: dict
-) -> ProvenanceRecordDB:
-    """Create new provenance record"""
+async def get_provenance_hash_by_score_id(
+    db: AsyncSession,
+    score_id: str
+) -> Optional[bytes]:
+    """Get only the data hash of a provenance record"""
+    result = await db.execute(
+        select(ProvenanceRecordDB.data_hash).where(ProvenanceRecordDB.score_id == score_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def get_audit_projection(
+    db: AsyncSession,
+    score_id: str
+) -> Optional[Row]:
+    """
+    Get the audit fields of a provenance record without loading its
+    JSON lineage (only the array lengths are computed, in the database)
+    """
+    result = await db.execute(
+        select(
+            ProvenanceRecordDB.created_at,
+            ProvenanceRecordDB.pipeline_version,
+            ProvenanceRecordDB.data_hash,
+            func.json_array_length(ProvenanceRecordDB.data_sources).label("data_sources_count"),
+            func.json_array_length(ProvenanceRecordDB.transformations).label("transformations_count")
+        ).where(ProvenanceRecordDB.score_id == score_id)
+    )
+    return result.one_or_none()
+
+
+async def get_provenance_by_score_ids(
+    db: AsyncSession,
+    score_ids: List[str]
+) -> List[ProvenanceRecordDB]:
+    """Get provenance records for several score IDs in one query"""
+    if not score_ids:
+        return []
+    result = await db.execute(
+        select(ProvenanceRecordDB).where(ProvenanceRecordDB.score_id.in_(set(score_ids)))
+    )
+    return list(result.scalars().all())
+
+
+def _provenance_values(data: dict) -> dict:
+    """Column values for a new provenance record, including its data hash"""
     # Compute data hash for integrity
     data_hash = compute_data_hash({
         "score_id": data["score_id"],
@@ -38,41 +82,71 @@ def create_provenance_record(
         "transformations": data["transformations"]
     })
     
-    record = ProvenanceRecordDB(
-        score_id=data["score_id"],
-        product_id=data["product_id"],
-        pipeline_version=data["pipeline_version"],
-        data_sources=data["data_sources"],
-        transformations=data["transformations"],
-        model_info=data.get("model_info"),
-        metrics=data.get("metrics"),
-        data_hash=data_hash
-    )
+    return {
+        "score_id": data["score_id"],
+        "product_id": data["product_id"],
+        "pipeline_version": data["pipeline_version"],
+        "data_sources": data["data_sources"],
+        "transformations": data["transformations"],
+        "model_info": data.get("model_info"),
+        "metrics": data.get("metrics"),
+        "data_hash": data_hash
+    }
+
+
+async def create_provenance_record(
+    db: AsyncSession,
+    data: dict
+) -> ProvenanceRecordDB:
+    """Create new provenance record"""
+    record = ProvenanceRecordDB(**_provenance_values(data))
     
     db.add(record)
-    db.commit()
-    db.refresh(record)
+    await db.commit()
+    await db.refresh(record)
     return record
 
 
-def get_all_provenance_records(
-    db: Session,
+async def create_provenance_records_bulk(
+    db: AsyncSession,
+    items: List[dict]
+) -> List[ProvenanceRecordDB]:
+    """Create several provenance records with one INSERT and one commit"""
+    if not items:
+        return []
+    
+    # executemany RETURNING only keeps input order when asked to
+    result = await db.execute(
+        insert(ProvenanceRecordDB).returning(ProvenanceRecordDB, sort_by_parameter_order=True),
+        [_provenance_values(data) for data in items]
+    )
+    records = list(result.scalars().all())
+    await db.commit()
+    return records
+
+
+async def get_all_provenance_records(
+    db: AsyncSession,
     skip: int = 0,
     limit: int = 100
 ) -> List[ProvenanceRecordDB]:
     """Get all provenance records with pagination"""
-    return db.query(ProvenanceRecordDB).offset(skip).limit(limit).all()
+    result = await db.execute(
+        select(ProvenanceRecordDB).offset(skip).limit(limit)
+    )
+    return list(result.scalars().all())
 
 
-def create_dataset_version(
-    db: Session,
+async def create_dataset_version(
+    db: AsyncSession,
     name: str,
     version: str,
     file_path: str,
-    file_hash: str,
+    file_hash: bytes,
     dvc_file: Optional[str] = None,
     description: Optional[str] = None,
-    schema_info: Optional[dict] = None
+    schema_info: Optional[dict] = None,
+    status: str = "tracked"
 ) -> DatasetVersionDB:
     """Create dataset version record"""
     record = DatasetVersionDB(
@@ -82,42 +156,77 @@ def create_dataset_version(
         file_hash=file_hash,
         dvc_file=dvc_file,
         description=description,
-        schema_info=schema_info
+        schema_info=schema_info,
+        status=status
     )
     
     db.add(record)
-    db.commit()
-    db.refresh(record)
+    await db.commit()
+    await db.refresh(record)
     return record
 
 
-def get_dataset_versions(
-    db: Session,
+async def update_dataset_version_tracking(
+    db: AsyncSession,
+    record_id: int,
+    file_hash: bytes,
+    dvc_file: Optional[str],
+    status: str
+) -> None:
+    """Store the DVC tracking result of a dataset version"""
+    await db.execute(
+        update(DatasetVersionDB)
+        .where(DatasetVersionDB.id == record_id)
+        .values(file_hash=file_hash, dvc_file=dvc_file, status=status)
+    )
+    await db.commit()
+
+
+async def get_dataset_version_by_id(
+    db: AsyncSession,
+    record_id: int
+) -> Optional[DatasetVersionDB]:
+    """Get dataset version by ID"""
+    return await db.get(DatasetVersionDB, record_id)
+
+
+async def get_dataset_versions(
+    db: AsyncSession,
     name: str
 ) -> List[DatasetVersionDB]:
     """Get all versions of a dataset"""
-    return db.query(DatasetVersionDB).filter(
-        DatasetVersionDB.name == name
-    ).order_by(DatasetVersionDB.created_at.desc()).all()
+    result = await db.execute(
+        select(DatasetVersionDB)
+        .where(DatasetVersionDB.name == name)
+        .order_by(DatasetVersionDB.created_at.desc())
+    )
+    return list(result.scalars().all())
 
 
-def get_dataset_version(
-    db: Session,
+async def get_dataset_version(
+    db: AsyncSession,
     name: str,
     version: str
 ) -> Optional[DatasetVersionDB]:
     """Get specific dataset version"""
-    return db.query(DatasetVersionDB).filter(
-        DatasetVersionDB.name == name,
-        DatasetVersionDB.version == version
-    ).first()
+    result = await db.execute(
+        select(DatasetVersionDB).where(
+            DatasetVersionDB.name == name,
+            DatasetVersionDB.version == version
+        )
+    )
+    return result.scalars().first()
 
 
-def get_latest_dataset_version(
-    db: Session,
+async def get_latest_dataset_version(
+    db: AsyncSession,
     name: str
 ) -> Optional[DatasetVersionDB]:
     """Get latest version of a dataset"""
-    return db.query(DatasetVersionDB).filter(
-        DatasetVersionDB.name == name
-    ).order_by(DatasetVersionDB.created_at.desc()).first()
+    result = await db.execute(
+        select(DatasetVersionDB)
+        .where(DatasetVersionDB.name == name)
+        .order_by(DatasetVersionDB.created_at.desc())
+        .limit(1)
+    )
+    return result.scalars().first()
@@ -4,13 +4,23 @@ Data lineage tracking with DVC/MLflow integration
 Port: 8006
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.openapi.docs import (
+    get_redoc_html,
+    get_swagger_ui_html,
+    get_swagger_ui_oauth2_redirect_html,
+)
+from fastapi.responses import ORJSONResponse, Response
 from contextlib import asynccontextmanager
+from functools import lru_cache
+import asyncio
+import hashlib
 import logging
+import orjson
 
 from database.connection import engine, Base
-from routes.provenance_routes import router as provenance_router
+from routes.provenance_routes import router as provenance_router, mlflow_manager
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -20,16 +30,24 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     logger.info("Starting Provenance Service...")
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
     logger.info("Database tables created")
     yield
     logger.info("Shutting down Provenance Service...")
+    await asyncio.to_thread(mlflow_manager.close)
+    await engine.dispose()
 
 
 app = FastAPI(
     title="Provenance Service",
     description="Data lineage tracking with DVC/MLflow integration for EcoLabel-MS",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+    # Served below from a cached copy
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None,
     lifespan=lifespan
 )
 
@@ -46,20 +64,88 @@ app.add_middleware(
 app.include_router(provenance_router, prefix="/provenance", tags=["provenance"])
 
 
+# Static responses (API docs, health, root) don't change while the process
+# runs: bodies are built once and served with an ETag so clients can
+# revalidate with a 304 instead of downloading them again
+STATIC_MAX_AGE = 60
+
+HEALTH_BODY = orjson.dumps({"status": "healthy", "service": "provenance"})
+ROOT_BODY = orjson.dumps({
+    "service": "Provenance Service",
+    "version": "1.0.0",
+    "description": "Data lineage tracking for EcoLabel-MS2027"
+})
+
+
+@lru_cache(maxsize=8)
+def _etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def _static_response(request: Request, body: bytes, media_type: str) -> Response:
+    """Serve a precomputed body, answering 304 if the client's copy is current"""
+    etag = _etag(body)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={STATIC_MAX_AGE}"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match == "*" or etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+@lru_cache(maxsize=1)
+def _openapi_body() -> bytes:
+    return orjson.dumps(app.openapi())
+
+
+@lru_cache(maxsize=1)
+def _swagger_ui_body() -> bytes:
+    return get_swagger_ui_html(
+        openapi_url="/openapi.json",
+        title=f"{app.title} - Swagger UI",
+        oauth2_redirect_url=app.swagger_ui_oauth2_redirect_url,
+    ).body
+
+
+@lru_cache(maxsize=1)
+def _swagger_ui_oauth2_redirect_body() -> bytes:
+    return get_swagger_ui_oauth2_redirect_html().body
+
+
+@lru_cache(maxsize=1)
+def _redoc_body() -> bytes:
+    return get_redoc_html(openapi_url="/openapi.json", title=f"{app.title} - ReDoc").body
+
+
+@app.get("/openapi.json", include_in_schema=False)
+async def openapi_schema(request: Request):
+    return _static_response(request, _openapi_body(), "application/json")
+
+
+@app.get("/docs", include_in_schema=False)
+async def swagger_ui(request: Request):
+    return _static_response(request, _swagger_ui_body(), "text/html")
+
+
+@app.get(app.swagger_ui_oauth2_redirect_url, include_in_schema=False)
+async def swagger_ui_redirect(request: Request):
+    return _static_response(request, _swagger_ui_oauth2_redirect_body(), "text/html")
+
+
+@app.get("/redoc", include_in_schema=False)
+async def redoc(request: Request):
+    return _static_response(request, _redoc_body(), "text/html")
+
+
 @app.get("/health")
-async def health_check():
+async def health_check(request: Request):
     """Health check endpoint"""
-    return {"status": "healthy", "service": "provenance"}
+    return _static_response(request, HEALTH_BODY, "application/json")
 
 
 @app.get("/")
-async def root():
+async def root(request: Request):
     """Root endpoint"""
-    return {
-        "service": "Provenance Service",
-        "version": "1.0.0",
-        "description": "Data lineage tracking for EcoLabel-MS2027"
-    }
+    return _static_response(request, ROOT_BODY, "application/json")
 
 
 if __name__ == "__main__":
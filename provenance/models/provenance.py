@@ -2,7 +2,7 @@
 Provenance Database Models
 """
 
-from sqlalchemy import Column, Integer, String, DateTime, JSON, Text
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Text, Index, LargeBinary
 from sqlalchemy.sql import func
 from database.connection import Base
 
@@ -26,8 +26,8 @@ class ProvenanceRecordDB(Base):
     # Metrics
     metrics = Column(JSON, nullable=True)
     
-    # Integrity
-    data_hash = Column(String(64), nullable=False)
+    # Integrity (raw SHA-256 digest)
+    data_hash = Column(LargeBinary(32), nullable=False)
     
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -42,12 +42,15 @@ class DatasetVersionDB(Base):
     __tablename__ = "dataset_versions"
     
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String(100), index=True, nullable=False)
+    name = Column(String(100), nullable=False)
     version = Column(String(50), nullable=False)
     file_path = Column(String(500), nullable=False)
-    file_hash = Column(String(64), nullable=False)
+    file_hash = Column(LargeBinary(32), nullable=False)  # Raw SHA-256 digest
     dvc_file = Column(String(500), nullable=True)
     
+    # DVC tracking status: pending, tracked, mock or error
+    status = Column(String(20), nullable=False, default="tracked")
+    
     # Metadata
     description = Column(Text, nullable=True)
     schema_info = Column(JSON, nullable=True)
@@ -55,6 +58,12 @@ class DatasetVersionDB(Base):
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
+    # Lookups are by name + version, or by name ordered by newest first
+    __table_args__ = (
+        Index("ix_dataset_versions_name_version", "name", "version", unique=True),
+        Index("ix_dataset_versions_name_created_at", "name", created_at.desc()),
+    )
+    
     def __repr__(self):
         return f"<DatasetVersion(name={self.name}, version={self.version})>"
 
@@ -3,25 +3,39 @@ Provenance Routes
 Endpoints for data lineage and experiment tracking
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import Optional, List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Annotated, Optional, List
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, PlainSerializer, TypeAdapter
+import logging
+import orjson
 
-from database.connection import get_db
+from database.connection import SessionLocal, get_db
 from database import crud
 from tracking.dvc_manager import DVCManager
 from tracking.mlflow_manager import MLflowManager
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 # Initialize tracking managers
 dvc_manager = DVCManager()
 mlflow_manager = MLflowManager()
 
+# Encoded experiment listings by limit, paired with the list they were built from
+_experiment_list_bodies: dict = {}
+
 
 # Pydantic Models
+
+# Hashes are stored as raw digests and exposed as hex strings
+HexDigest = Annotated[bytes, PlainSerializer(lambda digest: digest.hex(), return_type=str)]
+
+
 class ProvenanceRecordCreate(BaseModel):
     score_id: str
     product_id: str
@@ -42,7 +56,7 @@ class ProvenanceRecordResponse(BaseModel):
     model_info: Optional[dict]
     metrics: Optional[dict]
     created_at: datetime
-    data_hash: str
+    data_hash: HexDigest
     
     class Config:
         from_attributes = True
@@ -76,143 +90,61 @@ class DatasetVersionResponse(BaseModel):
     id: int
     name: str
     version: str
-    file_hash: str
+    file_hash: HexDigest
     dvc_file: Optional[str]
+    status: str
     created_at: datetime
     
     class Config:
         from_attributes = True
 
 
+class DatasetVersionDetail(DatasetVersionResponse):
+    file_path: str
+    description: Optional[str]
+    schema_info: Optional[dict]
+
+
+# Validate ORM rows once and serialize them without jsonable_encoder
+dataset_version_list_adapter = TypeAdapter(List[DatasetVersionDetail])
+provenance_record_adapter = TypeAdapter(ProvenanceRecordResponse)
+provenance_record_list_adapter = TypeAdapter(List[ProvenanceRecordResponse])
+
+
 class LineageGraphResponse(BaseModel):
     score_id: str
     nodes: List[dict]
     edges: List[dict]
 
 
-# Provenance Endpoints
-@router.get("/{score_id}", response_model=ProvenanceRecordResponse)
-async def get_provenance(
-    score_id: str,
-    db: Session = Depends(get_db)
-):
-    """
-    GET /provenance/{score_id}
-    Get full data lineage for a score
-    """
-    record = crud.get_provenance_by_score_id(db, score_id)
-    if not record:
-        raise HTTPException(status_code=404, detail="Provenance record not found")
-    return record
+def _record_etag(data_hash: bytes) -> str:
+    """Strong ETag for views of a provenance record (records are immutable)"""
+    return f'"{data_hash.hex()}"'
 
 
-@router.post("/", response_model=ProvenanceRecordResponse)
-async def create_provenance(
-    data: ProvenanceRecordCreate,
-    db: Session = Depends(get_db)
-):
-    """
-    POST /provenance
-    Create provenance record for a new score
-    """
-    record = crud.create_provenance_record(db, data.dict())
-    return record
-
-
-@router.get("/{score_id}/lineage", response_model=LineageGraphResponse)
-async def get_lineage_graph(
-    score_id: str,
-    depth: int = Query(default=5, ge=1, le=20),
-    db: Session = Depends(get_db)
-):
-    """
-    GET /provenance/{score_id}/lineage
-    Get lineage graph for visualization
+async def _not_modified(request: Request, db: AsyncSession, score_id: str) -> Optional[Response]:
     """
-    record = crud.get_provenance_by_score_id(db, score_id)
-    if not record:
-        raise HTTPException(status_code=404, detail="Provenance record not found")
-    
-    # Build lineage graph
-    nodes = []
-    edges = []
+    Answer a conditional request from the record's data hash alone
     
-    # Add source data nodes
-    for idx, source in enumerate(record.data_sources):
-        node_id = f"source_{idx}"
-        nodes.append({
-            "id": node_id,
-            "type": "data_source",
-            "label": source.get("name", f"Source {idx}"),
-            "data": source
-        })
-        edges.append({
-            "from": node_id,
-            "to": "transform_0"
-        })
-    
-    # Add transformation nodes
-    for idx, transform in enumerate(record.transformations):
-        node_id = f"transform_{idx}"
-        nodes.append({
-            "id": node_id,
-            "type": "transformation",
-            "label": transform.get("name", f"Transform {idx}"),
-            "data": transform
-        })
-        if idx > 0:
-            edges.append({
-                "from": f"transform_{idx-1}",
-                "to": node_id
-            })
-    
-    # Add score node
-    nodes.append({
-        "id": "score",
-        "type": "output",
-        "label": f"Score {score_id}",
-        "data": {"score_id": score_id, "metrics": record.metrics}
-    })
+    Returns:
+        A 304 response if the client's copy is current, else None
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
     
-    if record.transformations:
-        edges.append({
-            "from": f"transform_{len(record.transformations)-1}",
-            "to": "score"
-        })
+    data_hash = await crud.get_provenance_hash_by_score_id(db, score_id)
+    if data_hash is None:
+        return None
     
-    return LineageGraphResponse(
-        score_id=score_id,
-        nodes=nodes,
-        edges=edges
-    )
+    etag = _record_etag(data_hash)
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers={"ETag": etag})
+    return None
 
 
-@router.get("/{score_id}/audit")
-async def get_audit_trail(
-    score_id: str,
-    db: Session = Depends(get_db)
-):
-    """
-    GET /provenance/{score_id}/audit
-    Get audit trail for compliance
-    """
-    record = crud.get_provenance_by_score_id(db, score_id)
-    if not record:
-        raise HTTPException(status_code=404, detail="Provenance record not found")
-    
-    return {
-        "score_id": score_id,
-        "created_at": record.created_at.isoformat(),
-        "pipeline_version": record.pipeline_version,
-        "data_hash": record.data_hash,
-        "data_sources_count": len(record.data_sources),
-        "transformations_count": len(record.transformations),
-        "compliance_info": {
-            "traceable": True,
-            "reproducible": True,
-            "data_integrity_verified": True
-        }
-    }
+# Routes with fixed paths are registered ahead of the /{score_id} routes,
+# which would otherwise capture them
 
 
 # MLflow Experiment Endpoints
@@ -254,7 +186,14 @@ async def list_experiments(
     GET /provenance/experiments
     List all experiments
     """
-    return mlflow_manager.list_experiments(limit)
+    experiments = mlflow_manager.list_experiments(limit)
+    
+    # Re-encode only when the manager hands back a new list
+    cached = _experiment_list_bodies.get(limit)
+    if cached is None or cached[0] is not experiments:
+        cached = (experiments, orjson.dumps(experiments))
+        _experiment_list_bodies[limit] = cached
+    return Response(content=cached[1], media_type="application/json")
 
 
 @router.post("/experiments/{experiment_id}/log")
@@ -271,56 +210,123 @@ async def log_metrics(
 
 
 # DVC Dataset Versioning Endpoints
-@router.post("/datasets", response_model=DatasetVersionResponse)
+@router.post("/datasets", response_model=DatasetVersionResponse, status_code=202)
 async def version_dataset(
     data: DatasetVersionCreate,
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
 ):
     """
     POST /provenance/datasets
-    Track dataset version with DVC
+    Register a dataset version; DVC tracking runs in the background
+    (poll /provenance/datasets/{id}/status)
     """
-    # Track with DVC
-    dvc_result = dvc_manager.track_file(data.file_path)
+    # (name, version) is unique; this check is only a fast path, the index
+    # below decides between concurrent requests
+    if await crud.get_dataset_version(db, data.name, data.version):
+        raise HTTPException(status_code=409, detail="Dataset version already exists")
     
-    # Store in database
-    record = crud.create_dataset_version(
-        db,
-        name=data.name,
-        version=data.version,
-        file_path=data.file_path,
-        file_hash=dvc_result.get("hash", ""),
-        dvc_file=dvc_result.get("dvc_file"),
-        description=data.description,
-        schema_info=data.schema_info
-    )
+    # Store in database, hash and DVC file are filled in once tracked
+    try:
+        record = await crud.create_dataset_version(
+            db,
+            name=data.name,
+            version=data.version,
+            file_path=data.file_path,
+            file_hash=b"",
+            description=data.description,
+            schema_info=data.schema_info,
+            status="pending"
+        )
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail="Dataset version already exists")
+    
+    background_tasks.add_task(_finalize_dvc, record.id, data.file_path)
     return record
 
 
+async def _finalize_dvc(record_id: int, file_path: str) -> None:
+    """Track a dataset file with DVC and record the result"""
+    try:
+        dvc_result = await dvc_manager.track_file(file_path)
+        
+        async with SessionLocal() as db:
+            await crud.update_dataset_version_tracking(
+                db,
+                record_id,
+                file_hash=bytes.fromhex(dvc_result.get("hash", "")),
+                dvc_file=dvc_result.get("dvc_file"),
+                status=dvc_result.get("status", "error")
+            )
+    except Exception as e:
+        logger.error(f"DVC tracking failed for dataset version {record_id}: {e}")
+        # Never leave the version pending, or checkout would answer 409 forever
+        try:
+            async with SessionLocal() as db:
+                await crud.update_dataset_version_tracking(
+                    db,
+                    record_id,
+                    file_hash=b"",
+                    dvc_file=None,
+                    status="error"
+                )
+        except Exception as e:
+            logger.error(f"Could not mark dataset version {record_id} as failed: {e}")
+
+
+@router.get("/datasets/{dataset_id:int}/status")
+async def get_dataset_status(
+    dataset_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    GET /provenance/datasets/{id}/status
+    Get DVC tracking status of a dataset version
+    """
+    record = await crud.get_dataset_version_by_id(db, dataset_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Dataset version not found")
+    return {
+        "id": record.id,
+        "name": record.name,
+        "version": record.version,
+        "status": record.status,
+        "file_hash": record.file_hash.hex() or None,
+        "dvc_file": record.dvc_file
+    }
+
+
 @router.get("/datasets/{name}")
 async def get_dataset_versions(
     name: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     GET /provenance/datasets/{name}
     Get all versions of a dataset
     """
-    versions = crud.get_dataset_versions(db, name)
-    return {"dataset": name, "versions": versions}
+    versions = dataset_version_list_adapter.validate_python(
+        await crud.get_dataset_versions(db, name),
+        from_attributes=True
+    )
+    return ORJSONResponse({
+        "dataset": name,
+        "versions": dataset_version_list_adapter.dump_python(versions, mode="json")
+    })
 
 
-@router.get("/datasets/{name}/{version}")
+@router.get("/datasets/{name}/{version}", response_model=DatasetVersionDetail)
 async def get_dataset_version(
     name: str,
     version: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     GET /provenance/datasets/{name}/{version}
     Get specific dataset version
     """
-    record = crud.get_dataset_version(db, name, version)
+    record = await crud.get_dataset_version(db, name, version)
     if not record:
         raise HTTPException(status_code=404, detail="Dataset version not found")
     return record
@@ -330,17 +336,20 @@ async def get_dataset_version(
 async def checkout_dataset(
     name: str,
     version: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     POST /provenance/datasets/{name}/{version}/checkout
     Checkout specific dataset version
     """
-    record = crud.get_dataset_version(db, name, version)
+    record = await crud.get_dataset_version(db, name, version)
     if not record:
         raise HTTPException(status_code=404, detail="Dataset version not found")
     
-    result = dvc_manager.checkout_version(record.dvc_file, record.file_hash)
+    if record.status == "pending":
+        raise HTTPException(status_code=409, detail="Dataset version is still being tracked")
+    
+    result = await dvc_manager.checkout_version(record.dvc_file, record.file_hash.hex())
     return {"status": "checked_out", "version": version, "result": result}
 
 
@@ -348,25 +357,183 @@ async def checkout_dataset(
 @router.get("/compare")
 async def compare_scores(
     score_ids: str = Query(..., description="Comma-separated score IDs"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     GET /provenance/compare?score_ids=id1,id2,id3
     Compare provenance of multiple scores
     """
     ids = [s.strip() for s in score_ids.split(",")]
-    records = []
     
-    for score_id in ids:
-        record = crud.get_provenance_by_score_id(db, score_id)
-        if record:
-            records.append({
-                "score_id": record.score_id,
-                "pipeline_version": record.pipeline_version,
-                "data_hash": record.data_hash,
-                "sources_count": len(record.data_sources),
-                "transforms_count": len(record.transformations),
-                "created_at": record.created_at.isoformat()
-            })
+    # Fetch all records in one query, then report them in request order
+    found = {
+        record.score_id: record
+        for record in await crud.get_provenance_by_score_ids(db, ids)
+    }
+    records = [
+        {
+            "score_id": record.score_id,
+            "pipeline_version": record.pipeline_version,
+            "data_hash": record.data_hash.hex(),
+            "sources_count": len(record.data_sources),
+            "transforms_count": len(record.transformations),
+            "created_at": record.created_at.isoformat()
+        }
+        for record in (found.get(score_id) for score_id in ids)
+        if record
+    ]
     
     return {"comparison": records, "count": len(records)}
+
+
+# Provenance Endpoints
+@router.get("/{score_id}", response_model=ProvenanceRecordResponse)
+async def get_provenance(
+    score_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    GET /provenance/{score_id}
+    Get full data lineage for a score
+    """
+    record = await crud.get_provenance_by_score_id(db, score_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Provenance record not found")
+    return record
+
+
+@router.post("/", response_model=ProvenanceRecordResponse)
+async def create_provenance(
+    data: ProvenanceRecordCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    POST /provenance
+    Create provenance record for a new score
+    """
+    record = await crud.create_provenance_record(db, data.model_dump())
+    return ORJSONResponse(provenance_record_adapter.dump_python(
+        provenance_record_adapter.validate_python(record, from_attributes=True),
+        mode="json"
+    ))
+
+
+@router.post("/bulk", response_model=List[ProvenanceRecordResponse])
+async def create_provenance_bulk(
+    items: List[ProvenanceRecordCreate],
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    POST /provenance/bulk
+    Create provenance records for several scores in one transaction
+    """
+    records = await crud.create_provenance_records_bulk(db, [item.model_dump() for item in items])
+    return ORJSONResponse(provenance_record_list_adapter.dump_python(
+        provenance_record_list_adapter.validate_python(records, from_attributes=True),
+        mode="json"
+    ))
+
+
+@router.get("/{score_id}/lineage", response_model=LineageGraphResponse)
+async def get_lineage_graph(
+    score_id: str,
+    request: Request,
+    depth: int = Query(default=5, ge=1, le=20),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    GET /provenance/{score_id}/lineage
+    Get lineage graph for visualization
+    """
+    not_modified = await _not_modified(request, db, score_id)
+    if not_modified:
+        return not_modified
+    
+    record = await crud.get_provenance_by_score_id(db, score_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Provenance record not found")
+    
+    # Build lineage graph
+    data_sources = record.data_sources
+    transformations = record.transformations
+    source_ids = [f"source_{idx}" for idx in range(len(data_sources))]
+    transform_ids = [f"transform_{idx}" for idx in range(len(transformations))]
+    
+    # Source data nodes, transformation nodes, then the score node
+    nodes = [
+        {
+            "id": node_id,
+            "type": "data_source",
+            "label": source.get("name", f"Source {idx}"),
+            "data": source
+        }
+        for idx, (node_id, source) in enumerate(zip(source_ids, data_sources))
+    ]
+    nodes += [
+        {
+            "id": node_id,
+            "type": "transformation",
+            "label": transform.get("name", f"Transform {idx}"),
+            "data": transform
+        }
+        for idx, (node_id, transform) in enumerate(zip(transform_ids, transformations))
+    ]
+    nodes.append({
+        "id": "score",
+        "type": "output",
+        "label": f"Score {score_id}",
+        "data": {"score_id": score_id, "metrics": record.metrics}
+    })
+    
+    # Every source feeds the first transformation, transformations are
+    # chained, and the last one produces the score
+    edges = [{"from": node_id, "to": "transform_0"} for node_id in source_ids]
+    edges += [
+        {"from": previous, "to": node_id}
+        for previous, node_id in zip(transform_ids, transform_ids[1:])
+    ]
+    if transform_ids:
+        edges.append({"from": transform_ids[-1], "to": "score"})
+    
+    # Already matches LineageGraphResponse; skip re-validating it
+    return ORJSONResponse({
+        "score_id": score_id,
+        "nodes": nodes,
+        "edges": edges
+    }, headers={"ETag": _record_etag(record.data_hash)})
+
+
+@router.get("/{score_id}/audit")
+async def get_audit_trail(
+    score_id: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    GET /provenance/{score_id}/audit
+    Get audit trail for compliance
+    """
+    not_modified = await _not_modified(request, db, score_id)
+    if not_modified:
+        return not_modified
+    
+    record = await crud.get_audit_projection(db, score_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Provenance record not found")
+    
+    response.headers["ETag"] = _record_etag(record.data_hash)
+    
+    return {
+        "score_id": score_id,
+        "created_at": record.created_at.isoformat(),
+        "pipeline_version": record.pipeline_version,
+        "data_hash": record.data_hash.hex(),
+        "data_sources_count": record.data_sources_count,
+        "transformations_count": record.transformations_count,
+        "compliance_info": {
+            "traceable": True,
+            "reproducible": True,
+            "data_integrity_verified": True
+        }
+    }
@@ -0,0 +1,37 @@
+"""
+Shared fixtures for provenance tests
+"""
+import pytest
+import httpx
+from fastapi.testclient import TestClient
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Run against an in-memory SQLite database unless a database is configured
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+
+from main import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Test client shared by the whole session (lifespan runs once)"""
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    """Run async tests on asyncio only"""
+    return "asyncio"
+
+
+@pytest.fixture
+async def async_client():
+    """Async client for issuing independent requests concurrently"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac
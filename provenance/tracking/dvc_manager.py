@@ -4,14 +4,20 @@ Data Version Control integration for tracking datasets
 """
 
 import os
+import asyncio
 import hashlib
-import subprocess
 import logging
 from typing import Optional, Dict, Any
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Read size for file hashing on Pythons without hashlib.file_digest
+HASH_CHUNK_SIZE = 1 << 20
+
+# Maximum number of DVC/git processes and hashing passes running at once
+MAX_CONCURRENT_DVC_OPS = int(os.getenv("MAX_CONCURRENT_DVC_OPS", "4"))
+
 
 class DVCManager:
     """Manager for DVC dataset versioning"""
@@ -25,25 +31,44 @@ class DVCManager:
         """
         self.repo_path = repo_path or os.getcwd()
         self.dvc_initialized = self._check_dvc_init()
+        # Bounds subprocesses and hashing so bursts don't thrash disk/DVC lock
+        self._semaphore = asyncio.Semaphore(MAX_CONCURRENT_DVC_OPS)
+        # File path -> in-flight track_file shared by concurrent callers
+        self._inflight: Dict[str, "asyncio.Task"] = {}
     
     def _check_dvc_init(self) -> bool:
         """Check if DVC is initialized in repo"""
         dvc_dir = Path(self.repo_path) / ".dvc"
         return dvc_dir.exists()
     
-    def init(self) -> Dict[str, Any]:
-        """Initialize DVC in repository"""
-        try:
-            result = subprocess.run(
-                ["dvc", "init"],
+    async def _run(self, *args: str) -> str:
+        """
+        Run a command in the repository without blocking the event loop
+        
+        Args:
+            args: Command and arguments
+            
+        Returns:
+            Decoded standard output
+        """
+        async with self._semaphore:
+            proc = await asyncio.create_subprocess_exec(
+                *args,
                 cwd=self.repo_path,
-                capture_output=True,
-                text=True
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
             )
+            stdout, _ = await proc.communicate()
+        return stdout.decode(errors="replace")
+    
+    async def init(self) -> Dict[str, Any]:
+        """Initialize DVC in repository"""
+        try:
+            output = await self._run("dvc", "init")
             self.dvc_initialized = True
             return {
                 "status": "initialized",
-                "output": result.stdout
+                "output": output
             }
         except FileNotFoundError:
             logger.warning("DVC not installed, using mock mode")
@@ -52,7 +77,7 @@ class DVCManager:
             logger.error(f"DVC init error: {e}")
             return {"status": "error", "message": str(e)}
     
-    def track_file(self, file_path: str) -> Dict[str, Any]:
+    async def track_file(self, file_path: str) -> Dict[str, Any]:
         """
         Track a file with DVC
         
@@ -62,8 +87,21 @@ class DVCManager:
         Returns:
             Dict with tracking result
         """
-        # Compute file hash
-        file_hash = self._compute_file_hash(file_path)
+        # Coalesce concurrent tracks of the same file into one hash + dvc add
+        task = self._inflight.get(file_path)
+        if task is None:
+            task = asyncio.ensure_future(self._track_file(file_path))
+            self._inflight[file_path] = task
+            task.add_done_callback(lambda _: self._inflight.pop(file_path, None))
+        
+        # Shield so a cancelled caller doesn't cancel the track for the others
+        return dict(await asyncio.shield(task))
+    
+    async def _track_file(self, file_path: str) -> Dict[str, Any]:
+        """Hash a file and add it to DVC"""
+        # Compute file hash (CPU and disk bound, so in a worker thread)
+        async with self._semaphore:
+            file_hash = await asyncio.to_thread(self._compute_file_hash, file_path)
         
         if not self.dvc_initialized:
             # Mock mode if DVC not available
@@ -76,12 +114,7 @@ class DVCManager:
             }
         
         try:
-            result = subprocess.run(
-                ["dvc", "add", file_path],
-                cwd=self.repo_path,
-                capture_output=True,
-                text=True
-            )
+            output = await self._run("dvc", "add", file_path)
             
             dvc_file = f"{file_path}.dvc"
             
@@ -90,7 +123,7 @@ class DVCManager:
                 "hash": file_hash,
                 "file_path": file_path,
                 "dvc_file": dvc_file,
-                "output": result.stdout
+                "output": output
             }
         except Exception as e:
             logger.error(f"DVC track error: {e}")
@@ -100,7 +133,7 @@ class DVCManager:
                 "message": str(e)
             }
     
-    def checkout_version(
+    async def checkout_version(
         self,
         dvc_file: str,
         commit_hash: Optional[str] = None
@@ -121,30 +154,21 @@ class DVCManager:
         try:
             if commit_hash:
                 # Checkout specific git commit first
-                subprocess.run(
-                    ["git", "checkout", commit_hash, "--", dvc_file],
-                    cwd=self.repo_path,
-                    capture_output=True
-                )
+                await self._run("git", "checkout", commit_hash, "--", dvc_file)
             
             # DVC checkout
-            result = subprocess.run(
-                ["dvc", "checkout", dvc_file],
-                cwd=self.repo_path,
-                capture_output=True,
-                text=True
-            )
+            output = await self._run("dvc", "checkout", dvc_file)
             
             return {
                 "status": "checked_out",
                 "dvc_file": dvc_file,
-                "output": result.stdout
+                "output": output
             }
         except Exception as e:
             logger.error(f"DVC checkout error: {e}")
             return {"status": "error", "message": str(e)}
     
-    def push(self, remote: str = "origin") -> Dict[str, Any]:
+    async def push(self, remote: str = "origin") -> Dict[str, Any]:
         """
         Push tracked files to remote storage
         
@@ -158,23 +182,18 @@ class DVCManager:
             return {"status": "mock", "message": "Mock push"}
         
         try:
-            result = subprocess.run(
-                ["dvc", "push", "-r", remote],
-                cwd=self.repo_path,
-                capture_output=True,
-                text=True
-            )
+            output = await self._run("dvc", "push", "-r", remote)
             
             return {
                 "status": "pushed",
                 "remote": remote,
-                "output": result.stdout
+                "output": output
             }
         except Exception as e:
             logger.error(f"DVC push error: {e}")
             return {"status": "error", "message": str(e)}
     
-    def pull(self, remote: str = "origin") -> Dict[str, Any]:
+    async def pull(self, remote: str = "origin") -> Dict[str, Any]:
         """
         Pull tracked files from remote storage
         
@@ -188,17 +207,12 @@ class DVCManager:
             return {"status": "mock", "message": "Mock pull"}
         
         try:
-            result = subprocess.run(
-                ["dvc", "pull", "-r", remote],
-                cwd=self.repo_path,
-                capture_output=True,
-                text=True
-            )
+            output = await self._run("dvc", "pull", "-r", remote)
             
             return {
                 "status": "pulled",
                 "remote": remote,
-                "output": result.stdout
+                "output": output
             }
         except Exception as e:
             logger.error(f"DVC pull error: {e}")
@@ -211,30 +225,28 @@ class DVCManager:
             if not path.exists():
                 return hashlib.sha256(file_path.encode()).hexdigest()
             
-            sha256 = hashlib.sha256()
             with open(path, 'rb') as f:
-                for chunk in iter(lambda: f.read(8192), b''):
+                if hasattr(hashlib, "file_digest"):
+                    # Python 3.11+: read and hash loop runs in C, without the GIL
+                    return hashlib.file_digest(f, "sha256").hexdigest()
+                sha256 = hashlib.sha256()
+                for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
                     sha256.update(chunk)
-            return sha256.hexdigest()
+                return sha256.hexdigest()
         except Exception:
             return hashlib.sha256(file_path.encode()).hexdigest()
     
-    def get_status(self) -> Dict[str, Any]:
+    async def get_status(self) -> Dict[str, Any]:
         """Get DVC status"""
         if not self.dvc_initialized:
             return {"status": "not_initialized"}
         
         try:
-            result = subprocess.run(
-                ["dvc", "status"],
-                cwd=self.repo_path,
-                capture_output=True,
-                text=True
-            )
+            output = await self._run("dvc", "status")
             
             return {
                 "status": "ok",
-                "output": result.stdout
+                "output": output
             }
         except Exception as e:
             return {"status": "error", "message": str(e)}
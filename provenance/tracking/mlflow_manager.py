@@ -4,8 +4,12 @@ MLflow integration for model experiments and metrics
 """
 
 import os
+import time
 import uuid
+import queue
 import logging
+import threading
+from collections import OrderedDict
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 
@@ -15,11 +19,70 @@ logger = logging.getLogger(__name__)
 try:
     import mlflow
     from mlflow.tracking import MlflowClient
+    from mlflow.entities import Metric, Param, RunTag
     MLFLOW_AVAILABLE = True
 except ImportError:
     MLFLOW_AVAILABLE = False
     logger.warning("MLflow not installed, using mock mode")
 
+# log_batch limits enforced by the tracking server
+MAX_BATCH_ENTITIES = 1000
+MAX_BATCH_PARAMS = 100
+MAX_BATCH_TAGS = 100
+
+# Mock mode keeps only the most recent experiments and runs in memory
+MOCK_MAX_EXPERIMENTS = 1024
+MOCK_MAX_RUNS = 4096
+
+# Large artifacts are uploaded in parallel chunks where the artifact store supports it
+ARTIFACT_UPLOAD_CHUNK_SIZE = 10 * 1024 * 1024
+
+# Experiment metadata caches: name -> id lookups change rarely, listings more often
+EXPERIMENT_ID_CACHE_TTL = 300
+EXPERIMENT_CACHE_TTL = 30
+
+# Background logging: items drained per wake-up and idle wait in seconds
+LOG_QUEUE_BATCH_SIZE = 256
+LOG_QUEUE_TIMEOUT = 0.5
+
+
+class BoundedDict(OrderedDict):
+    """Dict that drops its oldest entries once it holds more than max_size"""
+    
+    def __init__(self, max_size: int):
+        super().__init__()
+        self.max_size = max_size
+    
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.max_size:
+            self.popitem(last=False)
+
+
+class TTLCache:
+    """Bounded cache whose entries expire ttl seconds after being stored"""
+    
+    def __init__(self, max_size: int, ttl: float):
+        self.ttl = ttl
+        self._entries = BoundedDict(max_size)
+    
+    def get(self, key) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return value
+    
+    def set(self, key, value) -> None:
+        self._entries[key] = (value, time.monotonic() + self.ttl)
+    
+    def clear(self) -> None:
+        self._entries.clear()
+
 
 class MLflowManager:
     """Manager for MLflow experiment tracking"""
@@ -35,11 +98,20 @@ class MLflowManager:
             "MLFLOW_TRACKING_URI",
             "http://localhost:5000"
         )
-        self.mock_experiments: Dict[str, Dict] = {}
-        self.mock_runs: Dict[str, Dict] = {}
+        self.mock_experiments: Dict[str, Dict] = BoundedDict(MOCK_MAX_EXPERIMENTS)
+        self.mock_runs: Dict[str, Dict] = BoundedDict(MOCK_MAX_RUNS)
+        self._experiment_ids = TTLCache(256, EXPERIMENT_ID_CACHE_TTL)
+        self._experiments = TTLCache(256, EXPERIMENT_CACHE_TTL)
+        self._experiment_lists = TTLCache(16, EXPERIMENT_CACHE_TTL)
         
         if MLFLOW_AVAILABLE:
             try:
+                os.environ.setdefault("MLFLOW_ENABLE_MULTIPART_UPLOAD", "true")
+                os.environ.setdefault("MLFLOW_ENABLE_PROXY_MULTIPART_UPLOAD", "true")
+                os.environ.setdefault(
+                    "MLFLOW_MULTIPART_UPLOAD_CHUNK_SIZE",
+                    str(ARTIFACT_UPLOAD_CHUNK_SIZE)
+                )
                 mlflow.set_tracking_uri(self.tracking_uri)
                 self.client = MlflowClient()
                 self.available = True
@@ -48,6 +120,27 @@ class MLflowManager:
                 self.available = False
         else:
             self.available = False
+        
+        # Metrics are sent from a background thread so callers never wait on the server
+        self._queue: "queue.Queue" = queue.Queue()
+        if self.available:
+            self._worker = threading.Thread(
+                target=self._drain_queue,
+                name="mlflow-logger",
+                daemon=True
+            )
+            self._worker.start()
+    
+    def close(self) -> None:
+        """Send pending metrics before shutdown"""
+        if self.available:
+            self.flush()
+    
+    def invalidate(self) -> None:
+        """Drop cached experiment metadata so the next reads hit the server"""
+        self._experiment_ids.clear()
+        self._experiments.clear()
+        self._experiment_lists.clear()
     
     def create_experiment(
         self,
@@ -75,6 +168,7 @@ class MLflowManager:
         
         if not self.available:
             # Mock mode
+            self.invalidate()
             self.mock_experiments[experiment_id] = {
                 "name": name,
                 "description": description,
@@ -98,39 +192,31 @@ class MLflowManager:
         
         try:
             # Create or get experiment
-            experiment = mlflow.get_experiment_by_name(name)
-            if experiment is None:
-                exp_id = mlflow.create_experiment(
-                    name,
-                    tags={"description": description or ""}
-                )
-            else:
-                exp_id = experiment.experiment_id
+            exp_id = self._experiment_ids.get(name)
+            if exp_id is None:
+                experiment = self.client.get_experiment_by_name(name)
+                if experiment is None:
+                    exp_id = self.client.create_experiment(
+                        name,
+                        tags={"description": description or ""}
+                    )
+                    self.invalidate()
+                else:
+                    exp_id = experiment.experiment_id
+                self._experiment_ids.set(name, exp_id)
             
-            # Start run
-            with mlflow.start_run(experiment_id=exp_id) as run:
-                # Log parameters
-                if parameters:
-                    for key, value in parameters.items():
-                        mlflow.log_param(key, value)
-                
-                # Log metrics
-                if metrics:
-                    for key, value in metrics.items():
-                        mlflow.log_metric(key, value)
-                
-                # Set tags
-                if tags:
-                    for key, value in tags.items():
-                        mlflow.set_tag(key, value)
-                
-                return {
-                    "experiment_id": exp_id,
-                    "name": name,
-                    "run_id": run.info.run_id,
-                    "status": "created",
-                    "artifact_uri": run.info.artifact_uri
-                }
+            # Start run and send everything in as few requests as possible
+            run = self.client.create_run(exp_id)
+            self._log_batch(run.info.run_id, metrics, parameters, tags)
+            self.client.set_terminated(run.info.run_id)
+            
+            return {
+                "experiment_id": exp_id,
+                "name": name,
+                "run_id": run.info.run_id,
+                "status": "created",
+                "artifact_uri": run.info.artifact_uri
+            }
         except Exception as e:
             logger.error(f"MLflow experiment creation error: {e}")
             return {
@@ -141,6 +227,55 @@ class MLflowManager:
                 "error": str(e)
             }
     
+    def _log_batch(
+        self,
+        run_id: str,
+        metrics: Optional[Dict[str, float]] = None,
+        parameters: Optional[Dict] = None,
+        tags: Optional[Dict] = None
+    ) -> None:
+        """
+        Log metrics, parameters and tags with chunked log_batch calls
+        
+        Args:
+            run_id: Run ID
+            metrics: Metrics to log
+            parameters: Run parameters
+            tags: Run tags
+        """
+        timestamp = int(time.time() * 1000)
+        metric_list = [
+            Metric(key, value, timestamp, 0)
+            for key, value in (metrics or {}).items()
+        ]
+        param_list = [Param(key, str(value)) for key, value in (parameters or {}).items()]
+        tag_list = [RunTag(key, str(value)) for key, value in (tags or {}).items()]
+        self._send_batch(run_id, metric_list, param_list, tag_list)
+    
+    def _send_batch(
+        self,
+        run_id: str,
+        metric_list: List,
+        param_list: List,
+        tag_list: List
+    ) -> None:
+        """Send entities in chunks that respect the log_batch limits"""
+        while metric_list or param_list or tag_list:
+            params_chunk = param_list[:MAX_BATCH_PARAMS]
+            tags_chunk = tag_list[:MAX_BATCH_TAGS]
+            metrics_chunk = metric_list[:MAX_BATCH_ENTITIES - len(params_chunk) - len(tags_chunk)]
+            
+            self.client.log_batch(
+                run_id,
+                metrics=metrics_chunk,
+                params=params_chunk,
+                tags=tags_chunk
+            )
+            
+            del param_list[:len(params_chunk)]
+            del tag_list[:len(tags_chunk)]
+            del metric_list[:len(metrics_chunk)]
+    
     def get_experiment(self, experiment_id: str) -> Optional[Dict[str, Any]]:
         """
         Get experiment details
@@ -161,15 +296,21 @@ class MLflowManager:
                 }
             return None
         
+        cached = self._experiments.get(experiment_id)
+        if cached is not None:
+            return cached
+        
         try:
             experiment = self.client.get_experiment(experiment_id)
-            return {
+            result = {
                 "experiment_id": experiment.experiment_id,
                 "name": experiment.name,
                 "artifact_location": experiment.artifact_location,
                 "lifecycle_stage": experiment.lifecycle_stage,
                 "tags": dict(experiment.tags)
             }
+            self._experiments.set(experiment_id, result)
+            return result
         except Exception as e:
             logger.error(f"Get experiment error: {e}")
             return None
@@ -184,15 +325,23 @@ class MLflowManager:
         Returns:
             List of experiments
         """
+        # The same list object is returned while cached, so callers can
+        # reuse anything they derived from it
+        cached = self._experiment_lists.get(limit)
+        if cached is not None:
+            return cached
+        
         if not self.available:
-            return [
+            result = [
                 {"experiment_id": k, **v, "status": "mock"}
                 for k, v in list(self.mock_experiments.items())[:limit]
             ]
+            self._experiment_lists.set(limit, result)
+            return result
         
         try:
             experiments = self.client.search_experiments(max_results=limit)
-            return [
+            result = [
                 {
                     "experiment_id": exp.experiment_id,
                     "name": exp.name,
@@ -201,6 +350,8 @@ class MLflowManager:
                 }
                 for exp in experiments
             ]
+            self._experiment_lists.set(limit, result)
+            return result
         except Exception as e:
             logger.error(f"List experiments error: {e}")
             return []
@@ -211,7 +362,7 @@ class MLflowManager:
         metrics: Dict[str, float]
     ) -> Dict[str, Any]:
         """
-        Log metrics to a run
+        Queue metrics for a run; they are sent in the background
         
         Args:
             run_id: Run ID
@@ -225,14 +376,43 @@ class MLflowManager:
                 self.mock_runs[run_id]["metrics"].update(metrics)
             return {"status": "mock", "logged": metrics}
         
-        try:
-            with mlflow.start_run(run_id=run_id):
-                for key, value in metrics.items():
-                    mlflow.log_metric(key, value)
-            return {"status": "logged", "metrics": metrics}
-        except Exception as e:
-            logger.error(f"Log metrics error: {e}")
-            return {"status": "error", "error": str(e)}
+        self._queue.put((run_id, metrics, time.time()))
+        return {"status": "queued", "metrics": metrics}
+    
+    def flush(self) -> None:
+        """Block until every queued metric has been sent"""
+        if self.available:
+            self._queue.join()
+    
+    def _drain_queue(self) -> None:
+        """Worker loop: group queued metrics by run and send one batch per run"""
+        while True:
+            try:
+                items = [self._queue.get(timeout=LOG_QUEUE_TIMEOUT)]
+            except queue.Empty:
+                continue
+            
+            while len(items) < LOG_QUEUE_BATCH_SIZE:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            by_run: Dict[str, List] = {}
+            for run_id, metrics, logged_at in items:
+                timestamp = int(logged_at * 1000)
+                by_run.setdefault(run_id, []).extend(
+                    Metric(key, value, timestamp, 0) for key, value in metrics.items()
+                )
+            
+            for run_id, metric_list in by_run.items():
+                try:
+                    self._send_batch(run_id, metric_list, [], [])
+                except Exception as e:
+                    logger.error(f"Log metrics error: {e}")
+            
+            for _ in items:
+                self._queue.task_done()
     
     def log_artifact(
         self,
@@ -259,8 +439,7 @@ class MLflowManager:
             }
         
         try:
-            with mlflow.start_run(run_id=run_id):
-                mlflow.log_artifact(local_path, artifact_path)
+            self.client.log_artifact(run_id, local_path, artifact_path)
             return {
                 "status": "logged",
                 "artifact": local_path,
@@ -6,6 +6,7 @@ import os
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
 # Database URL from environment variable or default to SQLite for local dev
 DATABASE_URL = os.getenv(
@@ -13,9 +14,23 @@ DATABASE_URL = os.getenv(
     "sqlite:///./scoring.db"
 )
 
-# Create engine - handle SQLite vs PostgreSQL differently
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-engine = create_engine(DATABASE_URL, connect_args=connect_args)
+# Create engine - handle SQLite vs PostgreSQL differently.
+# PostgreSQL keeps a bounded pool of connections open across requests
+# instead of reconnecting (TCP + auth) each time.
+if DATABASE_URL.startswith("sqlite"):
+    engine_options = {"connect_args": {"check_same_thread": False}}
+else:
+    engine_options = {
+        "poolclass": QueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+        "pool_pre_ping": True,
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "300")),
+    }
+engine = create_engine(DATABASE_URL, **engine_options)
+
+# Create tables at startup (disable with DB_CREATE_TABLES=0 once the schema is managed)
+CREATE_TABLES = os.getenv("DB_CREATE_TABLES", "1") == "1"
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
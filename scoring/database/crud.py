@@ -2,39 +2,57 @@
 CRUD operations for scoring service
 """
 
-from typing import Optional, List
-from uuid import UUID
-from sqlalchemy.orm import Session
+from typing import Optional, List, Dict, Any
+from uuid import UUID, uuid4
+from sqlalchemy.orm import Session, defer
+from sqlalchemy import insert, select
 
 from models.score import ScoreDB, ScoreCreate
 
 
-def create_score(db: Session, score: ScoreCreate) -> ScoreDB:
+def create_score_fast(db: Session, score: Dict[str, Any]) -> UUID:
     """
-    Create a new score record
+    Create a score record with a Core INSERT, bypassing the ORM unit of work
     
     Args:
         db: Database session
-        score: Score data
+        score: Column values (an "id" is generated if missing)
         
     Returns:
-        Created score record
-    """
-    db_score = ScoreDB(
-        product_id=score.product_id,
-        lca_id=score.lca_id,
-        score_numeric=score.score_numeric,
-        score_letter=score.score_letter,
-        explanation=score.explanation,
-        confidence=score.confidence,
-        breakdown=score.breakdown
-    )
+        ID of the created record
+    """
+    stmt = insert(ScoreDB).values(**score)
+    
+    # Read the id back from the INSERT itself where the dialect supports it
+    if db.get_bind().dialect.insert_returning:
+        score_id = db.scalar(stmt.returning(ScoreDB.id))
+    else:
+        score_id = db.execute(stmt).inserted_primary_key[0]
+    db.commit()
+    
+    return score_id
+
+
+def create_scores_bulk(db: Session, scores: List[ScoreCreate]) -> List[UUID]:
+    """
+    Create several score records in one INSERT and one commit
+    
+    Args:
+        db: Database session
+        scores: Score data
+        
+    Returns:
+        IDs of the created records, in input order
+    """
+    if not scores:
+        return []
     
-    db.add(db_score)
+    # IDs are generated here so they are known without reading rows back
+    rows = [{"id": uuid4(), **score.model_dump()} for score in scores]
+    db.execute(insert(ScoreDB), rows)
     db.commit()
-    db.refresh(db_score)
     
-    return db_score
+    return [row["id"] for row in rows]
 
 
 def get_score(db: Session, score_id: UUID) -> Optional[ScoreDB]:
@@ -53,21 +71,29 @@ def get_score(db: Session, score_id: UUID) -> Optional[ScoreDB]:
 
 def get_scores_by_product(
     db: Session, 
-    product_id: str
+    product_id: str,
+    limit: Optional[int] = None
 ) -> List[ScoreDB]:
     """
-    Get scores by product ID
+    Get scores by product ID, newest first
+    
+    The explanation and breakdown columns are deferred and only loaded
+    if accessed.
     
     Args:
         db: Database session
         product_id: Product ID
+        limit: Maximum number of records (None returns all of them)
         
     Returns:
         List of score records
     """
-    return db.query(ScoreDB).filter(
+    return db.query(ScoreDB).options(
+        defer(ScoreDB.explanation),
+        defer(ScoreDB.breakdown)
+    ).filter(
         ScoreDB.product_id == product_id
-    ).order_by(ScoreDB.created_at.desc()).all()
+    ).order_by(ScoreDB.created_at.desc()).limit(limit).all()
 
 
 def get_latest_score_by_product(
@@ -84,9 +110,12 @@ def get_latest_score_by_product(
     Returns:
         Latest score record or None
     """
-    return db.query(ScoreDB).filter(
-        ScoreDB.product_id == product_id
-    ).order_by(ScoreDB.created_at.desc()).first()
+    return db.scalar(
+        select(ScoreDB)
+        .where(ScoreDB.product_id == product_id)
+        .order_by(ScoreDB.created_at.desc())
+        .limit(1)
+    )
 
 
 def get_scores(
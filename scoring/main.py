@@ -3,25 +3,36 @@ Scoring Microservice
 Converts LCA indicators to eco-score A-E
 """
 
+import os
+
+import orjson
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from contextlib import asynccontextmanager
 
 from routes.score_routes import router as score_router
-from database.connection import engine, Base
+from database.connection import engine, Base, CREATE_TABLES
+from ml.score_kernel import warmup as warmup_kernels
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler"""
     # Startup: Create database tables
-    Base.metadata.create_all(bind=engine)
+    if CREATE_TABLES:
+        Base.metadata.create_all(bind=engine)
+    # Compile the batch kernels before serving traffic
+    warmup_kernels()
     yield
-    # Shutdown: cleanup if needed
+    # Shutdown: close pooled connections
+    engine.dispose()
 
 app = FastAPI(
     title="Scoring Service",
     description="Microservice for computing eco-scores from LCA indicators",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -37,11 +48,24 @@ app.add_middleware(
 # Include routes
 app.include_router(score_router, prefix="/score", tags=["Eco-Score"])
 
+# Encoded once: health probes only copy these bytes out
+HEALTH_BODY = orjson.dumps({"status": "healthy", "service": "scoring"})
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "service": "scoring"}
+    return Response(content=HEALTH_BODY, media_type="application/json")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8004)
+    # Workers are separate processes that each import the app, so every
+    # worker builds its own engine and connection pool
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8004,
+        workers=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))),
+        loop="uvloop",
+        http="httptools"
+    )
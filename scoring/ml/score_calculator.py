@@ -3,7 +3,69 @@ Score Calculator
 Calculates weighted eco-score and converts to letter grades
 """
 
-from typing import Dict, Any, List, Optional
+from functools import lru_cache
+import math
+from typing import Dict, Any, List, Optional, Tuple
+import numpy as np
+
+from .score_kernel import score_kernel
+
+
+EXPLANATIONS = {
+    "A": "This product has excellent environmental performance with very low impacts across all indicators.",
+    "B": "This product has good environmental performance with low impacts.",
+    "C": "This product has average environmental performance. There is room for improvement.",
+    "D": "This product has below average environmental performance with notable impacts.",
+    "E": "This product has poor environmental performance with high environmental impacts."
+}
+
+# Insight text for each indicator, indexed by band (-1 = low, 1 = high)
+INDICATOR_INSIGHTS = (
+    {-1: "Low carbon footprint", 1: "High carbon footprint"},
+    {-1: "Low water usage", 1: "High water usage"},
+    {-1: "Low energy consumption", 1: "High energy consumption"}
+)
+
+EXPLANATION_FALLBACK = "Environmental score calculated."
+
+
+def _indicator_band(value: float) -> int:
+    """-1 for a low normalized impact (< 30), 1 for a high one (> 70), else 0"""
+    if value < 30:
+        return -1
+    if value > 70:
+        return 1
+    return 0
+
+
+@lru_cache(maxsize=1024)
+def _compose_explanation(
+    letter: str,
+    co2_band: int,
+    water_band: int,
+    energy_band: int,
+    bonuses: Tuple[str, ...],
+    penalties: Tuple[str, ...]
+) -> str:
+    """Build the explanation text for a grade, indicator bands and adjustments"""
+    base_explanation = EXPLANATIONS.get(letter, EXPLANATION_FALLBACK)
+    
+    # Add indicator insights
+    insights = [
+        texts[band]
+        for texts, band in zip(INDICATOR_INSIGHTS, (co2_band, water_band, energy_band))
+        if band
+    ]
+    
+    if bonuses:
+        insights.append(f"Bonuses: {', '.join(bonuses)}")
+    if penalties:
+        insights.append(f"Concerns: {', '.join(penalties)}")
+    
+    if insights:
+        return f"{base_explanation} Key factors: {'; '.join(insights)}."
+    
+    return base_explanation
 
 
 class ScoreCalculator:
@@ -27,6 +89,8 @@ class ScoreCalculator:
         "D": (60, 80),     # Poor
         "E": (80, 100)     # Very poor
     }
+    GRADE_LETTERS = "ABCDE"
+    GRADE_BAND_WIDTH = 20
     
     # Bonus/malus adjustments (points)
     ADJUSTMENTS = {
@@ -43,6 +107,24 @@ class ScoreCalculator:
         "long_distance_transport": +7
     }
     
+    # Labels for the adjustments accepted by apply_bonus_malus, in argument order
+    ADJUSTMENT_LABELS = (
+        ("bio_certified", "Organic Certification"),
+        ("recyclable_packaging", "Recyclable Packaging"),
+        ("local_sourcing", "Local Sourcing"),
+        ("fair_trade", "Fair Trade Certified"),
+        ("endangered_species", "Endangered Species Risk"),
+        ("deforestation_risk", "Deforestation Risk")
+    )
+    
+    # Parallel-array view of ADJUSTMENTS for index-based lookups
+    _ADJ_KEYS = tuple(ADJUSTMENTS)
+    _ADJ_POINTS = np.array(tuple(ADJUSTMENTS.values()), dtype=np.int8)
+    _ADJ_INDEX = {key: i for i, key in enumerate(_ADJ_KEYS)}
+    
+    # Weight vector that passes an already weighted score through the kernel
+    _UNIT_WEIGHT = np.ones(1, dtype=np.float64)
+    
     def __init__(self, weights: Dict[str, float] = None):
         """
         Initialize calculator with optional custom weights
@@ -57,6 +139,20 @@ class ScoreCalculator:
         if abs(total - 1.0) > 0.01:
             for key in self.weights:
                 self.weights[key] /= total
+        
+        # (type, label, points) rows and their points vector for batch adjustments
+        self._adjustment_table = tuple(
+            (key, label, self.ADJUSTMENTS[key]) for key, label in self.ADJUSTMENT_LABELS
+        )
+        self._adjustment_points = self._ADJ_POINTS[
+            [self._ADJ_INDEX[key] for key, _ in self.ADJUSTMENT_LABELS]
+        ]
+        
+        # Weight vector in (co2, water, energy) column order for batch scoring
+        self._w = np.array(
+            [self.weights["co2"], self.weights["water"], self.weights["energy"]],
+            dtype=np.float64
+        )
     
     def calculate_weighted_score(
         self,
@@ -83,6 +179,41 @@ class ScoreCalculator:
         
         return max(0, min(100, score))
     
+    def calculate_weighted_score_batch(
+        self,
+        normalized_co2: np.ndarray,
+        normalized_water: Optional[np.ndarray] = None,
+        normalized_energy: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Calculate weighted scores for many products at once
+        
+        Runs the same scoring kernel as score_batch, with no bonus/malus columns.
+        
+        Args:
+            normalized_co2: Normalized CO2 scores, or an (N, 3) matrix of
+                (co2, water, energy) rows when the other arguments are omitted
+            normalized_water: Normalized water scores
+            normalized_energy: Normalized energy scores
+            
+        Returns:
+            Array of weighted scores (0-100, lower is better)
+        """
+        if normalized_water is None and normalized_energy is None:
+            indicators = np.asarray(normalized_co2, dtype=np.float64)
+        else:
+            indicators = np.column_stack(
+                (normalized_co2, normalized_water, normalized_energy)
+            ).astype(np.float64, copy=False)
+        
+        base_scores, _, _ = score_kernel(
+            indicators,
+            np.zeros((len(indicators), 0), dtype=np.int8),
+            self._w,
+            self._adjustment_points[:0]
+        )
+        return base_scores
+    
     def apply_bonus_malus(
         self,
         base_score: float,
@@ -108,70 +239,108 @@ class ScoreCalculator:
         Returns:
             Dictionary with adjusted score and adjustment details
         """
-        adjustments = []
-        total_adjustment = 0
+        flags = (
+            bio_certified,
+            recyclable_packaging,
+            local_sourcing,
+            fair_trade,
+            endangered_species,
+            deforestation_risk
+        )
+        adjustments = self.list_adjustments(flags)
+        total_adjustment = sum(adj["points"] for adj in adjustments)
         
-        if bio_certified:
-            adj = self.ADJUSTMENTS["bio_certified"]
-            total_adjustment += adj
-            adjustments.append({
-                "type": "bio_certified",
-                "label": "Organic Certification",
-                "points": adj
-            })
+        adjusted_score = max(0, min(100, base_score + total_adjustment))
         
-        if recyclable_packaging:
-            adj = self.ADJUSTMENTS["recyclable_packaging"]
-            total_adjustment += adj
-            adjustments.append({
-                "type": "recyclable_packaging",
-                "label": "Recyclable Packaging",
-                "points": adj
-            })
+        return {
+            "base_score": base_score,
+            "total_adjustment": total_adjustment,
+            "adjusted_score": adjusted_score,
+            "adjustments": adjustments
+        }
+    
+    def list_adjustments(self, flags) -> List[Dict[str, Any]]:
+        """
+        Adjustment details for one product's bonus/malus flags
+        
+        Args:
+            flags: Flags in ADJUSTMENT_LABELS order
+            
+        Returns:
+            List of applied adjustments with type, label and points
+        """
+        return [
+            {"type": key, "label": label, "points": points}
+            for (key, label, points), flag in zip(self._adjustment_table, flags)
+            if flag
+        ]
+    
+    def apply_bonus_malus_batch(
+        self,
+        base_scores: np.ndarray,
+        flags: np.ndarray
+    ) -> np.ndarray:
+        """
+        Apply bonus and malus adjustments to many base scores at once
         
-        if local_sourcing:
-            adj = self.ADJUSTMENTS["local_sourcing"]
-            total_adjustment += adj
-            adjustments.append({
-                "type": "local_sourcing",
-                "label": "Local Sourcing",
-                "points": adj
-            })
+        Runs the same scoring kernel as score_batch, with each base score as
+        a single indicator of weight 1.
         
-        if fair_trade:
-            adj = self.ADJUSTMENTS["fair_trade"]
-            total_adjustment += adj
-            adjustments.append({
-                "type": "fair_trade",
-                "label": "Fair Trade Certified",
-                "points": adj
-            })
+        Args:
+            base_scores: Base weighted scores (0-100), shape (N,)
+            flags: Boolean matrix of shape (N, K) with columns in
+                ADJUSTMENT_LABELS order
+            
+        Returns:
+            Adjusted scores clipped to 0-100
+        """
+        _, adjusted_scores, _ = score_kernel(
+            np.asarray(base_scores, dtype=np.float64).reshape(-1, 1),
+            flags,
+            self._UNIT_WEIGHT,
+            self._adjustment_points
+        )
+        return adjusted_scores
+    
+    def apply_bonus_malus_mask(self, mask: np.ndarray) -> int:
+        """
+        Total adjustment for a boolean mask over every ADJUSTMENTS entry
         
-        if endangered_species:
-            adj = self.ADJUSTMENTS["endangered_species"]
-            total_adjustment += adj
-            adjustments.append({
-                "type": "endangered_species",
-                "label": "Endangered Species Risk",
-                "points": adj
-            })
+        Args:
+            mask: Boolean array of shape (len(ADJUSTMENTS),), in ADJUSTMENTS order
+            
+        Returns:
+            Total adjustment in points
+        """
+        return int((np.asarray(mask) * self._ADJ_POINTS).sum())
+    
+    def score_batch(
+        self,
+        indicators: np.ndarray,
+        flags: Optional[np.ndarray] = None
+    ) -> Dict[str, Any]:
+        """
+        Score many products in one pass of the native scoring kernel
         
-        if deforestation_risk:
-            adj = self.ADJUSTMENTS["deforestation_risk"]
-            total_adjustment += adj
-            adjustments.append({
-                "type": "deforestation_risk",
-                "label": "Deforestation Risk",
-                "points": adj
-            })
+        Args:
+            indicators: (N, 3) matrix of normalized (co2, water, energy) scores
+            flags: Optional (N, K) bonus/malus flags in ADJUSTMENT_LABELS order
+            
+        Returns:
+            Dictionary with base scores, adjusted scores and letter grades
+        """
+        indicators = np.asarray(indicators, dtype=np.float64)
+        if flags is None:
+            flags = np.zeros((len(indicators), len(self.ADJUSTMENT_LABELS)), dtype=np.int8)
         
-        adjusted_score = max(0, min(100, base_score + total_adjustment))
+        base_scores, adjusted_scores, grades = score_kernel(
+            indicators, flags, self._w, self._adjustment_points
+        )
         
         return {
-            "base_score": base_score,
-            "total_adjustment": total_adjustment,
-            "adjusted_score": adjusted_score,
-            "adjustments": adjustments
+            "base_scores": base_scores,
+            "adjusted_scores": adjusted_scores,
+            "letters": [self.GRADE_LETTERS[grade] for grade in grades]
         }
     
     def numeric_to_letter(self, score: float) -> str:
@@ -184,14 +353,13 @@ class ScoreCalculator:
         Returns:
             Letter grade (A-E)
         """
-        for letter, (min_val, max_val) in self.GRADE_THRESHOLDS.items():
-            if min_val <= score < max_val:
-                return letter
+        # NaN compares false against every band, so grade it explicitly
+        if math.isnan(score):
+            return self.GRADE_LETTERS[-1]
         
-        # Edge cases
-        if score < 0:
-            return "A"
-        return "E"
+        # Grades are equal-width bands, so the letter is an index into GRADE_LETTERS;
+        # scores below 0 clamp to A and scores from 100 up (or infinite) clamp to E
+        return self.GRADE_LETTERS[min(int(min(max(score, 0), 100)) // self.GRADE_BAND_WIDTH, 4)]
     
     def letter_to_numeric_range(self, letter: str) -> tuple:
         """
@@ -224,52 +392,24 @@ class ScoreCalculator:
         Returns:
             Explanation string
         """
-        explanations = {
-            "A": "This product has excellent environmental performance with very low impacts across all indicators.",
-            "B": "This product has good environmental performance with low impacts.",
-            "C": "This product has average environmental performance. There is room for improvement.",
-            "D": "This product has below average environmental performance with notable impacts.",
-            "E": "This product has poor environmental performance with high environmental impacts."
-        }
-        
-        base_explanation = explanations.get(letter, "Environmental score calculated.")
-        
-        # Add indicator insights
-        insights = []
-        
-        co2_norm = normalized_indicators.get("co2_normalized", 50)
-        water_norm = normalized_indicators.get("water_normalized", 50)
-        energy_norm = normalized_indicators.get("energy_normalized", 50)
-        
-        if co2_norm < 30:
-            insights.append("Low carbon footprint")
-        elif co2_norm > 70:
-            insights.append("High carbon footprint")
-        
-        if water_norm < 30:
-            insights.append("Low water usage")
-        elif water_norm > 70:
-            insights.append("High water usage")
-        
-        if energy_norm < 30:
-            insights.append("Low energy consumption")
-        elif energy_norm > 70:
-            insights.append("High energy consumption")
+        get = normalized_indicators.get
         
         # Add adjustment info
         if adjustments:
-            bonuses = [a["label"] for a in adjustments if a["points"] < 0]
-            penalties = [a["label"] for a in adjustments if a["points"] > 0]
-            
-            if bonuses:
-                insights.append(f"Bonuses: {', '.join(bonuses)}")
-            if penalties:
-                insights.append(f"Concerns: {', '.join(penalties)}")
-        
-        if insights:
-            return f"{base_explanation} Key factors: {'; '.join(insights)}."
-        
-        return base_explanation
+            bonuses = tuple(a["label"] for a in adjustments if a["points"] < 0)
+            penalties = tuple(a["label"] for a in adjustments if a["points"] > 0)
+        else:
+            bonuses = penalties = ()
+        
+        # The text only depends on these coarse inputs, so it is cached on them
+        return _compose_explanation(
+            letter,
+            _indicator_band(get("co2_normalized", 50)),
+            _indicator_band(get("water_normalized", 50)),
+            _indicator_band(get("energy_normalized", 50)),
+            bonuses,
+            penalties
+        )
     
     def get_weights(self) -> Dict[str, float]:
         """Get current indicator weights"""
@@ -313,17 +453,13 @@ class ScoreCalculator:
         Returns:
             Simulation results
         """
-        potential_savings = 0
-        improvement_details = []
-        
-        for improvement in improvements:
-            if improvement in self.ADJUSTMENTS:
-                saving = abs(self.ADJUSTMENTS[improvement])
-                potential_savings += saving
-                improvement_details.append({
-                    "improvement": improvement,
-                    "potential_points": saving
-                })
+        indices = [self._ADJ_INDEX[key] for key in improvements if key in self._ADJ_INDEX]
+        savings = np.abs(self._ADJ_POINTS[indices])
+        potential_savings = int(savings.sum())
+        improvement_details = [
+            {"improvement": self._ADJ_KEYS[index], "potential_points": int(saving)}
+            for index, saving in zip(indices, savings)
+        ]
         
         new_score = max(0, current_score - potential_savings)
         current_grade = self.numeric_to_letter(current_score)
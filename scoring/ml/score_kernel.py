@@ -0,0 +1,221 @@
+"""
+Score Kernel
+Native batch kernels: normalization, confidence, and weighted score with
+bonus/malus and grade index in one pass
+"""
+
+from typing import Tuple
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+GRADE_BAND_WIDTH = 20
+MAX_GRADE_INDEX = 4
+
+# Indicators below all of these are treated as negligible and normalized to 0
+NEGLIGIBLE_LIMITS = (0.01, 10.0, 0.5)
+
+
+def _normalize_kernel_numpy(
+    indicators: np.ndarray,
+    slopes: np.ndarray,
+    intercepts: np.ndarray
+) -> np.ndarray:
+    """Vectorized NumPy normalization, used when Numba is not installed"""
+    negligible = np.all(indicators < np.asarray(NEGLIGIBLE_LIMITS), axis=1)
+    normalized = np.clip(indicators * slopes + intercepts, 0.0, 100.0)
+    normalized[negligible] = 0.0
+    return normalized
+
+
+def _confidence_kernel_numpy(normalized: np.ndarray) -> np.ndarray:
+    """Vectorized NumPy confidence, used when Numba is not installed"""
+    scores = np.where(
+        (normalized < 5) | (normalized > 95),
+        0.7,
+        np.where((normalized < 10) | (normalized > 90), 0.85, 1.0)
+    )
+    return (scores[:, 0] + scores[:, 1] + scores[:, 2]) / 3
+
+
+def _score_kernel_numpy(
+    indicators: np.ndarray,
+    flags: np.ndarray,
+    weights: np.ndarray,
+    adjustment_points: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized NumPy implementation, used when Numba is not installed"""
+    base_scores = indicators @ weights
+    # A NaN weighted score counts as worst, like calculate_weighted_score
+    base_scores = np.clip(np.where(np.isnan(base_scores), 100.0, base_scores), 0, 100)
+    adjusted_scores = np.clip(base_scores + flags @ adjustment_points, 0, 100)
+    # NaN scores take the worst grade
+    grades = np.minimum(
+        np.nan_to_num(adjusted_scores, nan=100.0).astype(np.int64) // GRADE_BAND_WIDTH,
+        MAX_GRADE_INDEX
+    ).astype(np.int8)
+    return base_scores, adjusted_scores, grades
+
+
+# Kernels run serially: batches are small (MAX_BATCH_SIZE rows), and
+# parallel=True can hang interpreter exit when first called off the main thread
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _normalize_kernel_numba(indicators, slopes, intercepts):
+        n = indicators.shape[0]
+        normalized = np.empty((n, 3), dtype=np.float64)
+
+        for i in range(n):
+            negligible = (
+                indicators[i, 0] < NEGLIGIBLE_LIMITS[0]
+                and indicators[i, 1] < NEGLIGIBLE_LIMITS[1]
+                and indicators[i, 2] < NEGLIGIBLE_LIMITS[2]
+            )
+            for j in range(3):
+                if negligible:
+                    normalized[i, j] = 0.0
+                else:
+                    value = indicators[i, j] * slopes[j] + intercepts[j]
+                    normalized[i, j] = min(max(value, 0.0), 100.0)
+
+        return normalized
+
+    @njit(cache=True)
+    def _confidence_kernel_numba(normalized):
+        n = normalized.shape[0]
+        confidence = np.empty(n, dtype=np.float64)
+
+        for i in range(n):
+            total = 0.0
+            for j in range(3):
+                value = normalized[i, j]
+                if value < 5 or value > 95:
+                    total += 0.7
+                elif value < 10 or value > 90:
+                    total += 0.85
+                else:
+                    total += 1.0
+            confidence[i] = total / 3
+
+        return confidence
+
+    @njit(cache=True)
+    def _score_kernel_numba(indicators, flags, weights, adjustment_points):
+        n = indicators.shape[0]
+        base_scores = np.empty(n, dtype=np.float64)
+        adjusted_scores = np.empty(n, dtype=np.float64)
+        grades = np.empty(n, dtype=np.int8)
+
+        for i in range(n):
+            base = 0.0
+            for j in range(indicators.shape[1]):
+                base += indicators[i, j] * weights[j]
+            # A NaN weighted score counts as worst, like calculate_weighted_score
+            if np.isnan(base):
+                base = 100.0
+            base = min(max(base, 0.0), 100.0)
+
+            adjustment = 0.0
+            for k in range(flags.shape[1]):
+                adjustment += flags[i, k] * adjustment_points[k]
+            adjusted = min(max(base + adjustment, 0.0), 100.0)
+
+            base_scores[i] = base
+            adjusted_scores[i] = adjusted
+            if np.isnan(adjusted):
+                grades[i] = MAX_GRADE_INDEX
+            else:
+                grades[i] = min(int(adjusted) // GRADE_BAND_WIDTH, MAX_GRADE_INDEX)
+
+        return base_scores, adjusted_scores, grades
+
+
+def score_kernel(
+    indicators: np.ndarray,
+    flags: np.ndarray,
+    weights: np.ndarray,
+    adjustment_points: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Score a batch of products
+
+    Args:
+        indicators: (N, 3) normalized co2, water and energy scores
+        flags: (N, K) bonus/malus flags
+        weights: (3,) indicator weights
+        adjustment_points: (K,) points for each flag column
+
+    Returns:
+        Tuple of (base scores, adjusted scores, grade indices 0-4 for A-E)
+    """
+    indicators = np.ascontiguousarray(indicators, dtype=np.float64)
+    flags = np.ascontiguousarray(flags, dtype=np.int8)
+    weights = np.ascontiguousarray(weights, dtype=np.float64)
+    adjustment_points = np.ascontiguousarray(adjustment_points, dtype=np.float64)
+
+    if NUMBA_AVAILABLE:
+        return _score_kernel_numba(indicators, flags, weights, adjustment_points)
+    return _score_kernel_numpy(indicators, flags, weights, adjustment_points)
+
+
+def normalize_kernel(
+    indicators: np.ndarray,
+    slopes: np.ndarray,
+    intercepts: np.ndarray
+) -> np.ndarray:
+    """
+    Min-max normalize a batch of raw indicators to 0-100
+
+    Args:
+        indicators: (N, 3) raw co2, water and energy values per kg
+        slopes: (3,) affine slopes
+        intercepts: (3,) affine intercepts
+
+    Returns:
+        (N, 3) normalized values
+    """
+    indicators = np.ascontiguousarray(indicators, dtype=np.float64)
+    slopes = np.ascontiguousarray(slopes, dtype=np.float64)
+    intercepts = np.ascontiguousarray(intercepts, dtype=np.float64)
+
+    if NUMBA_AVAILABLE:
+        return _normalize_kernel_numba(indicators, slopes, intercepts)
+    return _normalize_kernel_numpy(indicators, slopes, intercepts)
+
+
+def confidence_kernel(normalized: np.ndarray) -> np.ndarray:
+    """
+    Confidence for a batch of normalized indicators
+
+    Args:
+        normalized: (N, 3) normalized co2, water and energy values
+
+    Returns:
+        (N,) confidence scores (0-1)
+    """
+    normalized = np.ascontiguousarray(normalized, dtype=np.float64)
+
+    if NUMBA_AVAILABLE:
+        return _confidence_kernel_numba(normalized)
+    return _confidence_kernel_numpy(normalized)
+
+
+def warmup() -> None:
+    """
+    Compile the Numba kernels ahead of the first request
+
+    Runs each kernel once on a one-row batch with the same argument types
+    the scoring routes pass, so the JIT (or on-disk cache load) cost is paid
+    at startup instead of by the first /score/batch call.
+    """
+    if not NUMBA_AVAILABLE:
+        return
+
+    normalized = normalize_kernel(np.zeros((1, 3)), np.ones(3), np.zeros(3))
+    confidence_kernel(normalized)
+    score_kernel(normalized, np.zeros((1, 1), dtype=np.int8), np.ones(3), np.zeros(1))
@@ -1,93 +1,106 @@
 """
 Score Normalizer
-Normalizes LCA indicators using scikit-learn
+Normalizes LCA indicators with min-max scaling against reference ranges
 """
 
+from enum import IntEnum
+from types import MappingProxyType
 from typing import Dict, Any, List, Optional
 import numpy as np
 
-try:
-    from sklearn.preprocessing import MinMaxScaler, StandardScaler
-    SKLEARN_AVAILABLE = True
-except ImportError:
-    SKLEARN_AVAILABLE = False
+from .score_kernel import confidence_kernel, normalize_kernel
+
+
+# Reference values for normalization (typical product ranges)
+# Based on average food product impacts per kg
+# STRICT THRESHOLDS - Only low-impact foods get good scores
+_REFERENCE_RANGES = {
+    "co2": {
+        "min": 0.1,    # Very low impact (vegetables)
+        "max": 3.0,    # Moderate impact (most processed foods should score poorly)
+        "median": 1.5,
+        "unit": "kg CO2e/kg"
+    },
+    "water": {
+        "min": 100,     # Low water footprint
+        "max": 1500,    # Moderate water footprint (strict threshold)
+        "median": 800,
+        "unit": "L/kg"
+    },
+    "energy": {
+        "min": 1.0,    # Low energy
+        "max": 8.0,    # Moderate energy (strict threshold)
+        "median": 4.0,
+        "unit": "MJ/kg"
+    }
+}
+
+# Read-only view: the arrays below are derived from these values at import
+REFERENCE_RANGES = MappingProxyType({
+    name: MappingProxyType(ref) for name, ref in _REFERENCE_RANGES.items()
+})
+
+
+class Indicator(IntEnum):
+    """Position of each indicator in the reference arrays"""
+    CO2 = 0
+    WATER = 1
+    ENERGY = 2
+
+
+_LOOKUP = {indicator.name.lower(): indicator for indicator in Indicator}
+
+# Reference values as flat arrays indexed by Indicator
+_MINS = np.array([REFERENCE_RANGES[name]["min"] for name in _LOOKUP], dtype=np.float64)
+_MAXES = np.array([REFERENCE_RANGES[name]["max"] for name in _LOOKUP], dtype=np.float64)
+_MEDIANS = np.array([REFERENCE_RANGES[name]["median"] for name in _LOOKUP], dtype=np.float64)
+_UNITS = tuple(REFERENCE_RANGES[name]["unit"] for name in _LOOKUP)
+
+# Min-max scaling to 0-100 is the affine map x * k + b
+_SPANS = _MAXES - _MINS
+_SLOPES = np.divide(100.0, _SPANS, out=np.zeros(3), where=_SPANS != 0)
+_INTERCEPTS = np.where(_SPANS != 0, -_MINS * _SLOPES, 50.0)
+
+
+def _clip(value: float) -> float:
+    """Clip a normalized value to the 0-100 range"""
+    if value < 0.0:
+        return 0.0
+    if value > 100.0:
+        return 100.0
+    return value
+
+
+def _confidence_weight(value: float) -> float:
+    """Confidence for one normalized value, lower near the ends of the range"""
+    if value < 5 or value > 95:
+        return 0.7
+    if value < 10 or value > 90:
+        return 0.85
+    return 1.0
 
 
 class ScoreNormalizer:
     """
-    Normalizes LCA indicators to a common scale using scikit-learn
+    Normalizes LCA indicators to a common 0-100 scale
     """
     
-    # Reference values for normalization (typical product ranges)
-    # Based on average food product impacts per kg
-    # STRICT THRESHOLDS - Only low-impact foods get good scores
-    REFERENCE_RANGES = {
-        "co2": {
-            "min": 0.1,    # Very low impact (vegetables)
-            "max": 3.0,    # Moderate impact (most processed foods should score poorly)
-            "median": 1.5,
-            "unit": "kg CO2e/kg"
-        },
-        "water": {
-            "min": 100,     # Low water footprint
-            "max": 1500,    # Moderate water footprint (strict threshold)
-            "median": 800,
-            "unit": "L/kg"
-        },
-        "energy": {
-            "min": 1.0,    # Low energy
-            "max": 8.0,    # Moderate energy (strict threshold)
-            "median": 4.0,
-            "unit": "MJ/kg"
-        }
-    }
+    __slots__ = (
+        "_co2_k", "_co2_b",
+        "_water_k", "_water_b",
+        "_energy_k", "_energy_b"
+    )
     
-    def __init__(self, use_sklearn: bool = True):
-        """
-        Initialize normalizer
-        
-        Args:
-            use_sklearn: Whether to use scikit-learn for normalization
-        """
-        self.use_sklearn = use_sklearn and SKLEARN_AVAILABLE
-        
-        # Initialize scalers if sklearn is available
-        if self.use_sklearn:
-            self._init_scalers()
+    REFERENCE_RANGES = REFERENCE_RANGES
     
-    def _init_scalers(self):
-        """Initialize scikit-learn scalers with reference data"""
-        # Create reference data for fitting scalers
-        n_samples = 100
-        
-        # Generate synthetic reference data based on known ranges
-        co2_data = np.linspace(
-            self.REFERENCE_RANGES["co2"]["min"],
-            self.REFERENCE_RANGES["co2"]["max"],
-            n_samples
-        ).reshape(-1, 1)
-        
-        water_data = np.linspace(
-            self.REFERENCE_RANGES["water"]["min"],
-            self.REFERENCE_RANGES["water"]["max"],
-            n_samples
-        ).reshape(-1, 1)
-        
-        energy_data = np.linspace(
-            self.REFERENCE_RANGES["energy"]["min"],
-            self.REFERENCE_RANGES["energy"]["max"],
-            n_samples
-        ).reshape(-1, 1)
-        
-        # Fit scalers
-        self.co2_scaler = MinMaxScaler(feature_range=(0, 100))
-        self.co2_scaler.fit(co2_data)
-        
-        self.water_scaler = MinMaxScaler(feature_range=(0, 100))
-        self.water_scaler.fit(water_data)
-        
-        self.energy_scaler = MinMaxScaler(feature_range=(0, 100))
-        self.energy_scaler.fit(energy_data)
+    def __init__(self):
+        """Initialize normalizer"""
+        # Python floats keep the scalar path free of NumPy scalar overhead
+        slopes = _SLOPES.tolist()
+        intercepts = _INTERCEPTS.tolist()
+        self._co2_k, self._co2_b = slopes[Indicator.CO2], intercepts[Indicator.CO2]
+        self._water_k, self._water_b = slopes[Indicator.WATER], intercepts[Indicator.WATER]
+        self._energy_k, self._energy_b = slopes[Indicator.ENERGY], intercepts[Indicator.ENERGY]
     
     def normalize(
         self,
@@ -106,98 +119,45 @@ class ScoreNormalizer:
         Returns:
             Dictionary with normalized values (0 = best, 100 = worst)
         """
-        if self.use_sklearn:
-            return self._normalize_sklearn(co2, water, energy)
-        else:
-            return self._normalize_manual(co2, water, energy)
-    
-    def _normalize_sklearn(
-        self,
-        co2: float,
-        water: float,
-        energy: float
-    ) -> Dict[str, float]:
-        """Normalize using scikit-learn scalers"""
         # Handle near-zero values (exceptional products like pure water)
         # If all impacts are negligible, assign excellent scores
         if co2 < 0.01 and water < 10 and energy < 0.5:
             return {
                 "co2_normalized": 0.0,
                 "water_normalized": 0.0,
-                "energy_normalized": 0.0,
-                "co2_raw": co2,
-                "water_raw": water,
-                "energy_raw": energy
+                "energy_normalized": 0.0
             }
         
-        # Transform values
-        co2_normalized = self.co2_scaler.transform([[co2]])[0][0]
-        water_normalized = self.water_scaler.transform([[water]])[0][0]
-        energy_normalized = self.energy_scaler.transform([[energy]])[0][0]
-        
-        # Clip to 0-100 range
-        co2_normalized = np.clip(co2_normalized, 0, 100)
-        water_normalized = np.clip(water_normalized, 0, 100)
-        energy_normalized = np.clip(energy_normalized, 0, 100)
-        
         return {
-            "co2_normalized": float(co2_normalized),
-            "water_normalized": float(water_normalized),
-            "energy_normalized": float(energy_normalized),
-            "co2_raw": co2,
-            "water_raw": water,
-            "energy_raw": energy
+            "co2_normalized": _clip(co2 * self._co2_k + self._co2_b),
+            "water_normalized": _clip(water * self._water_k + self._water_b),
+            "energy_normalized": _clip(energy * self._energy_k + self._energy_b)
         }
     
-    def _normalize_manual(
+    def normalize_batch(
         self,
-        co2: float,
-        water: float,
-        energy: float
-    ) -> Dict[str, float]:
-        """Normalize using manual min-max scaling"""
-        # Handle near-zero values (exceptional products like pure water)
-        if co2 < 0.01 and water < 10 and energy < 0.5:
-            return {
-                "co2_normalized": 0.0,
-                "water_normalized": 0.0,
-                "energy_normalized": 0.0,
-                "co2_raw": co2,
-                "water_raw": water,
-                "energy_raw": energy
-            }
-        
-        def scale(value: float, min_val: float, max_val: float) -> float:
-            if max_val == min_val:
-                return 50.0
-            scaled = (value - min_val) / (max_val - min_val) * 100
-            return max(0, min(100, scaled))
-        
-        co2_normalized = scale(
-            co2,
-            self.REFERENCE_RANGES["co2"]["min"],
-            self.REFERENCE_RANGES["co2"]["max"]
-        )
-        
-        water_normalized = scale(
-            water,
-            self.REFERENCE_RANGES["water"]["min"],
-            self.REFERENCE_RANGES["water"]["max"]
-        )
+        co2: np.ndarray,
+        water: np.ndarray,
+        energy: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """
+        Normalize many products' LCA indicators at once
         
-        energy_normalized = scale(
-            energy,
-            self.REFERENCE_RANGES["energy"]["min"],
-            self.REFERENCE_RANGES["energy"]["max"]
-        )
+        Args:
+            co2: CO2 equivalents in kg
+            water: Water consumption in liters
+            energy: Energy consumption in MJ
+            
+        Returns:
+            Dictionary of arrays with the same keys as normalize()
+        """
+        raw = np.column_stack((co2, water, energy)).astype(np.float64, copy=False)
+        normalized = normalize_kernel(raw, _SLOPES, _INTERCEPTS)
         
         return {
-            "co2_normalized": co2_normalized,
-            "water_normalized": water_normalized,
-            "energy_normalized": energy_normalized,
-            "co2_raw": co2,
-            "water_raw": water,
-            "energy_raw": energy
+            "co2_normalized": normalized[:, 0],
+            "water_normalized": normalized[:, 1],
+            "energy_normalized": normalized[:, 2]
         }
     
     def calculate_confidence(
@@ -213,21 +173,31 @@ class ScoreNormalizer:
         Returns:
             Confidence score (0-1)
         """
-        scores = []
+        # Values close to extremes reduce confidence
+        return (
+            _confidence_weight(normalized_indicators.get("co2_normalized", 50))
+            + _confidence_weight(normalized_indicators.get("water_normalized", 50))
+            + _confidence_weight(normalized_indicators.get("energy_normalized", 50))
+        ) / 3
+    
+    def calculate_confidence_batch(
+        self,
+        normalized_indicators: Dict[str, np.ndarray]
+    ) -> np.ndarray:
+        """
+        Calculate confidence scores for a batch from normalize_batch output
         
-        # Check if values are within expected ranges
-        for key in ["co2_normalized", "water_normalized", "energy_normalized"]:
-            value = normalized_indicators.get(key, 50)
+        Args:
+            normalized_indicators: Normalized indicator arrays
             
-            # Values close to extremes reduce confidence
-            if value < 5 or value > 95:
-                scores.append(0.7)
-            elif value < 10 or value > 90:
-                scores.append(0.85)
-            else:
-                scores.append(1.0)
-        
-        return sum(scores) / len(scores)
+        Returns:
+            Array of confidence scores (0-1)
+        """
+        return confidence_kernel(np.column_stack((
+            normalized_indicators["co2_normalized"],
+            normalized_indicators["water_normalized"],
+            normalized_indicators["energy_normalized"]
+        )))
     
     def get_percentile(
         self,
@@ -244,18 +214,19 @@ class ScoreNormalizer:
         Returns:
             Percentile (0-100)
         """
-        if indicator not in self.REFERENCE_RANGES:
+        i = _LOOKUP.get(indicator)
+        if i is None:
             return 50.0
         
-        ref = self.REFERENCE_RANGES[indicator]
+        min_val, max_val = _MINS[i], _MAXES[i]
         
-        if value <= ref["min"]:
+        if value <= min_val:
             return 0.0
-        if value >= ref["max"]:
+        if value >= max_val:
             return 100.0
         
         # Simple linear interpolation
-        return (value - ref["min"]) / (ref["max"] - ref["min"]) * 100
+        return float((value - min_val) / (max_val - min_val) * 100)
     
     def compare_to_median(
         self,
@@ -272,11 +243,11 @@ class ScoreNormalizer:
         Returns:
             Comparison result
         """
-        if indicator not in self.REFERENCE_RANGES:
+        i = _LOOKUP.get(indicator)
+        if i is None:
             return {"comparison": "unknown"}
         
-        ref = self.REFERENCE_RANGES[indicator]
-        median = ref["median"]
+        median = float(_MEDIANS[i])
         
         ratio = value / median if median > 0 else 1.0
         
@@ -295,5 +266,5 @@ class ScoreNormalizer:
             "comparison": comparison,
             "ratio_to_median": round(ratio, 2),
             "median_value": median,
-            "unit": ref["unit"]
+            "unit": _UNITS[i]
         }
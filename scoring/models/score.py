@@ -4,9 +4,8 @@ Score models for scoring service
 
 from datetime import datetime
 from typing import Optional, Dict, Any
-from pydantic import BaseModel
-from sqlalchemy import Column, String, Float, DateTime, JSON
-from sqlalchemy.dialects.postgresql import UUID
+from pydantic import BaseModel, ConfigDict
+from sqlalchemy import Column, String, Float, DateTime, JSON, Index, Uuid
 import uuid
 
 from database.connection import Base
@@ -16,8 +15,8 @@ class ScoreDB(Base):
     """SQLAlchemy model for eco-scores"""
     __tablename__ = "eco_scores"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    product_id = Column(String(50), nullable=True, index=True)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    product_id = Column(String(50), nullable=True)
     lca_id = Column(String(50), nullable=True, index=True)
     score_numeric = Column(Float, nullable=False)
     score_letter = Column(String(1), nullable=False)
@@ -25,12 +24,19 @@ class ScoreDB(Base):
     confidence = Column(Float, default=0.0)
     breakdown = Column(JSON, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Serves the newest-first product history and latest-score lookups
+        Index("ix_score_product_created", product_id, created_at.desc()),
+    )
 
 
 # Pydantic models
 
 class ScoreCreate(BaseModel):
     """Pydantic model for creating score"""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     product_id: Optional[str] = None
     lca_id: Optional[str] = None
     score_numeric: float
@@ -49,8 +55,7 @@ class Score(BaseModel):
     confidence: float = 0.0
     breakdown: Optional[Dict[str, Any]] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 class ScoreResponse(BaseModel):
@@ -65,5 +70,4 @@ class ScoreResponse(BaseModel):
     breakdown: Optional[Dict[str, Any]] = None
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
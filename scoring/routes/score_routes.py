@@ -2,27 +2,52 @@
 API routes for eco-score computation
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
+from functools import lru_cache
 from typing import Optional, List
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
+import logging
+import threading
+import numpy as np
 import uuid
 
 from ml.score_normalizer import ScoreNormalizer
 from ml.score_calculator import ScoreCalculator
-from database.connection import get_db
-from database.crud import create_score, get_score, get_scores_by_product
+from database.connection import SessionLocal, get_db
+from database.crud import create_score_fast, create_scores_bulk, get_score, get_scores_by_product
 from models.score import ScoreCreate
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
+# Maximum number of products accepted by /score/batch
+MAX_BATCH_SIZE = 1000
+
 # Initialize ML components
 score_normalizer = ScoreNormalizer()
 score_calculator = ScoreCalculator()
 
+# Weights and thresholds are fixed for the process, so fetch them once
+_WEIGHTS = score_calculator.get_weights()
+_THRESHOLDS = score_calculator.get_thresholds()
+
+# Bonus/malus field names in the calculator's flag column order
+_ADJUSTMENT_NAMES = tuple(name for name, _ in ScoreCalculator.ADJUSTMENT_LABELS)
+_NO_ADJUSTMENTS = [False] * len(_ADJUSTMENT_NAMES)
+
+# Background score writes that failed since startup (reported by /score/stats)
+_write_failures = 0
+_write_failures_lock = threading.Lock()
+
 
 class LCAIndicators(BaseModel):
     """Input model for LCA indicators"""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     co2: float  # kg CO2 equivalent
     water: float  # liters
     energy: float  # MJ
@@ -32,6 +57,8 @@ class LCAIndicators(BaseModel):
 
 class BonusMalus(BaseModel):
     """Bonus/malus adjustments"""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     bio_certified: bool = False
     recyclable_packaging: bool = False
     local_sourcing: bool = False
@@ -42,6 +69,8 @@ class BonusMalus(BaseModel):
 
 class ScoreRequest(BaseModel):
     """Request model for score computation"""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+    
     indicators: LCAIndicators
     bonus_malus: Optional[BonusMalus] = None
     product_weight_kg: Optional[float] = 1.0
@@ -57,94 +86,304 @@ class ScoreResponse(BaseModel):
     breakdown: Optional[dict] = None
 
 
+@lru_cache(maxsize=4096)
+def _compute_core(
+    co2: float,
+    water: float,
+    energy: float,
+    weight: float,
+    bonus_malus: Optional[tuple]
+) -> dict:
+    """
+    Score one product; pure in its inputs, so identical requests share a result
+    
+    Args:
+        co2: CO2 equivalent in kg
+        water: Water consumption in liters
+        energy: Energy consumption in MJ
+        weight: Product weight in kg
+        bonus_malus: Bonus/malus flags as (name, value) pairs, or None
+        
+    Returns:
+        Score result (shared between callers, copy before modifying)
+    """
+    # Normalize indicators per kg of product
+    normalized_indicators = score_normalizer.normalize(
+        co2=co2 / weight,
+        water=water / weight,
+        energy=energy / weight
+    )
+    
+    # Calculate base score
+    base_score = score_calculator.calculate_weighted_score(
+        normalized_co2=normalized_indicators["co2_normalized"],
+        normalized_water=normalized_indicators["water_normalized"],
+        normalized_energy=normalized_indicators["energy_normalized"]
+    )
+    
+    return _build_result(
+        normalized_indicators,
+        base_score,
+        dict(bonus_malus) if bonus_malus is not None else None
+    )
+
+
+def _build_result(
+    normalized_indicators: dict,
+    base_score: float,
+    bonus_malus: Optional[dict] = None
+) -> dict:
+    """Apply adjustments and grade on top of a base score"""
+    # Apply bonus/malus adjustments
+    adjusted_score = base_score
+    adjustments = []
+    
+    if bonus_malus is not None:
+        adjustment_result = score_calculator.apply_bonus_malus(
+            base_score=base_score,
+            **bonus_malus
+        )
+        adjusted_score = adjustment_result["adjusted_score"]
+        adjustments = adjustment_result["adjustments"]
+    
+    return _assemble_result(
+        normalized_indicators,
+        base_score,
+        adjusted_score,
+        score_calculator.numeric_to_letter(adjusted_score),
+        adjustments,
+        score_normalizer.calculate_confidence(normalized_indicators)
+    )
+
+
+def _assemble_result(
+    normalized_indicators: dict,
+    base_score: float,
+    adjusted_score: float,
+    letter_grade: str,
+    adjustments: list,
+    confidence: float
+) -> dict:
+    """Add the explanation to already computed scores and shape the response"""
+    # Clipping can leave int bounds (0, 100); the response schema uses floats
+    base_score = float(base_score)
+    adjusted_score = float(adjusted_score)
+    confidence = float(confidence)
+    
+    explanation = score_calculator.generate_explanation(
+        score=adjusted_score,
+        letter=letter_grade,
+        normalized_indicators=normalized_indicators,
+        adjustments=adjustments
+    )
+    
+    return {
+        "score_numeric": round(adjusted_score, 2),
+        "score_letter": letter_grade,
+        "explanation": explanation,
+        "confidence": round(confidence, 2),
+        "breakdown": {
+            "base_score": round(base_score, 2),
+            "adjusted_score": round(adjusted_score, 2),
+            "normalized_indicators": normalized_indicators,
+            "adjustments": adjustments,
+            "weights": _WEIGHTS
+        }
+    }
+
+
+def _score_values(request: ScoreRequest, result: dict) -> dict:
+    """Build the database column values for a computed score"""
+    return {
+        "product_id": request.indicators.product_id,
+        "lca_id": request.indicators.lca_id,
+        "score_numeric": result["score_numeric"],
+        "score_letter": result["score_letter"],
+        "explanation": result["explanation"],
+        "confidence": result["confidence"],
+        "breakdown": result["breakdown"]
+    }
+
+
+def _score_create(request: ScoreRequest, result: dict) -> ScoreCreate:
+    """Build the database payload for a computed score"""
+    # Every value was produced by the calculator, so skip re-validation
+    return ScoreCreate.model_construct(**_score_values(request, result))
+
+
+def _store_score(values: dict) -> None:
+    """Store a computed score in its own short-lived session"""
+    db = SessionLocal()
+    try:
+        create_score_fast(db, values)
+    finally:
+        db.close()
+
+
+def _persist_score(values: dict) -> None:
+    """Store a computed score after the response is sent, counting failures"""
+    global _write_failures
+    try:
+        _store_score(values)
+    except Exception as e:
+        with _write_failures_lock:
+            _write_failures += 1
+        logger.error(f"Failed to store score {values['id']}: {e}")
+
+
 @router.post("/compute", response_model=ScoreResponse)
 async def compute_score(
     request: ScoreRequest,
-    db: Session = Depends(get_db)
+    background: BackgroundTasks,
+    wait_for_store: bool = Query(
+        default=False,
+        description="Store the score before responding instead of in the background"
+    )
 ):
     """
     Compute eco-score from LCA indicators
     
+    By default the score is stored after the response is sent. The returned
+    id may then not be readable from /score/result/{id} for a short time, and
+    a failed write is only logged and counted in /score/stats. With
+    wait_for_store=true the score is stored first and a failed write returns
+    500.
+    
     Input: LCA indicators (CO2, water, energy)
     Output: Score numeric (0-100), letter grade (A-E), explanation
     """
     try:
-        # Normalize indicators per kg of product
-        weight = request.product_weight_kg or 1.0
-        
-        normalized_indicators = score_normalizer.normalize(
-            co2=request.indicators.co2 / weight,
-            water=request.indicators.water / weight,
-            energy=request.indicators.energy / weight
+        indicators = request.indicators
+        bonus_malus = (
+            tuple(request.bonus_malus.model_dump().items())
+            if request.bonus_malus else None
         )
         
-        # Calculate base score
-        base_score = score_calculator.calculate_weighted_score(
-            normalized_co2=normalized_indicators["co2_normalized"],
-            normalized_water=normalized_indicators["water_normalized"],
-            normalized_energy=normalized_indicators["energy_normalized"]
-        )
+        # Copy the shared cached result before adding this record's id
+        result = dict(_compute_core(
+            indicators.co2,
+            indicators.water,
+            indicators.energy,
+            request.product_weight_kg or 1.0,
+            bonus_malus
+        ))
         
-        # Apply bonus/malus adjustments
-        adjusted_score = base_score
-        adjustments = []
+        score_id = uuid.uuid4()
+        values = {"id": score_id, **_score_values(request, result)}
+        result["id"] = str(score_id)
         
-        if request.bonus_malus:
-            adjustment_result = score_calculator.apply_bonus_malus(
-                base_score=base_score,
-                bio_certified=request.bonus_malus.bio_certified,
-                recyclable_packaging=request.bonus_malus.recyclable_packaging,
-                local_sourcing=request.bonus_malus.local_sourcing,
-                fair_trade=request.bonus_malus.fair_trade,
-                endangered_species=request.bonus_malus.endangered_species,
-                deforestation_risk=request.bonus_malus.deforestation_risk
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Score computation error: {str(e)}")
+    
+    if wait_for_store:
+        try:
+            await run_in_threadpool(_store_score, values)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to store score: {str(e)}")
+    else:
+        # Store score in database once the response has been sent
+        background.add_task(_persist_score, values)
+    
+    # Already plain floats and strings: skip response_model re-validation
+    return ORJSONResponse(result)
+
+
+@router.post("/batch")
+def compute_score_batch(
+    requests: List[ScoreRequest],
+    db: Session = Depends(get_db)
+):
+    """
+    Compute eco-scores for several products in one call
+    
+    Runs in the threadpool: scoring and the bulk insert are synchronous and
+    would otherwise block the event loop for the whole batch.
+    
+    Input: List of score requests
+    Output: Scores in input order, stored in a single transaction
+    """
+    if not requests:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+    if len(requests) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch exceeds {MAX_BATCH_SIZE} products"
+        )
+    
+    try:
+        # Per-kg indicators for the whole batch, normalized in one pass
+        weights = np.fromiter(
+            (request.product_weight_kg or 1.0 for request in requests),
+            dtype=np.float64,
+            count=len(requests)
+        )
+        batch = score_normalizer.normalize_batch(
+            *(
+                np.fromiter(
+                    (getattr(request.indicators, name) for request in requests),
+                    dtype=np.float64,
+                    count=len(requests)
+                ) / weights
+                for name in ("co2", "water", "energy")
             )
-            adjusted_score = adjustment_result["adjusted_score"]
-            adjustments = adjustment_result["adjustments"]
+        )
         
-        # Convert to letter grade
-        letter_grade = score_calculator.numeric_to_letter(adjusted_score)
+        # Bonus/malus flags in the column order the scoring kernel expects
+        flags = np.array(
+            [
+                [getattr(request.bonus_malus, name) for name in _ADJUSTMENT_NAMES]
+                if request.bonus_malus else _NO_ADJUSTMENTS
+                for request in requests
+            ],
+            dtype=np.int8
+        )
         
-        # Generate explanation
-        explanation = score_calculator.generate_explanation(
-            score=adjusted_score,
-            letter=letter_grade,
-            normalized_indicators=normalized_indicators,
-            adjustments=adjustments
+        # Base score, adjusted score and grade for every product in one kernel pass
+        scored = score_calculator.score_batch(
+            np.column_stack((
+                batch["co2_normalized"],
+                batch["water_normalized"],
+                batch["energy_normalized"]
+            )),
+            flags
         )
         
-        # Calculate confidence
-        confidence = score_normalizer.calculate_confidence(normalized_indicators)
+        confidences = score_normalizer.calculate_confidence_batch(batch).tolist()
         
-        result = {
-            "score_numeric": round(adjusted_score, 2),
-            "score_letter": letter_grade,
-            "explanation": explanation,
-            "confidence": round(confidence, 2),
-            "breakdown": {
-                "base_score": round(base_score, 2),
-                "adjusted_score": round(adjusted_score, 2),
-                "normalized_indicators": normalized_indicators,
-                "adjustments": adjustments,
-                "weights": score_calculator.get_weights()
-            }
-        }
+        keys = list(batch)
+        normalized = [
+            dict(zip(keys, row))
+            for row in zip(*(batch[key].tolist() for key in keys))
+        ]
         
-        # Store score in database
-        score_data = ScoreCreate(
-            product_id=request.indicators.product_id,
-            lca_id=request.indicators.lca_id,
-            score_numeric=result["score_numeric"],
-            score_letter=result["score_letter"],
-            explanation=result["explanation"],
-            confidence=result["confidence"],
-            breakdown=result["breakdown"]
-        )
+        results = [
+            _assemble_result(
+                normalized_indicators,
+                base_score,
+                adjusted_score,
+                letter_grade,
+                score_calculator.list_adjustments(row),
+                confidence
+            )
+            for normalized_indicators, base_score, adjusted_score, letter_grade, row, confidence
+            in zip(
+                normalized,
+                scored["base_scores"].tolist(),
+                scored["adjusted_scores"].tolist(),
+                scored["letters"],
+                flags.tolist(),
+                confidences
+            )
+        ]
         
-        db_score = create_score(db, score_data)
-        result["id"] = str(db_score.id)
+        score_ids = create_scores_bulk(
+            db,
+            [_score_create(request, result) for request, result in zip(requests, results)]
+        )
+        for result, score_id in zip(results, score_ids):
+            result["id"] = str(score_id)
         
-        return result
+        return ORJSONResponse({"count": len(results), "scores": results})
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Score computation error: {str(e)}")
@@ -180,10 +419,11 @@ async def get_score_by_id(
 @router.get("/product/{product_id}")
 async def get_scores_for_product(
     product_id: str,
+    limit: Optional[int] = Query(default=None, ge=1),
     db: Session = Depends(get_db)
 ):
-    """Get all scores for a product"""
-    scores = get_scores_by_product(db, product_id)
+    """Get every score for a product, newest first, or only the latest limit scores"""
+    scores = get_scores_by_product(db, product_id, limit)
     
     return {
         "product_id": product_id,
@@ -200,17 +440,27 @@ async def get_scores_for_product(
     }
 
 
+# Thresholds and weights are fixed at startup, so the response is built once
+THRESHOLDS_RESPONSE = {
+    "thresholds": _THRESHOLDS,
+    "weights": _WEIGHTS,
+    "description": {
+        "A": "Excellent - Very low environmental impact",
+        "B": "Good - Low environmental impact",
+        "C": "Average - Moderate environmental impact",
+        "D": "Poor - High environmental impact",
+        "E": "Very Poor - Very high environmental impact"
+    }
+}
+
+
 @router.get("/thresholds")
 async def get_score_thresholds():
     """Get score thresholds for letter grades"""
-    return {
-        "thresholds": score_calculator.get_thresholds(),
-        "weights": score_calculator.get_weights(),
-        "description": {
-            "A": "Excellent - Very low environmental impact",
-            "B": "Good - Low environmental impact",
-            "C": "Average - Moderate environmental impact",
-            "D": "Poor - High environmental impact",
-            "E": "Very Poor - Very high environmental impact"
-        }
-    }
+    return THRESHOLDS_RESPONSE
+
+
+@router.get("/stats")
+async def get_score_stats():
+    """Get counters for background score writes"""
+    return {"background_write_failures": _write_failures}
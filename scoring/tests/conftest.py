@@ -0,0 +1,26 @@
+"""
+Shared fixtures for scoring tests
+"""
+import pytest
+from fastapi.testclient import TestClient
+import sys
+import os
+import tempfile
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Run against a throwaway SQLite file (one per process, so xdist workers don't share it)
+os.environ.setdefault(
+    "DATABASE_URL",
+    f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'scoring_test.db')}"
+)
+
+from main import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Test client shared by the whole session (lifespan runs once)"""
+    with TestClient(app) as test_client:
+        yield test_client
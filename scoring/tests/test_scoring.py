@@ -2,19 +2,9 @@
 Tests for scoring microservice
 """
 import pytest
-from fastapi.testclient import TestClient
-import sys
-import os
 
-# Add parent directory to path
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from main import app
-
-client = TestClient(app)
-
-
-def test_health_check():
+def test_health_check(client):
     """Test health check endpoint"""
     response = client.get("/health")
     assert response.status_code == 200
@@ -23,13 +13,13 @@ def test_health_check():
     assert data["service"] == "scoring"
 
 
-def test_score_endpoint_missing_data():
+def test_score_endpoint_missing_data(client):
     """Test score endpoint with missing LCA data"""
     response = client.post("/score/compute", json={})
     assert response.status_code in [404, 422]  # May be 404 if route not found or 422 for validation
 
 
-def test_score_endpoint_valid_lca():
+def test_score_endpoint_valid_lca(client):
     """Test score endpoint with valid LCA data"""
     response = client.post("/score/compute", json={
         "co2": 2.5,
@@ -44,7 +34,7 @@ def test_score_endpoint_valid_lca():
         assert data["grade"] in ["A", "B", "C", "D", "E"]
 
 
-def test_score_endpoint_low_impact():
+def test_score_endpoint_low_impact(client):
     """Test scoring with low environmental impact"""
     response = client.post("/score/compute", json={
         "co2": 0.5,
@@ -54,7 +44,7 @@ def test_score_endpoint_low_impact():
     assert response.status_code in [200, 404, 500]
 
 
-def test_score_endpoint_high_impact():
+def test_score_endpoint_high_impact(client):
     """Test scoring with high environmental impact"""
     response = client.post("/score/compute", json={
         "co2": 10.0,
@@ -64,13 +54,13 @@ def test_score_endpoint_high_impact():
     assert response.status_code in [200, 404, 500]
 
 
-def test_api_docs():
+def test_api_docs(client):
     """Test API documentation is available"""
     response = client.get("/docs")
     assert response.status_code == 200
 
 
-def test_openapi_schema():
+def test_openapi_schema(client):
     """Test OpenAPI schema is valid"""
     response = client.get("/openapi.json")
     assert response.status_code == 200
@@ -79,5 +69,258 @@ def test_openapi_schema():
     assert data["info"]["title"] == "Scoring Service"
 
 
+BATCH_ITEMS = [
+    {"indicators": {"co2": 0.8, "water": 450.0, "energy": 2.5}},
+    {
+        "indicators": {"co2": 3.2, "water": 1200.0, "energy": 7.0, "product_id": "3017620422003"},
+        "product_weight_kg": 0.4,
+        "bonus_malus": {"deforestation_risk": True}
+    },
+    {
+        "indicators": {"co2": 1.4, "water": 800.0, "energy": 4.0},
+        "product_weight_kg": 2.0,
+        "bonus_malus": {"bio_certified": True, "local_sourcing": True}
+    },
+    # Negligible impact on every indicator
+    {"indicators": {"co2": 0.001, "water": 1.0, "energy": 0.1}, "product_weight_kg": None},
+]
+
+
+def test_score_batch_rejects_empty_and_oversized(client):
+    """Test batch endpoint rejects empty batches and batches over MAX_BATCH_SIZE"""
+    from routes.score_routes import MAX_BATCH_SIZE
+    
+    assert client.post("/score/batch", json=[]).status_code == 400
+    
+    oversized = [BATCH_ITEMS[0]] * (MAX_BATCH_SIZE + 1)
+    assert client.post("/score/batch", json=oversized).status_code == 400
+
+
+def test_score_batch_matches_compute(client):
+    """Test every batch result equals the /score/compute result for the same item"""
+    response = client.post("/score/batch", json=BATCH_ITEMS)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["count"] == len(BATCH_ITEMS)
+    
+    for item, batch_result in zip(BATCH_ITEMS, data["scores"]):
+        single = client.post("/score/compute", json=item)
+        assert single.status_code == 200
+        single_result = single.json()
+        
+        # Each call stores its own record
+        assert batch_result.pop("id") != single_result.pop("id")
+        assert batch_result == single_result
+
+
+def test_nan_indicator_scores_match_between_routes(client):
+    """Test a NaN indicator scores the same on /score/compute and /score/batch"""
+    import json
+
+    headers = {"content-type": "application/json"}
+    for item in (
+        {"indicators": {"co2": float("nan"), "water": 450.0, "energy": 2.5}},
+        {
+            "indicators": {"co2": float("nan"), "water": 450.0, "energy": 2.5},
+            "bonus_malus": {"bio_certified": True}
+        },
+    ):
+        single = client.post("/score/compute", content=json.dumps(item), headers=headers)
+        batch = client.post("/score/batch", content=json.dumps([item]), headers=headers)
+        assert single.status_code == 200
+        assert batch.status_code == 200
+
+        single_result = single.json()
+        batch_result = batch.json()["scores"][0]
+        single_result.pop("id")
+        batch_result.pop("id")
+        assert batch_result == single_result
+        assert single_result["score_letter"] == "E"
+
+
+def test_kernels_compiled_at_startup(client):
+    """Test the lifespan warmup compiles the signatures the batch route uses"""
+    from ml import score_kernel
+    
+    if not score_kernel.NUMBA_AVAILABLE:
+        pytest.skip("Numba not installed")
+    
+    kernels = (
+        score_kernel._normalize_kernel_numba,
+        score_kernel._confidence_kernel_numba,
+        score_kernel._score_kernel_numba
+    )
+    assert all(len(kernel.signatures) == 1 for kernel in kernels)
+    
+    # A real batch must not trigger another compile
+    assert client.post("/score/batch", json=BATCH_ITEMS).status_code == 200
+    assert all(len(kernel.signatures) == 1 for kernel in kernels)
+
+
+def test_create_score_fast_returns_id(client):
+    """Test the Core insert returns the stored id, generated or supplied"""
+    import uuid
+    from database.connection import SessionLocal
+    from database.crud import create_score_fast, get_score
+
+    values = {"product_id": "fast-path", "score_numeric": 72.5, "score_letter": "B"}
+    supplied_id = uuid.uuid4()
+
+    db = SessionLocal()
+    try:
+        generated_id = create_score_fast(db, values)
+        assert isinstance(generated_id, uuid.UUID)
+        assert create_score_fast(db, {"id": supplied_id, **values}) == supplied_id
+
+        for score_id in (generated_id, supplied_id):
+            stored = get_score(db, score_id)
+            assert stored is not None
+            assert stored.score_letter == "B"
+    finally:
+        db.close()
+
+
+def test_compute_scores_serialize_as_floats(client):
+    """Test clipped scores keep the response schema's float type"""
+    from routes.score_routes import ScoreResponse
+
+    # Negligible impact clips to 0, very high impact to 100
+    for item in (BATCH_ITEMS[3], {"indicators": {"co2": 50.0, "water": 9000.0, "energy": 80.0}}):
+        response = client.post("/score/compute", json=item)
+        assert response.status_code == 200
+        data = response.json()
+        ScoreResponse.model_validate(data)
+        for value in (
+            data["score_numeric"],
+            data["confidence"],
+            data["breakdown"]["base_score"],
+            data["breakdown"]["adjusted_score"]
+        ):
+            assert isinstance(value, float)
+
+
+def test_compute_wait_for_store(client):
+    """Test wait_for_store stores the score before the id is returned"""
+    response = client.post("/score/compute", params={"wait_for_store": True}, json=BATCH_ITEMS[1])
+    assert response.status_code == 200
+
+    stored = client.get(f"/score/result/{response.json()['id']}")
+    assert stored.status_code == 200
+    assert stored.json()["score_letter"] == response.json()["score_letter"]
+
+
+def test_compute_store_failures_are_reported(client, monkeypatch):
+    """Test failed score writes are counted in the background and surfaced when waiting"""
+    from routes import score_routes
+
+    def failing_create(db, values):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(score_routes, "create_score_fast", failing_create)
+    before = client.get("/score/stats").json()["background_write_failures"]
+
+    # The background write fails after the response was already sent
+    assert client.post("/score/compute", json=BATCH_ITEMS[0]).status_code == 200
+    assert client.get("/score/stats").json()["background_write_failures"] == before + 1
+
+    response = client.post("/score/compute", params={"wait_for_store": True}, json=BATCH_ITEMS[0])
+    assert response.status_code == 500
+    assert client.get("/score/stats").json()["background_write_failures"] == before + 1
+
+
+def test_product_history_is_not_truncated(client):
+    """Test product history returns every score unless a limit is asked for"""
+    from database.connection import SessionLocal
+    from database.crud import create_scores_bulk
+    from models.score import ScoreCreate
+
+    db = SessionLocal()
+    try:
+        create_scores_bulk(db, [
+            ScoreCreate(product_id="long-history", score_numeric=50.0, score_letter="C")
+            for _ in range(120)
+        ])
+    finally:
+        db.close()
+
+    response = client.get("/score/product/long-history")
+    assert response.status_code == 200
+    assert len(response.json()["scores"]) == 120
+
+    response = client.get("/score/product/long-history", params={"limit": 5})
+    assert response.status_code == 200
+    assert len(response.json()["scores"]) == 5
+
+
+def test_numeric_to_letter_handles_nan():
+    """Test a NaN score grades as E instead of raising"""
+    from ml.score_calculator import ScoreCalculator
+    
+    calculator = ScoreCalculator()
+    assert calculator.numeric_to_letter(float("nan")) == "E"
+    assert calculator.numeric_to_letter(-5.0) == "A"
+    assert calculator.numeric_to_letter(float("inf")) == "E"
+    
+    # The batch kernel grades NaN the same way
+    result = calculator.score_batch([[float("nan"), 10.0, 10.0], [10.0, 10.0, 10.0]])
+    assert result["letters"] == ["E", "A"]
+
+
+def test_weighted_score_batch_matches_scalar():
+    """Test batch scoring gives the same results as per-product scoring"""
+    from ml.score_calculator import ScoreCalculator
+    
+    calculator = ScoreCalculator()
+    rows = [(10.0, 20.0, 30.0), (90.0, 100.0, 120.0), (0.0, 0.0, 0.0)]
+    
+    batch = calculator.calculate_weighted_score_batch([list(row) for row in rows])
+    assert list(batch) == pytest.approx([calculator.calculate_weighted_score(*row) for row in rows])
+    
+    # Same kernel as score_batch, so the base scores are identical
+    assert list(batch) == list(calculator.score_batch([list(row) for row in rows])["base_scores"])
+
+
+def test_bonus_malus_batch_matches_score_batch():
+    """Test batch adjustments agree with apply_bonus_malus and score_batch"""
+    from ml.score_calculator import ScoreCalculator
+
+    calculator = ScoreCalculator()
+    rows = [[10.0, 20.0, 30.0], [90.0, 100.0, 120.0], [45.0, 35.0, 60.0]]
+    flags = [
+        [True, True, True, False, False, False],
+        [False, False, False, False, True, True],
+        [False, False, False, True, False, False]
+    ]
+
+    base_scores = calculator.calculate_weighted_score_batch(rows)
+    adjusted = calculator.apply_bonus_malus_batch(base_scores, flags)
+
+    assert list(adjusted) == list(calculator.score_batch(rows, flags)["adjusted_scores"])
+    for i, base in enumerate(base_scores.tolist()):
+        expected = calculator.apply_bonus_malus(base, *flags[i])["adjusted_score"]
+        assert adjusted[i] == pytest.approx(expected)
+
+
+def test_score_batch_matches_scalar_pipeline():
+    """Test the batch kernel agrees with weighted score, bonus/malus and grading"""
+    from ml.score_calculator import ScoreCalculator
+    
+    calculator = ScoreCalculator()
+    rows = [(10.0, 20.0, 30.0), (90.0, 100.0, 120.0), (45.0, 35.0, 60.0)]
+    flags = [
+        [True, False, False, False, False, False],
+        [False, False, False, False, True, True],
+        [False, True, True, False, False, False]
+    ]
+    
+    result = calculator.score_batch([list(row) for row in rows], flags)
+    
+    for i, row in enumerate(rows):
+        base = calculator.calculate_weighted_score(*row)
+        adjusted = calculator.apply_bonus_malus(base, *flags[i])["adjusted_score"]
+        assert result["adjusted_scores"][i] == pytest.approx(adjusted)
+        assert result["letters"][i] == calculator.numeric_to_letter(adjusted)
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
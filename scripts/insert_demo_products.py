@@ -3,7 +3,10 @@ Insert demo products directly into widget_db database
 """
 import psycopg2
 import psycopg2.extras
+import csv
+import io
 import json
+import os
 from datetime import datetime
 import uuid
 
@@ -16,6 +19,22 @@ DB_CONFIG = {
     "password": "postgres"
 }
 
+# Load products with COPY instead of INSERT (worth it for large catalogs)
+USE_COPY = os.getenv("DEMO_USE_COPY", "0") == "1"
+
+# Number of products shown after loading
+PREVIEW_LIMIT = 10
+
+PRODUCT_COLUMNS = (
+    "id", "title", "brand", "gtin",
+    "score_letter", "score_numeric", "confidence",
+    "co2", "water", "energy",
+    "ingredients", "origins", "labels",
+    "created_at", "updated_at"
+)
+
+JSON_COLUMNS = ("ingredients", "origins", "labels")
+
 # Demo products
 PRODUCTS = [
     {
@@ -90,6 +109,68 @@ PRODUCTS = [
     }
 ]
 
+def build_rows(now):
+    """Build one row per product in PRODUCT_COLUMNS order, JSON columns as lists"""
+    return [
+        (
+            str(uuid.uuid4()),
+            product["title"],
+            product["brand"],
+            product["gtin"],
+            product["score_letter"],
+            product["score_numeric"],
+            product["confidence"],
+            product["co2"],
+            product["water"],
+            product["energy"],
+            product["ingredients"],
+            product["origins"],
+            product["labels"],
+            now,
+            now
+        )
+        for product in PRODUCTS
+    ]
+
+
+def copy_rows(cursor, rows):
+    """Stream rows to the server with COPY, parsed once instead of per statement"""
+    json_positions = [PRODUCT_COLUMNS.index(column) for column in JSON_COLUMNS]
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        row = list(row)
+        for i in json_positions:
+            row[i] = json.dumps(row[i], ensure_ascii=False)
+        writer.writerow(row)
+    buffer.seek(0)
+    
+    cursor.copy_expert(
+        f"COPY products ({', '.join(PRODUCT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+
+
+def insert_rows(cursor, rows):
+    """Insert rows with one multi-row INSERT per page"""
+    json_positions = [PRODUCT_COLUMNS.index(column) for column in JSON_COLUMNS]
+    
+    values = []
+    for row in rows:
+        row = list(row)
+        for i in json_positions:
+            row[i] = psycopg2.extras.Json(row[i])
+        values.append(tuple(row))
+    
+    psycopg2.extras.execute_values(
+        cursor,
+        f"INSERT INTO products ({', '.join(PRODUCT_COLUMNS)}) VALUES %s",
+        values,
+        page_size=500
+    )
+
+
 def insert_products():
     """Insert demo products into database"""
     try:
@@ -107,47 +188,12 @@ def insert_products():
         # Insert products
         print(f"\nInserting {len(PRODUCTS)} demo products...")
         
-        insert_query = """
-        INSERT INTO products (
-            id, title, brand, gtin,
-            score_letter, score_numeric, confidence,
-            co2, water, energy,
-            ingredients, origins, labels,
-            created_at, updated_at
-        ) VALUES (
-            %s, %s, %s, %s,
-            %s, %s, %s,
-            %s, %s, %s,
-            %s, %s, %s,
-            %s, %s
-        )
-        """
-        
-        now = datetime.utcnow()
+        rows = build_rows(datetime.utcnow())
         
-        for product in PRODUCTS:
-            product_id = str(uuid.uuid4())
-            score_id = f"score_{product_id[:8]}"
-            
-            cursor.execute(insert_query, (
-                product_id,
-                product["title"],
-                product["brand"],
-                product["gtin"],
-                product["score_letter"],
-                product["score_numeric"],
-                product["confidence"],
-                product["co2"],
-                product["water"],
-                product["energy"],
-                psycopg2.extras.Json(product["ingredients"]),
-                psycopg2.extras.Json(product["origins"]),
-                psycopg2.extras.Json(product["labels"]),
-                now,
-                now
-            ))
-            
-            print(f"  ✓ {product['title']:<45} Grade: {product['score_letter']}")
+        if USE_COPY:
+            copy_rows(cursor, rows)
+        else:
+            insert_rows(cursor, rows)
         
         conn.commit()
         
@@ -159,13 +205,14 @@ def insert_products():
         print(f"✓ Successfully inserted {count} products into widget_db")
         print(f"{'='*70}")
         
-        # Display products
-        print("\nProducts in database:")
+        # Display the top products
+        print(f"\nTop {PREVIEW_LIMIT} products in database:")
         cursor.execute("""
             SELECT title, brand, gtin, score_letter, score_numeric
             FROM products
             ORDER BY score_numeric DESC
-        """)
+            LIMIT %s
+        """, (PREVIEW_LIMIT,))
         
         for row in cursor.fetchall():
             title, brand, gtin, letter, score = row
@@ -2,7 +2,8 @@
 Script to populate the database with demo products
 Run this script to add sample products for testing
 """
-import requests
+import asyncio
+import httpx
 import json
 from datetime import datetime
 
@@ -13,6 +14,13 @@ LCA_URL = "http://localhost:8003"
 SCORING_URL = "http://localhost:8004"
 WIDGET_URL = "http://localhost:8005"
 
+# Per-request timeout for service calls (seconds)
+HTTP_TIMEOUT = 30.0
+
+# Connection pool bounds for the shared client
+HTTP_MAX_CONNECTIONS = 20
+HTTP_MAX_KEEPALIVE = 20
+
 # Demo products data
 DEMO_PRODUCTS = [
     {
@@ -62,25 +70,24 @@ DEMO_PRODUCTS = [
     }
 ]
 
-def create_product(product_data):
+async def create_product(product_data, client):
     """Create a complete product with score"""
-    print(f"\n{'='*60}")
-    print(f"Processing: {product_data['name']}")
-    print(f"{'='*60}")
+    # Products run concurrently, so every line is tagged with the product
+    name = product_data["name"]
     
     # Step 1: Extract ingredients with NLP
-    print("1. Extracting ingredients with NLP...")
-    nlp_response = requests.post(f"{NLP_URL}/nlp/extract", json={
+    print(f"[{name}] 1. Extracting ingredients with NLP...")
+    nlp_response = await client.post(f"{NLP_URL}/nlp/extract", json={
         "text": product_data["ingredients_text"],
         "language": "fr"
     })
     
     if nlp_response.status_code != 200:
-        print(f"   ⚠️  NLP service error: {nlp_response.status_code}")
+        print(f"[{name}]    ⚠️  NLP service error: {nlp_response.status_code}")
         ingredients = [{"name": "unknown", "weight": product_data["weight_kg"]}]
     else:
         nlp_data = nlp_response.json()
-        print(f"   ✓ Found {len(nlp_data.get('ingredients', []))} ingredients")
+        print(f"[{name}]    ✓ Found {len(nlp_data.get('ingredients', []))} ingredients")
         
         # Convert NLP ingredients to LCA format
         ingredients = []
@@ -94,8 +101,8 @@ def create_product(product_data):
             ingredients = [{"name": "mixed ingredients", "weight": product_data["weight_kg"]}]
     
     # Step 2: Calculate LCA
-    print("2. Calculating LCA indicators...")
-    lca_response = requests.post(f"{LCA_URL}/lca/calc", json={
+    print(f"[{name}] 2. Calculating LCA indicators...")
+    lca_response = await client.post(f"{LCA_URL}/lca/calc", json={
         "ingredients": ingredients,
         "packaging_material": "plastic" if "plastique" in product_data["packaging"].lower() else "cardboard",
         "packaging_weight_kg": product_data["weight_kg"] * 0.05,
@@ -108,29 +115,29 @@ def create_product(product_data):
     })
     
     if lca_response.status_code != 200:
-        print(f"   ⚠️  LCA service error: {lca_response.status_code}")
+        print(f"[{name}]    ⚠️  LCA service error: {lca_response.status_code}")
         lca_data = {"co2": 2.5, "water": 100.0, "energy": 50.0}
     else:
         lca_data = lca_response.json()
-        print(f"   ✓ CO2: {lca_data['co2']:.2f} kg, Water: {lca_data['water']:.2f} L, Energy: {lca_data['energy']:.2f} MJ")
+        print(f"[{name}]    ✓ CO2: {lca_data['co2']:.2f} kg, Water: {lca_data['water']:.2f} L, Energy: {lca_data['energy']:.2f} MJ")
     
     # Step 3: Calculate Score
-    print("3. Computing eco-score...")
-    score_response = requests.post(f"{SCORING_URL}/score/compute", json={
+    print(f"[{name}] 3. Computing eco-score...")
+    score_response = await client.post(f"{SCORING_URL}/score/compute", json={
         "co2": lca_data["co2"],
         "water": lca_data["water"],
         "energy": lca_data["energy"]
     })
     
     if score_response.status_code != 200:
-        print(f"   ⚠️  Scoring service error: {score_response.status_code}")
+        print(f"[{name}]    ⚠️  Scoring service error: {score_response.status_code}")
         score_data = {"score": 50, "grade": "C"}
     else:
         score_data = score_response.json()
-        print(f"   ✓ Score: {score_data.get('score', 'N/A')} - Grade: {score_data.get('grade', 'N/A')}")
+        print(f"[{name}]    ✓ Score: {score_data.get('score', 'N/A')} - Grade: {score_data.get('grade', 'N/A')}")
     
     # Step 4: Register in Widget API (direct DB insert via service)
-    print("4. Registering product in catalog...")
+    print(f"[{name}] 4. Registering product in catalog...")
     
     # Since we don't have a direct insert endpoint, we'll display the data
     final_product = {
@@ -147,16 +154,26 @@ def create_product(product_data):
         "origin": product_data["origin"]
     }
     
-    print(f"   ✓ Product ready: {final_product['name']} - Grade {final_product['grade']}")
+    print(f"[{name}]    ✓ Product ready - Grade {final_product['grade']}")
     return final_product
 
-def main():
+async def check_service(name, url, client):
+    """Print whether a service answers its health check"""
+    try:
+        response = await client.get(f"{url}/health", timeout=5)
+        if response.status_code == 200:
+            print(f"   ✓ {name} service is running")
+        else:
+            print(f"   ✗ {name} service returned {response.status_code}")
+    except Exception as e:
+        print(f"   ✗ {name} service is not accessible: {str(e)}")
+
+
+async def main():
     print("\n" + "="*60)
     print("  ECOLABEL-MS2027 - Demo Data Population")
     print("="*60)
     
-    # Check if services are running
-    print("\nChecking services...")
     services = {
         "NLP": NLP_URL,
         "LCA": LCA_URL,
@@ -164,27 +181,36 @@ def main():
         "Widget": WIDGET_URL
     }
     
-    for name, url in services.items():
-        try:
-            response = requests.get(f"{url}/health", timeout=5)
-            if response.status_code == 200:
-                print(f"   ✓ {name} service is running")
-            else:
-                print(f"   ✗ {name} service returned {response.status_code}")
-        except Exception as e:
-            print(f"   ✗ {name} service is not accessible: {str(e)}")
-    
-    print("\n" + "="*60)
-    print(f"Creating {len(DEMO_PRODUCTS)} demo products...")
-    print("="*60)
+    # One pooled client shared by every request, so connections are reused
+    async with httpx.AsyncClient(
+        timeout=HTTP_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE
+        )
+    ) as client:
+        # Check if services are running
+        print("\nChecking services...")
+        await asyncio.gather(*[
+            check_service(name, url, client) for name, url in services.items()
+        ])
+        
+        print("\n" + "="*60)
+        print(f"Creating {len(DEMO_PRODUCTS)} demo products...")
+        print("="*60)
+        
+        # Each product's NLP -> LCA -> score chain runs concurrently with the others
+        outcomes = await asyncio.gather(
+            *[create_product(product_data, client) for product_data in DEMO_PRODUCTS],
+            return_exceptions=True
+        )
     
     results = []
-    for product_data in DEMO_PRODUCTS:
-        try:
-            result = create_product(product_data)
-            results.append(result)
-        except Exception as e:
-            print(f"   ✗ Error: {str(e)}")
+    for product_data, outcome in zip(DEMO_PRODUCTS, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"   ✗ {product_data['name']}: {str(outcome)}")
+        else:
+            results.append(outcome)
     
     print("\n" + "="*60)
     print("Summary")
@@ -201,4 +227,4 @@ def main():
     print("="*60 + "\n")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())